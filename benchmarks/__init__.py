@@ -0,0 +1,4 @@
+"""
+Benchmarks and load-testing harnesses for the Shift Scheduler Bot.
+Nothing in this package touches the Telegram network.
+"""
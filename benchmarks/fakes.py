@@ -0,0 +1,92 @@
+"""
+Network-free stand-ins for Telegram: a stub Bot and synthetic update payloads.
+"""
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+
+from telegram import Bot
+
+STUB_TOKEN = "123456:stub-token"
+STUB_BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+
+
+class StubBot(Bot):
+    """
+    Bot whose API calls are answered locally instead of being sent to Telegram.
+
+    ``latency`` simulates the round-trip of every call; ``calls`` counts calls
+    per API method.
+    """
+    def __init__(self, latency: float = 0.0, **kwargs: Any):
+        super().__init__(STUB_TOKEN, **kwargs)
+        with self._unfrozen():
+            self._latency = latency
+            self._message_ids = itertools.count(1)
+            self.calls: Dict[str, int] = {}
+
+    async def _do_post(self, endpoint: str, data: Dict[str, Any], **kwargs: Any) -> Any:
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if endpoint == "getMe":
+            return STUB_BOT_USER
+        if endpoint == "getUpdates":
+            return []
+        if endpoint in ("sendMessage", "sendDocument", "editMessageText"):
+            chat_id = data.get("chat_id") or 1
+            return {
+                "message_id": data.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "from": STUB_BOT_USER,
+                "text": data.get("text", ""),
+            }
+        return True
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def message_update(update_id: int, user_id: int, text: str, date: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build the JSON payload of a private text message, marking leading /commands.
+    """
+    entities: List[Dict[str, Any]] = []
+    if text.startswith("/"):
+        entities.append({"type": "bot_command", "offset": 0, "length": len(text.split()[0])})
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": date or int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+def callback_update(update_id: int, user_id: int, data: str, date: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build the JSON payload of an inline button press on a bot message.
+    """
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(user_id),
+            "from": _user(user_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": date or int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": STUB_BOT_USER,
+                "text": "menu",
+            },
+        },
+    }
@@ -0,0 +1,85 @@
+"""
+Drain synthetic reminders through NotificationService against a fake bot.
+
+The fake bot enforces the same global and per-chat limits as Telegram and
+answers with RetryAfter when they are exceeded, so a run shows whether the
+service drains at the maximum allowed rate without being throttled.
+
+Usage: python -m benchmarks.notification_drain [--count 5000] [--chats 1000]
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from telegram.error import RetryAfter
+
+from bot.notifications import Notification, NotificationService
+
+
+class FakeBot:
+    """Bot stand-in that records sends and enforces sliding-window limits."""
+    def __init__(self, global_rate: float, per_chat_rate: float):
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.sent: Deque[float] = deque()
+        self.last_by_chat: Dict[int, float] = {}
+        self.total = 0
+        self.throttled = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] >= 1.0:
+            self.sent.popleft()
+        last = self.last_by_chat.get(chat_id)
+        # Allow 5% slack for timer jitter
+        if len(self.sent) >= self.global_rate * 1.05 or (
+            last is not None and now - last < 0.95 / self.per_chat_rate
+        ):
+            self.throttled += 1
+            raise RetryAfter(1)
+        self.sent.append(now)
+        self.last_by_chat[chat_id] = now
+        self.total += 1
+
+
+async def run(count: int, chats: int, global_rate: float, per_chat_rate: float) -> Dict[str, float]:
+    """
+    Queue ``count`` reminders spread over ``chats`` chats and wait for the drain.
+    """
+    bot = FakeBot(global_rate, per_chat_rate)
+    service = NotificationService(bot, global_rate=global_rate, per_chat_rate=per_chat_rate)
+    service.enqueue_many(
+        Notification(index % chats, f"Reminder {index}") for index in range(count)
+    )
+    started = time.monotonic()
+    await service.start()
+    await service.drain()
+    elapsed = time.monotonic() - started
+    await service.stop()
+    return {
+        "notifications": count,
+        "seconds": round(elapsed, 3),
+        "rate": round(bot.total / elapsed, 2),
+        "max_rate": global_rate,
+        "throttled": bot.throttled,
+        **service.stats,
+    }
+
+
+def main() -> None:
+    """Run the drain benchmark and print the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--per-chat-rate", type=float, default=1)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.count, args.chats, args.global_rate, args.per_chat_rate))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Query-plan regression check for the hot repository queries.
+
+Runs every hot repository query against a synthetic organization, captures
+the SQL it sends and asks the database for its plan: ``EXPLAIN QUERY PLAN``
+on SQLite, ``EXPLAIN (FORMAT JSON)`` with sequential scans disabled on
+PostgreSQL. A query that reads a hot table with a full scan instead of an
+index search fails the check, and the run exits with status 1. Tables are
+not analyzed, so plans depend on the available indexes rather than on how
+small the synthetic tables happen to be.
+
+The database must be empty; its tables are created from the models. The
+default is an in-memory SQLite database.
+
+Usage: python -m benchmarks.query_plans [--size medium] [--database-url URL]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from benchmarks.synthetic import SIZES, SyntheticOrganization, populate_database
+from db.base import create_engine, init_models
+from db.models import Shift, SwapRequest, User
+from db.models.swap_request import SwapRequestStatus
+from db.repository.assignment_repository import AssignmentRepository
+from db.repository.replacement_repository import ReplacementOfferRepository
+from db.repository.shift_repository import ShiftRepository
+from db.repository.swap_repository import SwapRequestRepository
+from db.repository.user_repository import UserRepository
+from db.repository.workload_repository import WorkloadRepository
+from utils.scheduler import get_week_start
+
+# Tables that grow with staff and time and must never be scanned in full
+HOT_TABLES = {
+    "replacementoffer", "shift", "shiftassignment", "swaprequest", "users", "workloadrollup"
+}
+
+# Swap requests created per user, and the share of them still pending
+SWAPS_PER_USER = 2
+PENDING_SHARE = 0.1
+
+Statement = Tuple[str, Any]
+HotQuery = Callable[[AsyncSession, SyntheticOrganization], Awaitable[Any]]
+
+
+async def _consume(rows: Any) -> None:
+    async for _ in rows:
+        pass
+
+
+def _hot_queries() -> Dict[str, HotQuery]:
+    today = date.today()
+    week = timedelta(days=7)
+    telegram_id = 2  # an employee of the first department
+    return {
+        "profile": lambda session, _: UserRepository(session).get_by_telegram_id(telegram_id),
+        "user_shifts": lambda session, _: ShiftRepository(session).get_user_shifts(
+            telegram_id, (today - week, today + week)
+        ),
+        "user_shifts_page": lambda session, _: ShiftRepository(session).get_user_shifts_page(
+            telegram_id, today, cursor=(datetime.combine(today, datetime.min.time()), 1)
+        ),
+        "department_schedule": lambda session, _: ShiftRepository(session).get_department_schedule(
+            1, today
+        ),
+        "department_schedule_page": lambda session, _: (
+            ShiftRepository(session).get_department_schedule_page(1, today)
+        ),
+        "assignments_on": lambda session, _: ShiftRepository(session).get_assignments_on(today),
+        "user_export": lambda session, _: _consume(
+            ShiftRepository(session).stream_user_export(telegram_id, today - week, today + week)
+        ),
+        "department_export": lambda session, _: _consume(
+            ShiftRepository(session).stream_department_export(1, today - week, today + week)
+        ),
+        "user_export_version": lambda session, _: (
+            ShiftRepository(session).get_user_export_version(telegram_id, today - week, today + week)
+        ),
+        "period_shifts": lambda session, _: ShiftRepository(session).get_period_shifts(
+            today, today + timedelta(days=29), [1]
+        ),
+        "active_shift_ids": lambda session, _: ShiftRepository(session).get_active_shift_ids(
+            today, today + timedelta(days=29), [1]
+        ),
+        "workload_report": lambda session, _: WorkloadRepository(session).get_totals(
+            today - 13 * week, today, [1]
+        ),
+        "workload_hours": lambda session, _: WorkloadRepository(session).get_hours(
+            range(1, 51), today - 13 * week, today
+        ),
+        "workload_refresh": lambda session, _: WorkloadRepository(session).refresh(
+            [(1, get_week_start(today)), (2, get_week_start(today))]
+        ),
+        "pending_swap_matching": lambda session, _: (
+            SwapRequestRepository(session).get_pending([1])
+        ),
+        "pending_swap_approval": lambda session, _: (
+            SwapRequestRepository(session).get_pending(None, range(1, 21))
+        ),
+        "swap_decisions": lambda session, _: (
+            SwapRequestRepository(session).get_decisions(range(1, 21))
+        ),
+        "held_for_users": lambda session, _: AssignmentRepository(session).get_active_for_users(
+            range(1, 21), today - week, today + week
+        ),
+        "pending_swaps": lambda session, _: (
+            SwapRequestRepository(session).get_pending_for_shifts(range(1, 21))
+        ),
+        "held_by_ids": lambda session, _: (
+            AssignmentRepository(session).get_active_by_ids(range(1, 21))
+        ),
+        "replacement_hand_over": lambda session, _: (
+            AssignmentRepository(session).hand_over(1, 2)
+        ),
+        "replacement_open_offer": lambda session, _: (
+            ReplacementOfferRepository(session).get_open(1, 2)
+        ),
+        "replacement_declined": lambda session, _: (
+            ReplacementOfferRepository(session).get_declined(1)
+        ),
+    }
+
+
+@contextmanager
+def capture_statements(engine: AsyncEngine) -> Iterator[List[Statement]]:
+    """
+    Collect the SQL and parameters of every statement executed on the engine.
+    """
+    statements: List[Statement] = []
+
+    def before_cursor_execute(
+        connection: Any, cursor: Any, statement: str, parameters: Any,
+        context: Any, executemany: bool
+    ) -> None:
+        # One parameter set is enough to plan an executemany
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _base_table(name: str) -> str:
+    # Aliases of joined eager loads are suffixed with a number (users_1)
+    return re.sub(r"_\d+$", "", name)
+
+
+async def explain_sqlite(
+    connection: AsyncConnection, statement: Statement
+) -> Tuple[List[str], List[str]]:
+    """
+    Get the plan lines of a statement and the hot tables it scans in full.
+    """
+    sql, parameters = statement
+    result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)
+    plan = [row[3] for row in result]
+    scans = []
+    for line in plan:
+        match = re.match(r"SCAN (\w+)", line)
+        if match and _base_table(match.group(1)) in HOT_TABLES:
+            scans.append(line)
+    return plan, scans
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+async def explain_postgresql(
+    connection: AsyncConnection, statement: Statement
+) -> Tuple[List[str], List[str]]:
+    """
+    Get the plan nodes of a statement and the hot tables it scans sequentially.
+
+    Sequential scans are disabled first, so a remaining one means no index
+    can answer the query at all, however small the tables are.
+    """
+    sql, parameters = statement
+    await connection.exec_driver_sql("SET enable_seqscan = off")
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters)
+    document = result.scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan, scans = [], []
+    for node in _plan_nodes(document[0]["Plan"]):
+        line = f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}"
+        plan.append(line.strip())
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+            scans.append(line.strip())
+    return plan, scans
+
+
+async def _add_swap_requests(engine: AsyncEngine, seed: int) -> None:
+    rng = random.Random(seed)
+    async with engine.connect() as connection:
+        shift_ids = (await connection.execute(select(Shift.id))).scalars().all()
+        user_ids = (await connection.execute(select(User.id))).scalars().all()
+    rows = [
+        {
+            "user_id": user_id,
+            "shift_id": rng.choice(shift_ids),
+            "requested_shift_id": rng.choice(shift_ids),
+            "status": (
+                SwapRequestStatus.PENDING if rng.random() < PENDING_SHARE
+                else SwapRequestStatus.APPROVED
+            ),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        for user_id in user_ids
+        for _ in range(SWAPS_PER_USER)
+    ]
+    async with engine.begin() as connection:
+        await connection.execute(insert(SwapRequest), rows)
+
+
+async def run(database_url: str, size: str, seed: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Load a synthetic organization and check the plan of every hot query.
+    """
+    engine = create_engine(database_url)
+    await init_models(engine)
+    organization = SyntheticOrganization(SIZES[size], seed)
+    await populate_database(engine, organization)
+    await _add_swap_requests(engine, seed)
+    dialect = engine.dialect.name
+    explain = explain_postgresql if dialect == "postgresql" else explain_sqlite
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for name, query in _hot_queries().items():
+        with capture_statements(engine) as statements:
+            async with AsyncSession(engine) as session:
+                await query(session, organization)
+        plans, scans = [], []
+        async with engine.connect() as connection:
+            for statement in statements:
+                plan, statement_scans = await explain(connection, statement)
+                plans.append(plan)
+                scans.extend(statement_scans)
+        report[name] = {"statements": len(statements), "plans": plans, "full_scans": scans}
+    await engine.dispose()
+    return report
+
+
+def main() -> None:
+    """Run the check, print the plans as JSON and fail on full scans."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:",
+                        help="an empty database; tables are created from the models")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.database_url, args.size, args.seed))
+    print(json.dumps(report, indent=2))
+    failures = {name: case["full_scans"] for name, case in report.items() if case["full_scans"]}
+    if failures:
+        for name, scans in failures.items():
+            print(f"Full scan in {name}: {'; '.join(scans)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
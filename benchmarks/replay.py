@@ -0,0 +1,279 @@
+"""
+Replay a stream of Telegram updates through the full Application pipeline.
+
+The stream is a JSONL file with one ``{"offset": seconds, "update": {...}}``
+object per line (plain update objects are accepted too; their message date
+is used as the offset). Updates are queued at their offsets divided by the
+speed-up factor (0 queues them as fast as possible) into an Application
+built by ``bot.main.build_application`` on a StubBot, with a synthetic
+organization loaded into an in-memory SQLite database.
+
+Latency is measured from queueing an update until every handler group has
+processed it, and reported per handler (command, menu button or callback
+action) as p50/p95/p99 together with the overall throughput.
+
+Usage:
+    python -m benchmarks.replay generate --users 200 --output stream.jsonl
+    python -m benchmarks.replay run stream.jsonl --concurrency 1 16 64 --speedup 0 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Replayed users are far above the inbound limits on purpose
+os.environ.setdefault("RATE_LIMIT_USER_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_USER_BURST", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_BURST", "1000000")
+
+import numpy as np
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+
+from benchmarks.fakes import StubBot, callback_update, message_update
+from benchmarks.synthetic import SyntheticOrganization, populate_database
+from bot.keyboards.callback_data import PAGE_FORWARD, CallbackAction, decode_callback, encode_callback
+from bot.main import build_application
+from bot.profiles import profile_cache
+from db.base import configure_database, create_engine, dispose_engine, init_models
+from utils.pagination import cursor_to_args
+from utils.scheduler import get_week_start
+from utils.translations import Language, get_translation, resolve_button
+
+Event = Tuple[float, Dict[str, Any]]
+
+# Relative weights of the actions of a synthetic session after /start
+SESSION_ACTIONS = (
+    ("menu:my_shifts", 4),
+    ("menu:shift_schedule", 3),
+    ("menu:request_swap", 1),
+    ("command:myshift", 2),
+    ("command:schedule", 2),
+    ("command:swap", 1),
+    ("callback:schedule_page", 2),
+    ("callback:shift_type", 1),
+    ("callback:swap_decision", 1),
+)
+
+
+def _session_update(action: str, update_id: int, user_id: int, rng: random.Random) -> Dict[str, Any]:
+    kind, name = action.split(":")
+    if kind == "menu":
+        return message_update(update_id, user_id, get_translation(name, Language.ENGLISH))
+    if kind == "command":
+        return message_update(update_id, user_id, f"/{name}")
+    if name == "schedule_page":
+        week_start = datetime.combine(get_week_start(date.today()), datetime.min.time())
+        data = encode_callback(CallbackAction.SCHEDULE_PAGE, PAGE_FORWARD, *cursor_to_args(week_start, 0))
+    elif name == "shift_type":
+        data = encode_callback(CallbackAction.SHIFT_TYPE, rng.randrange(3))
+    else:
+        action = rng.choice((CallbackAction.SWAP_ACCEPT, CallbackAction.SWAP_REJECT))
+        data = encode_callback(action, rng.randrange(1, 1000))
+    return callback_update(update_id, user_id, data)
+
+
+def generate_stream(
+    users: int, updates_per_user: int, rate: float, seed: int = 0
+) -> Iterator[Event]:
+    """
+    Generate sessions of ``users`` users arriving at ``rate`` updates per second.
+
+    Every session starts with /start; the rest are drawn from SESSION_ACTIONS.
+    """
+    rng = random.Random(seed)
+    actions = [action for action, _ in SESSION_ACTIONS]
+    weights = [weight for _, weight in SESSION_ACTIONS]
+    pending = {
+        user_id: ["command:start"] + rng.choices(actions, weights, k=updates_per_user - 1)
+        for user_id in range(1, users + 1)
+    }
+    offset = 0.0
+    update_id = 0
+    while pending:
+        user_id = rng.choice(list(pending))
+        action = pending[user_id].pop(0)
+        if not pending[user_id]:
+            del pending[user_id]
+        update_id += 1
+        offset += rng.expovariate(rate)
+        yield round(offset, 6), _session_update(action, update_id, user_id, rng)
+
+
+def load_stream(path: str) -> List[Event]:
+    """
+    Read a JSONL update stream, ordered by offset.
+    """
+    events = []
+    first_date: Optional[float] = None
+    with open(path) as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "update" in record:
+                events.append((float(record.get("offset", 0)), record["update"]))
+                continue
+            message = record.get("message") or record.get("callback_query", {}).get("message", {})
+            sent = float(message.get("date", 0))
+            first_date = sent if first_date is None else first_date
+            events.append((sent - first_date, record))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def handler_label(update: Update) -> str:
+    """
+    Name the handler an update is routed to: command, menu button or callback action.
+    """
+    if update.callback_query is not None:
+        try:
+            action, _ = decode_callback(update.callback_query.data or "")
+        except ValueError:
+            return "callback:invalid"
+        return f"callback:{action.name.lower()}"
+    message = update.effective_message
+    if message is None or not message.text:
+        return "other"
+    if message.text.startswith("/"):
+        return f"command:{message.text.split()[0][1:].split('@', 1)[0].lower()}"
+    button = resolve_button(message.text)
+    return f"menu:{button[0]}" if button else "message:unknown"
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+async def replay(
+    events: List[Event], concurrency: int, speedup: float, latency: float, timeout: float = 300
+) -> Dict[str, Any]:
+    """
+    Feed the events into a fresh Application and collect per-handler latencies.
+
+    The database configured by the caller is reused; the profile cache is
+    cleared so every run starts cold.
+    """
+    profile_cache.memory.clear()
+    application = build_application(
+        Application.builder().bot(StubBot(latency=latency)), max_concurrent_updates=concurrency
+    )
+    queued_at: Dict[int, float] = {}
+    latencies: Dict[str, List[float]] = {}
+    done = asyncio.Event()
+    remaining = len(events)
+
+    async def record(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal remaining
+        elapsed = time.perf_counter() - queued_at[update.update_id]
+        latencies.setdefault(handler_label(update), []).append(elapsed)
+        remaining -= 1
+        if remaining == 0:
+            done.set()
+
+    # Runs after the conversation handler, once the update is fully processed
+    application.add_handler(TypeHandler(Update, record), group=1)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        started = time.perf_counter()
+        for offset, payload in events:
+            if speedup > 0:
+                delay = started + offset / speedup - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            update = Update.de_json(payload, application.bot)
+            queued_at[update.update_id] = time.perf_counter()
+            await application.update_queue.put(update)
+        await asyncio.wait_for(done.wait(), timeout)
+        elapsed = time.perf_counter() - started
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+    return {
+        "concurrency": concurrency,
+        "speedup": speedup,
+        "updates": len(events),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(events) / elapsed, 1),
+        "latency": _percentiles([value for values in latencies.values() for value in values]),
+        "handlers": {label: _percentiles(values) for label, values in sorted(latencies.items())},
+    }
+
+
+async def run(
+    events: List[Event], staff: int, concurrencies: List[int], speedups: List[float], latency: float
+) -> List[Dict[str, Any]]:
+    """
+    Replay the events once per concurrency and speed-up combination.
+    """
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    configure_database(engine)
+    await init_models(engine)
+    await populate_database(engine, SyntheticOrganization(staff))
+    try:
+        return [
+            await replay(events, concurrency, speedup, latency)
+            for concurrency in concurrencies
+            for speedup in speedups
+        ]
+    finally:
+        await dispose_engine()
+
+
+def main() -> None:
+    """Generate a synthetic stream or replay a stream and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic update stream")
+    generate.add_argument("--users", type=int, default=200)
+    generate.add_argument("--updates-per-user", type=int, default=20)
+    generate.add_argument("--rate", type=float, default=100.0, help="updates per second")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--output", help="file to write instead of stdout")
+
+    replay_parser = commands.add_parser("run", help="replay an update stream")
+    replay_parser.add_argument("stream")
+    replay_parser.add_argument("--staff", type=int, default=1000,
+                               help="synthetic staff loaded into the database; user ids 1..staff")
+    replay_parser.add_argument("--concurrency", type=int, nargs="+", default=[64])
+    replay_parser.add_argument("--speedup", type=float, nargs="+", default=[1.0],
+                               help="replay speed relative to the stream; 0 for no pacing")
+    replay_parser.add_argument("--latency", type=float, default=0.05, help="simulated Bot API latency")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        output = open(args.output, "w") if args.output else sys.stdout
+        try:
+            for offset, update in generate_stream(args.users, args.updates_per_user, args.rate, args.seed):
+                output.write(json.dumps({"offset": offset, "update": update}) + "\n")
+        finally:
+            if args.output:
+                output.close()
+        return
+
+    events = load_stream(args.stream)
+    results = asyncio.run(run(events, args.staff, args.concurrency, args.speedup, args.latency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure how sharded-mode throughput scales with the number of worker processes.
+
+A synthetic update stream (see benchmarks.replay) is dispatched through a
+ShardSupervisor whose workers run the full application on a StubBot against
+a shared SQLite file holding a synthetic organization. Time is measured from
+the first dispatched update until every worker has handled its share.
+
+Usage: python -m benchmarks.sharding_throughput [--workers 1 2 4] [--users 400]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Synthetic users are far above the inbound limits on purpose; workers inherit these
+os.environ.setdefault("RATE_LIMIT_USER_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_USER_BURST", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_BURST", "1000000")
+
+from telegram.ext import Application
+
+from benchmarks.fakes import StubBot
+from benchmarks.replay import generate_stream
+from benchmarks.synthetic import SyntheticOrganization, populate_database
+from bot.sharding import ShardSupervisor
+from db.base import configure_database, create_engine, get_database_url, init_models
+
+LATENCY_ENV = "BENCHMARK_BOT_LATENCY"
+
+
+def benchmark_application(shard: int) -> Application:
+    """
+    Build a worker application on a StubBot and the benchmark database.
+    """
+    from bot.main import build_application
+
+    configure_database(create_engine(get_database_url()))
+    return build_application(
+        Application.builder().bot(StubBot(latency=float(os.environ.get(LATENCY_ENV, "0"))))
+    )
+
+
+async def measure(workers: int, payloads: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Dispatch the payloads to ``workers`` workers and time until all are handled.
+    """
+    supervisor = ShardSupervisor(workers, application_factory=benchmark_application)
+    supervisor.start()
+    await supervisor.wait_ready(timeout=120)
+    started = time.perf_counter()
+    for payload in payloads:
+        await supervisor.dispatch(payload)
+    await supervisor.stop()
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "updates": len(payloads),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(payloads) / elapsed, 1),
+        "restarts": supervisor.restarts,
+    }
+
+
+async def run(
+    workers: List[int], users: int, updates_per_user: int, staff: int, latency: float
+) -> List[Dict[str, float]]:
+    """
+    Load the benchmark database once and measure every worker count.
+    """
+    directory = tempfile.mkdtemp(prefix="shard-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ[LATENCY_ENV] = str(latency)
+    engine = create_engine(get_database_url())
+    await init_models(engine)
+    await populate_database(engine, SyntheticOrganization(staff))
+    await engine.dispose()
+
+    payloads = [update for _, update in generate_stream(users, updates_per_user, rate=1000.0)]
+    return [await measure(count, payloads) for count in workers]
+
+
+def main() -> None:
+    """Run the scaling benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--updates-per-user", type=int, default=10)
+    parser.add_argument("--staff", type=int, default=1000,
+                        help="synthetic staff in the database; user ids 1..staff")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Bot API latency")
+    args = parser.parse_args()
+    results = asyncio.run(
+        run(args.workers, args.users, args.updates_per_user, args.staff, args.latency)
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Benchmark suite for scheduling, validation and handler hot paths.
+
+Every size builds a synthetic organization (see benchmarks.synthetic), loads
+it into an in-memory SQLite database and times:
+
+- ``get_shift_schedule`` over one and ten years,
+- ``validate_shift_assignment`` for every slot of a month in every department,
+- ``check_coverage`` for the same month and headcounts as arrays,
+- ``assign_shifts`` for one week of slots over all staff,
+- ``ConflictChecker.check_all`` for a month of proposed assignments of all staff,
+- ``AvailabilityMatrix.rank`` for replacements in a month holding those assignments,
+- the /myshift, /schedule, menu and page-callback handlers, called with real
+  Update objects and callback contexts of an Application running on a StubBot.
+
+Results are printed (or written) as JSON. With ``--baseline`` the run is
+compared against stored results and exits with status 1 when a case's median
+is more than ``--tolerance`` slower than its baseline.
+
+Usage: python -m benchmarks.suite [--sizes small medium] [--baseline benchmarks/baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+
+from benchmarks.fakes import StubBot, callback_update, message_update
+from benchmarks.synthetic import SIZES, SyntheticOrganization, populate_database
+from bot.commands.basic_commands import my_shifts, schedule
+from bot.handlers.handlers import handle_callback, handle_message
+from bot.keyboards.callback_data import PAGE_FORWARD, CallbackAction, encode_callback
+from bot.main import build_application
+from bot.profiles import profile_cache
+from db.base import configure_database, create_engine, dispose_engine, init_models
+from utils.assignment import assign_shifts
+from utils.availability import AvailabilityMatrix
+from utils.conflicts import ConflictChecker
+from utils.coverage import check_coverage, get_shift_type_codes
+from utils.pagination import cursor_to_args
+from utils.scheduler import (
+    get_shift_schedule,
+    get_week_start,
+    iter_shift_schedule,
+    validate_shift_assignment,
+)
+from utils.translations import Language, get_translation
+
+DEFAULT_SIZES = ("small", "medium")
+DEFAULT_TOLERANCE = 0.25
+
+Result = Dict[str, float]
+
+
+def _summarize(samples: List[float], number: int) -> Result:
+    per_call = [sample / number * 1000 for sample in samples]
+    return {
+        "median_ms": round(statistics.median(per_call), 4),
+        "min_ms": round(min(per_call), 4),
+        "mean_ms": round(statistics.fmean(per_call), 4),
+        "rounds": len(samples),
+        "calls_per_round": number,
+    }
+
+
+def measure(function: Callable[[], Any], rounds: int = 5, number: int = 1) -> Result:
+    """
+    Time ``number`` calls of a function, ``rounds`` times, after one warm-up call.
+    """
+    function()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples, number)
+
+
+async def measure_async(
+    function: Callable[[], Awaitable[Any]], rounds: int = 5, number: int = 1
+) -> Result:
+    """
+    Time ``number`` awaited calls of a coroutine function, ``rounds`` times.
+    """
+    await function()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(number):
+            await function()
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples, number)
+
+
+def bench_schedule_generation(results: Dict[str, Result]) -> None:
+    """Time schedule generation over long horizons; independent of staff size."""
+    start = datetime(2024, 1, 7)
+    for days in (365, 3650):
+        end = start + timedelta(days=days - 1)
+        results[f"get_shift_schedule[{days}d]"] = measure(
+            lambda: get_shift_schedule(start, end), rounds=5
+        )
+
+
+def bench_scheduling(
+    results: Dict[str, Result], size: str, organization: SyntheticOrganization
+) -> None:
+    """Time validation and assignment for one organization size."""
+    start = datetime.combine(get_week_start(datetime(2024, 1, 10).date()), datetime.min.time())
+    month_slots = list(iter_shift_schedule(start, start + timedelta(days=29)))
+    month = [slot.to_shift() for slot in month_slots]
+    staff_counts = [index % 6 for index in range(organization.department_count)]
+
+    def validate_month() -> int:
+        return sum(
+            validate_shift_assignment(shift, count)
+            for count in staff_counts
+            for shift in month
+        )
+
+    results[f"validate_month[{size}]"] = measure(validate_month, rounds=5)
+
+    # The same check as one array of every department's slots
+    shift_types = np.tile(
+        get_shift_type_codes(shift.shift_type for shift in month), len(staff_counts)
+    )
+    assigned_slots = np.repeat(np.arange(len(shift_types)), np.repeat(staff_counts, len(month)))
+    results[f"coverage_month[{size}]"] = measure(
+        lambda: check_coverage(shift_types, assigned_slots).is_covered, rounds=5
+    )
+
+    week = get_shift_schedule(start, start + timedelta(days=6))
+    staff = organization.staff_members()
+    results[f"assign_week[{size}]"] = measure(lambda: assign_shifts(week, staff), rounds=3)
+
+    # Every staff member proposed for three slots a week, in their department's month
+    rng = random.Random(organization.seed)
+    proposals = [
+        (member.staff_id, (organization.department_of(index), slot_index), month[slot_index])
+        for index, member in enumerate(staff)
+        for slot_index in rng.sample(range(len(month)), 12)
+    ]
+    results[f"check_month[{size}]"] = measure(
+        lambda: ConflictChecker(staff).check_all(proposals), rounds=3
+    )
+
+    # The top ten replacements for twenty slots, with the proposals held
+    matrix = AvailabilityMatrix(
+        start.date(), 30, staff,
+        [organization.department_of(index) for index in range(len(staff))],
+    )
+    matrix.add_many(
+        (staff_id, month_slots[slot_index].date.date(), month_slots[slot_index].index)
+        for staff_id, (_, slot_index), _ in proposals
+    )
+    targets = [
+        (month_slots[slot_index].date.date(), month_slots[slot_index].index, department)
+        for slot_index, department in zip(
+            rng.sample(range(len(month)), 20),
+            (rng.randrange(organization.department_count) for _ in range(20)),
+        )
+    ]
+    results[f"replacement_rank[{size}]"] = measure(
+        lambda: [matrix.rank(day, slot, 10, department) for day, slot, department in targets],
+        rounds=5,
+    )
+
+
+async def bench_handlers(
+    results: Dict[str, Result], size: str, organization: SyntheticOrganization
+) -> None:
+    """Time the response path of the read-heavy handlers against the loaded database."""
+    application = build_application(Application.builder().bot(StubBot()))
+    # A staff member in the last department, so lookups do not hit the first rows
+    telegram_id = organization.telegram_id(organization.staff_count - 1)
+    menu_text = get_translation("my_shifts", Language.ENGLISH)
+
+    async with application:
+        bot = application.bot
+
+        def context_for(payload: Dict[str, Any]) -> Any:
+            update = Update.de_json(payload, bot)
+            return update, CallbackContext.from_update(update, application)
+
+        myshift_update, myshift_context = context_for(message_update(1, telegram_id, "/myshift"))
+        schedule_update, schedule_context = context_for(message_update(2, telegram_id, "/schedule"))
+        menu_update, menu_context = context_for(message_update(3, telegram_id, menu_text))
+        page_data = encode_callback(
+            CallbackAction.SCHEDULE_PAGE,
+            PAGE_FORWARD,
+            *cursor_to_args(datetime.combine(get_week_start(datetime.now().date()), datetime.min.time()), 0),
+        )
+        page_update, page_context = context_for(callback_update(4, telegram_id, page_data))
+
+        cases = {
+            "my_shifts": lambda: my_shifts(myshift_update, myshift_context),
+            "schedule": lambda: schedule(schedule_update, schedule_context),
+            "menu_my_shifts": lambda: handle_message(menu_update, menu_context),
+            "schedule_page_callback": lambda: handle_callback(page_update, page_context),
+        }
+        for name, handler in cases.items():
+            results[f"handler.{name}[{size}]"] = await measure_async(handler, rounds=5, number=10)
+
+
+async def run(sizes: List[str], seed: int = 0) -> Dict[str, Any]:
+    """
+    Run every benchmark for the given sizes and return the JSON-ready report.
+    """
+    results: Dict[str, Result] = {}
+    datasets: Dict[str, Dict[str, int]] = {}
+    bench_schedule_generation(results)
+
+    for size in sizes:
+        organization = SyntheticOrganization(SIZES[size], seed=seed)
+        bench_scheduling(results, size, organization)
+
+        engine = create_engine("sqlite+aiosqlite:///:memory:")
+        configure_database(engine)
+        await init_models(engine)
+        datasets[size] = await populate_database(engine, organization)
+        profile_cache.memory.clear()
+        await bench_handlers(results, size, organization)
+        await dispose_engine()
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": seed,
+            "sizes": {size: SIZES[size] for size in sizes},
+            "datasets": datasets,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float
+) -> List[Dict[str, Any]]:
+    """
+    List the cases whose median is more than ``tolerance`` slower than the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result["median_ms"] / reference["median_ms"] if reference["median_ms"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append({
+                "case": name,
+                "baseline_ms": reference["median_ms"],
+                "median_ms": result["median_ms"],
+                "ratio": round(ratio, 2),
+            })
+    return regressions
+
+
+def main() -> None:
+    """Run the suite, optionally compare it with a baseline, and print JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this file instead of stdout")
+    parser.add_argument("--baseline", help="compare against the report stored in this file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown of a case's median, as a fraction")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.sizes, args.seed))
+    regressions: Optional[List[Dict[str, Any]]] = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report["results"], baseline["results"], args.tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    if regressions:
+        for regression in regressions:
+            print(
+                f"Regression in {regression['case']}: {regression['median_ms']} ms "
+                f"vs {regression['baseline_ms']} ms ({regression['ratio']}x)",
+                file=sys.stderr,
+            )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic departments, staff, preferences and shift histories for benchmarks.
+
+Everything is derived from a seed, so two runs of the same size produce the
+same data and their timings can be compared.
+"""
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from db.models import Department, Shift, ShiftAssignment, User, UserPreference
+from db.models.user import UserRole
+from db.repository.shift_repository import ShiftRepository
+from db.repository.workload_repository import WorkloadRepository
+from utils.assignment import WEEKDAY_NAMES, StaffMember
+from utils.scheduler import ShiftType, get_week_start
+from utils.translations import Language
+
+# Staff counts of the named benchmark sizes
+SIZES = {"small": 10, "medium": 1000, "large": 50000}
+
+DEPARTMENT_SIZE = 50
+
+# Rows per executemany batch when loading the database
+INSERT_BATCH_SIZE = 10000
+
+
+class SyntheticOrganization:
+    """
+    Staff and preferences of a synthetic organization.
+
+    Staff member ``i`` has Telegram id ``i + 1`` and belongs to department
+    ``i // DEPARTMENT_SIZE``; the first member of every department is its
+    shift manager.
+    """
+    def __init__(self, staff_count: int, seed: int = 0):
+        self.staff_count = staff_count
+        self.seed = seed
+        self.department_count = max(1, -(-staff_count // DEPARTMENT_SIZE))
+        rng = random.Random(seed)
+        self.preferences = [_random_preference(rng) for _ in range(staff_count)]
+
+    def telegram_id(self, index: int) -> int:
+        """Telegram id of the staff member at ``index``."""
+        return index + 1
+
+    def department_of(self, index: int) -> int:
+        """Zero-based department of the staff member at ``index``."""
+        return index // DEPARTMENT_SIZE
+
+    def staff_members(self) -> List[StaffMember]:
+        """
+        Build the assignment engine's view of the staff.
+        """
+        return [
+            StaffMember.from_preference(str(self.telegram_id(index)), UserPreference(**preference))
+            for index, preference in enumerate(self.preferences)
+        ]
+
+
+def _random_preference(rng: random.Random) -> Dict[str, Any]:
+    shift_types = list(ShiftType)
+    weekdays = list(WEEKDAY_NAMES)
+    return {
+        "preferred_shifts": [
+            shift_type.name for shift_type in rng.sample(shift_types, rng.randint(0, 3))
+        ],
+        "unavailable_days": rng.sample(weekdays, rng.randint(0, 2)),
+        "max_shifts_per_week": rng.choice((None, 3, 4, 5, 6)),
+        "min_rest_days": rng.choice((None, 1, 2)),
+    }
+
+
+async def _insert(engine: AsyncEngine, model: Any, rows: List[Dict[str, Any]]) -> None:
+    async with engine.begin() as connection:
+        for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+            await connection.execute(insert(model), rows[offset:offset + INSERT_BATCH_SIZE])
+
+
+async def populate_database(
+    engine: AsyncEngine,
+    organization: SyntheticOrganization,
+    history_weeks: int = 1,
+    upcoming_weeks: int = 2,
+    shifts_per_week: int = 3,
+    today: Optional[date] = None
+) -> Dict[str, int]:
+    """
+    Load the organization and its shift history into an empty database.
+
+    Every department gets the template shifts of every day, from
+    ``history_weeks`` before the current week to ``upcoming_weeks`` after it,
+    and every staff member works ``shifts_per_week`` of their department's
+    shifts each week, and the workload rollups are backfilled. Returns the
+    number of rows created per table.
+    """
+    rng = random.Random(organization.seed + 1)
+    first_day = get_week_start(today or date.today()) - timedelta(weeks=history_weeks)
+    weeks = history_weeks + 1 + upcoming_weeks
+
+    await _insert(engine, Department, [
+        {"name": f"Department {index + 1}"} for index in range(organization.department_count)
+    ])
+    async with engine.connect() as connection:
+        department_ids = list((await connection.execute(
+            select(Department.id).order_by(Department.id)
+        )).scalars())
+
+    await _insert(engine, User, [
+        {
+            "telegram_id": organization.telegram_id(index),
+            "username": f"user{organization.telegram_id(index)}",
+            "first_name": f"User{organization.telegram_id(index)}",
+            "role": UserRole.SHIFT_MANAGER if index % DEPARTMENT_SIZE == 0 else UserRole.EMPLOYEE,
+            "department_id": department_ids[organization.department_of(index)],
+            "language": Language.ENGLISH,
+        }
+        for index in range(organization.staff_count)
+    ])
+    async with engine.connect() as connection:
+        user_ids = list((await connection.execute(select(User.id).order_by(User.id))).scalars())
+
+    await _insert(engine, UserPreference, [
+        dict(preference, user_id=user_ids[index])
+        for index, preference in enumerate(organization.preferences)
+    ])
+
+    async with AsyncSession(engine) as session:
+        await ShiftRepository(session).materialize_schedule(
+            department_ids, first_day, first_day + timedelta(weeks=weeks, days=-1)
+        )
+        await session.commit()
+    # shift ids per department and week, in date order
+    shifts_by_week: Dict[Tuple[int, int], List[int]] = {}
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            select(Shift.id, Shift.department_id, Shift.date).order_by(Shift.id)
+        )
+        for shift_id, department_id, shift_date in result:
+            week = (shift_date.date() - first_day).days // 7
+            shifts_by_week.setdefault((department_id, week), []).append(shift_id)
+
+    assignments = []
+    for index, user_id in enumerate(user_ids):
+        department_id = department_ids[organization.department_of(index)]
+        for week in range(weeks):
+            for shift_id in rng.sample(shifts_by_week[(department_id, week)], shifts_per_week):
+                assignments.append({"user_id": user_id, "shift_id": shift_id, "status": "assigned"})
+    await _insert(engine, ShiftAssignment, assignments)
+    async with AsyncSession(engine) as session:
+        rollups = await WorkloadRepository(session).backfill()
+        await session.commit()
+
+    return {
+        "departments": len(department_ids),
+        "users": len(user_ids),
+        "shifts": sum(len(ids) for ids in shifts_by_week.values()),
+        "assignments": len(assignments),
+        "workload_rollups": rollups,
+    }
@@ -0,0 +1,130 @@
+"""
+Measure webhook-mode throughput by posting synthetic updates to a local server.
+
+Each synthetic user sends /start followed by menu button presses. The bot
+talks to a StubBot and an in-memory SQLite database, so nothing leaves the box.
+
+Usage: python -m benchmarks.webhook_throughput [--users 200] [--updates-per-user 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+# Synthetic users are far above the inbound limits on purpose
+os.environ.setdefault("RATE_LIMIT_USER_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_USER_BURST", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_RATE", "1000000")
+os.environ.setdefault("RATE_LIMIT_GLOBAL_BURST", "1000000")
+
+from aiohttp import ClientSession, TCPConnector
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+
+from benchmarks.fakes import StubBot, message_update
+from bot.main import build_application
+from bot.webhook import WEBHOOK_PATH, serve_webhook
+from db.base import configure_database, create_engine, init_models
+from utils.translations import Language, get_translation
+
+MENU_KEYS = ("my_shifts", "shift_schedule", "request_swap")
+
+
+def synthetic_updates(users: int, updates_per_user: int) -> List[List[Dict[str, Any]]]:
+    """
+    Build the update payloads of every user, in the order each user sends them.
+    """
+    update_ids = iter(range(1, users * (updates_per_user + 1) + 1))
+    streams = []
+    for user_id in range(1, users + 1):
+        stream = [message_update(next(update_ids), user_id, "/start")]
+        for index in range(updates_per_user):
+            label = get_translation(MENU_KEYS[index % len(MENU_KEYS)], Language.ENGLISH)
+            stream.append(message_update(next(update_ids), user_id, label))
+        streams.append(stream)
+    return streams
+
+
+async def run(
+    users: int, updates_per_user: int, concurrency: int, latency: float, port: int
+) -> Dict[str, float]:
+    """
+    Serve the bot on a local webhook and time how long the synthetic load takes.
+    """
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    configure_database(engine)
+    await init_models(engine)
+
+    application = build_application(
+        Application.builder().bot(StubBot(latency=latency)), max_concurrent_updates=concurrency
+    )
+    streams = synthetic_updates(users, updates_per_user)
+    expected = sum(len(stream) for stream in streams)
+    processed = 0
+    done = asyncio.Event()
+
+    async def count(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal processed
+        processed += 1
+        if processed == expected:
+            done.set()
+
+    application.add_handler(TypeHandler(Update, count), group=1)
+
+    stop_event = asyncio.Event()
+    server = asyncio.create_task(
+        serve_webhook(application, "127.0.0.1", port, webhook_url=None, stop_event=stop_event)
+    )
+    url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+
+    # Wait for the server to accept connections
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+
+    async with ClientSession(connector=TCPConnector(limit=100)) as session:
+
+        async def send(stream: List[Dict[str, Any]]) -> None:
+            for payload in stream:
+                async with session.post(url, json=payload) as response:
+                    response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(stream) for stream in streams))
+        await done.wait()
+        elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    await server
+    return {
+        "updates": expected,
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(expected / elapsed, 1),
+        "concurrency": concurrency,
+        "bot_latency": latency,
+    }
+
+
+def main() -> None:
+    """Run the throughput benchmark and print the result as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates-per-user", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated Bot API latency")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    result = asyncio.run(
+        run(args.users, args.updates_per_user, args.concurrency, args.latency, args.port)
+    )
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
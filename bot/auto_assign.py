@@ -0,0 +1,55 @@
+"""
+Automatic staffing of published shifts with the cost-matrix engine.
+
+The published shifts of a department are loaded with the assignments they
+already hold and handed to utils.assignment.assign_shifts with the
+department's users; the seats it fills are written as ShiftAssignment rows,
+so assignment listeners (workload rollups, on-call and replacement indexes)
+see them. Shifts from the start of the first week on are loaded so weekly
+caps count the shifts already worked that week, and the night before it
+so rest rules hold across the first day. The workload of past weeks,
+read from the rollups, makes the engine favour the least loaded users.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from bot.workload import get_staff_members
+from db.base import get_session
+from db.repository.assignment_repository import AssignmentRepository
+from db.repository.shift_repository import ShiftRepository
+from utils.assignment import assign_shifts
+from utils.scheduler import Shift, get_scheduled_slot, get_week_start
+
+
+async def auto_assign(department_ids: List[int], start: date, end: date) -> Tuple[int, int]:
+    """
+    Fill the departments' shifts of an inclusive date range up to their minimum staffing.
+
+    Returns the number of assignments added and of seats that could not be
+    filled without breaking rest rules, days off or weekly caps.
+    """
+    first = get_week_start(start) - timedelta(days=1)
+    added = unfilled = 0
+    for department_id in department_ids:
+        staff = await get_staff_members(department_id)
+        async with get_session() as session:
+            rows = await ShiftRepository(session).get_period_shifts(first, end, [department_id])
+            repository = AssignmentRepository(session)
+            held = await repository.get_active_between(first, end, [department_id])
+
+            shifts: Dict[int, Shift] = {
+                row.id: get_scheduled_slot(row.date, row.slot).to_shift() for row in rows
+            }
+            for row in held:
+                if row.shift_id in shifts:
+                    shifts[row.shift_id].assigned_staff.append(str(row.user_id))
+            before = {shift_id: len(shift.assigned_staff) for shift_id, shift in shifts.items()}
+
+            result = assign_shifts(list(shifts.values()), staff, fill_from=start)
+            added += await repository.assign(
+                (shift_id, int(staff_id))
+                for shift_id, shift in shifts.items()
+                for staff_id in shift.assigned_staff[before[shift_id]:]
+            )
+            unfilled += sum(missing for _, missing in result.unfilled)
+    return added, unfilled
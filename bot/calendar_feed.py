@@ -0,0 +1,112 @@
+"""
+Per-user iCalendar feeds served next to the webhook.
+
+Feed URLs carry an HMAC of the user's Telegram id, so they can be added to
+calendar apps without further authentication. Responses are validated with
+an ETag derived from the user's assignments, so unchanged feeds are answered
+with 304 without rendering.
+"""
+import hashlib
+import hmac
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from aiohttp import web
+
+from db.base import get_session
+from db.repository.shift_repository import ShiftRepository
+from utils.export import iter_ics
+
+CALENDAR_SECRET = os.getenv("CALENDAR_SECRET", "")
+CALENDAR_BASE_URL = os.getenv("CALENDAR_BASE_URL", "").rstrip("/")
+CALENDAR_ROUTE = r"/calendar/{telegram_id:\d+}/{token:[0-9a-f]+}.ics"
+
+# Days before and after today covered by a feed
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 180
+
+# Rendered bytes collected before each write to the client
+WRITE_CHUNK_SIZE = 16 * 1024
+
+
+def calendar_token(telegram_id: int) -> str:
+    """
+    Get the feed token of a user.
+    """
+    return hmac.new(
+        CALENDAR_SECRET.encode(), str(telegram_id).encode(), hashlib.sha256
+    ).hexdigest()[:32]
+
+
+def calendar_feed_url(telegram_id: int) -> Optional[str]:
+    """
+    Get the feed URL of a user, or None if feeds are not configured.
+    """
+    if not CALENDAR_SECRET or not CALENDAR_BASE_URL:
+        return None
+    return f"{CALENDAR_BASE_URL}/calendar/{telegram_id}/{calendar_token(telegram_id)}.ics"
+
+
+def get_feed_range(today: date) -> Tuple[date, date]:
+    """Get the inclusive date range of feeds served on the given day."""
+    return today - timedelta(days=FEED_PAST_DAYS), today + timedelta(days=FEED_FUTURE_DAYS)
+
+
+def _is_fresh(request: web.Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.if_modified_since
+    return (
+        if_modified_since is not None
+        and last_modified is not None
+        and last_modified <= if_modified_since
+    )
+
+
+async def handle_calendar_feed(request: web.Request) -> web.StreamResponse:
+    """
+    Serve a user's shifts as an iCalendar feed.
+    """
+    telegram_id = int(request.match_info["telegram_id"])
+    if not CALENDAR_SECRET or not hmac.compare_digest(
+        request.match_info["token"], calendar_token(telegram_id)
+    ):
+        raise web.HTTPNotFound()
+
+    start, end = get_feed_range(date.today())
+    async with get_session() as session:
+        count, changed_at = await ShiftRepository(session).get_user_export_version(
+            telegram_id, start, end
+        )
+    version = f"{telegram_id}:{start}:{end}:{count}:{changed_at}"
+    etag = f'"{hashlib.sha1(version.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    last_modified = None
+    if changed_at is not None:
+        # Stored times are naive UTC; HTTP dates have second precision
+        last_modified = changed_at.replace(microsecond=0, tzinfo=timezone.utc)
+        headers["Last-Modified"] = last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    if _is_fresh(request, etag, last_modified):
+        return web.Response(status=304, headers=headers)
+
+    response = web.StreamResponse(headers=headers)
+    response.content_type = "text/calendar"
+    response.charset = "utf-8"
+    await response.prepare(request)
+    async with get_session() as session:
+        rows = ShiftRepository(session).stream_user_export(telegram_id, start, end)
+        chunk = []
+        size = 0
+        async for text in iter_ics(rows, "My shifts"):
+            data = text.encode("utf-8")
+            chunk.append(data)
+            size += len(data)
+            if size >= WRITE_CHUNK_SIZE:
+                await response.write(b"".join(chunk))
+                chunk, size = [], 0
+        await response.write(b"".join(chunk))
+    await response.write_eof()
+    return response
@@ -1,16 +1,72 @@
 """
 Admin commands for supervisors.
 """
-from typing import Any, Dict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from db.models.user import User
+from bot.auto_assign import auto_assign
+from bot.keyboards.keyboards import get_swap_matches_keyboard
+from bot.notifications import send_notification
+from bot.profiles import UserProfile, get_user_profile, invalidate_user_profile
+from bot.replacements import (
+    find_absence, find_replacements, get_replacement_range, offer_replacement
+)
+from bot.swaps import SWAP_MATCHES_KEY, find_swap_proposals
+from bot.workload import get_workload_report
+from db.base import get_session
+from db.models.user import User, UserRole
 from db.models.shift import Shift
 from db.models.shift_assignment import ShiftAssignment
+from db.repository.department_repository import DepartmentRepository
+from db.repository.shift_repository import ShiftRepository
+from db.repository.user_repository import UserRepository
+from utils.coverage import check_coverage, get_shift_type_codes
+from utils.metrics import instrumented
+from utils.scheduler import count_shift_slots, get_scheduled_slot, get_week_start
+from utils.translations import Language
+from utils.workload import WORKLOAD_FIELDS
 
+# User fields editable through /manage_users and how to parse them
+USER_FIELDS: Dict[str, Callable[[str], Any]] = {
+    "role": UserRole,
+    "language": Language,
+}
 
+# Roles only admins may grant, and users holding them only admins may edit
+ADMIN_ONLY_ROLES = {UserRole.ADMIN, UserRole.DEPARTMENT_MANAGER}
+
+# Weeks published by /publish by default (a quarter) and at most
+PUBLISH_WEEKS = 13
+MAX_PUBLISH_WEEKS = 53
+
+# Weeks staffed by /auto_assign by default and at most
+AUTO_ASSIGN_WEEKS = 2
+MAX_AUTO_ASSIGN_WEEKS = 13
+
+# Days checked by /coverage by default and at most, and the slots listed
+COVERAGE_DAYS = 30
+MAX_COVERAGE_DAYS = 92
+COVERAGE_LISTED_SLOTS = 15
+
+# Weeks summed by /department_report by default (a quarter) and at most, and the users listed
+REPORT_WEEKS = 13
+MAX_REPORT_WEEKS = 53
+REPORT_LISTED_USERS = 20
+
+# Swap matches listed by /match_swaps
+LISTED_SWAP_MATCHES = 10
+
+# Replacement candidates listed by /replace, and how many of them are offered the shift
+REPLACEMENT_CANDIDATES = 10
+REPLACEMENT_OFFERS = 3
+
+
+@instrumented("command", "create_shift")
 async def create_shift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Create a new shift.
@@ -26,6 +82,7 @@ async def create_shift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
 
 
+@instrumented("command", "assign_shift")
 async def assign_shift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Assign a shift to a user.
@@ -40,6 +97,7 @@ async def assign_shift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
 
 
+@instrumented("command", "approve_swap")
 async def approve_swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Approve a shift swap request.
@@ -52,16 +110,398 @@ async def approve_swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
 
 
+async def update_user(telegram_id: int, **fields: Any) -> Optional[User]:
+    """
+    Update a user and invalidate their cached profile.
+    """
+    async with get_session() as session:
+        updated = await UserRepository(session).update_user(telegram_id, **fields)
+    await invalidate_user_profile(telegram_id)
+    return updated
+
+
+@instrumented("command", "manage_users")
 async def manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Manage users in the department.
+
+    Usage: /manage_users role <telegram_id> <role>
+           /manage_users language <telegram_id> <en|ar|he>
+    Admins may edit anyone. Other supervisors may only edit the employees and
+    shift managers of their own department, and not make them managers or admins.
     """
     user = update.effective_user
-    # TODO: Check if user is supervisor
-    # TODO: Implement user management logic
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    if len(args) == 3 and args[0] in USER_FIELDS:
+        field, telegram_id, value = args
+        try:
+            target_id, parsed = int(telegram_id), USER_FIELDS[field](value)
+        except ValueError:
+            await update.message.reply_text(f"Invalid {field}: {value}")
+            return
+        async with get_session() as session:
+            target = await UserRepository(session).get_by_telegram_id(target_id)
+        if target is None:
+            await update.message.reply_text(f"User {telegram_id} not found.")
+            return
+        if profile.role != UserRole.ADMIN and (
+            profile.department_id is None
+            or target.department_id != profile.department_id
+            or target.role in ADMIN_ONLY_ROLES
+            or parsed in ADMIN_ONLY_ROLES
+        ):
+            await update.message.reply_text(
+                f"You may not change the {field} of user {telegram_id}."
+            )
+            return
+        if await update_user(target_id, **{field: parsed}) is None:
+            await update.message.reply_text(f"User {telegram_id} not found.")
+        else:
+            await update.message.reply_text(f"Updated {field} of user {telegram_id} to {value}.")
+        return
+
     await update.message.reply_text(
         "To manage users, please select one of the following options:\n"
         "1. Add new user\n"
         "2. Modify user permissions\n"
         "3. Delete user"
-    ) 
\ No newline at end of file
+    )
+
+
+async def _get_managed_department_ids(session: AsyncSession, profile: UserProfile) -> List[int]:
+    # Admins manage every department, other supervisors their own
+    if profile.role == UserRole.ADMIN:
+        return await DepartmentRepository(session).get_ids()
+    return [profile.department_id] if profile.department_id is not None else []
+
+
+@instrumented("command", "publish")
+async def publish(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Create the template shifts of the coming weeks.
+
+    Usage: /publish [weeks]
+    Admins publish for every department, other supervisors for their own.
+    Weeks that are already published are left unchanged.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    try:
+        weeks = int(args[0]) if args else PUBLISH_WEEKS
+    except ValueError:
+        weeks = 0
+    if not 1 <= weeks <= MAX_PUBLISH_WEEKS:
+        await update.message.reply_text(f"Usage: /publish [weeks], at most {MAX_PUBLISH_WEEKS}")
+        return
+
+    start = get_week_start(date.today())
+    end = start + timedelta(weeks=weeks, days=-1)
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+        if not department_ids:
+            await update.message.reply_text("You are not assigned to a department.")
+            return
+        created = await ShiftRepository(session).materialize_schedule(department_ids, start, end)
+
+    await update.message.reply_text(
+        f"Published {start:%Y-%m-%d} to {end:%Y-%m-%d} for {len(department_ids)} "
+        f"department(s): {created} new shifts."
+    )
+
+
+@instrumented("command", "auto_assign")
+async def auto_assign_shifts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Staff the published shifts of the coming weeks from tomorrow on.
+
+    Usage: /auto_assign [weeks]
+    Admins staff every department, other supervisors their own. Shifts
+    already held are kept; open seats are filled by preference and workload
+    without breaking rest rules, days off or weekly caps.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    try:
+        weeks = int(args[0]) if args else AUTO_ASSIGN_WEEKS
+    except ValueError:
+        weeks = 0
+    if not 1 <= weeks <= MAX_AUTO_ASSIGN_WEEKS:
+        await update.message.reply_text(
+            f"Usage: /auto_assign [weeks], at most {MAX_AUTO_ASSIGN_WEEKS}"
+        )
+        return
+
+    start = date.today() + timedelta(days=1)
+    end = get_week_start(date.today()) + timedelta(weeks=weeks, days=-1)
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+    if not department_ids:
+        await update.message.reply_text("You are not assigned to a department.")
+        return
+    added, unfilled = await auto_assign(department_ids, start, end)
+
+    lines = [
+        f"Staffed {start:%Y-%m-%d} to {end:%Y-%m-%d} for {len(department_ids)} "
+        f"department(s): {added} new assignments."
+    ]
+    if unfilled:
+        lines.append(f"{unfilled} seats could not be filled legally, see /coverage.")
+    await update.message.reply_text("\n".join(lines))
+
+
+@instrumented("command", "coverage")
+async def coverage(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Report understaffed and overstaffed shifts of the coming days.
+
+    Usage: /coverage [days]
+    Admins see every department, other supervisors their own.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    try:
+        days = int(args[0]) if args else COVERAGE_DAYS
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_COVERAGE_DAYS:
+        await update.message.reply_text(f"Usage: /coverage [days], at most {MAX_COVERAGE_DAYS}")
+        return
+
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+        if not department_ids:
+            await update.message.reply_text("You are not assigned to a department.")
+            return
+        repository = ShiftRepository(session)
+        shifts = await repository.get_period_shifts(start, end, department_ids)
+        held = await repository.get_active_shift_ids(start, end, department_ids)
+
+    # Shift ids are sorted, so every assignment's slot position is a binary search away
+    shift_ids = np.fromiter((shift.id for shift in shifts), dtype=np.int64, count=len(shifts))
+    report = check_coverage(
+        get_shift_type_codes(shift.shift_type for shift in shifts),
+        np.searchsorted(shift_ids, np.asarray(held, dtype=np.int64)),
+    )
+    first_day = datetime.combine(start, datetime.min.time())
+    expected = count_shift_slots(first_day, first_day + timedelta(days=days - 1))
+    unpublished = expected * len(department_ids) - len(shifts)
+
+    lines = [
+        f"Coverage {start:%Y-%m-%d} to {end:%Y-%m-%d}, {len(department_ids)} department(s):",
+        f"{len(shifts)} shifts, {len(report.understaffed)} understaffed "
+        f"({report.total_deficit} staff missing), {len(report.overstaffed)} overstaffed.",
+    ]
+    if unpublished > 0:
+        lines.append(f"{unpublished} shifts are not published yet, see /publish.")
+    if len(report.understaffed):
+        lines.append("")
+    for position in report.understaffed[:COVERAGE_LISTED_SLOTS]:
+        shift = shifts[position]
+        description = get_scheduled_slot(shift.date, shift.slot).description
+        lines.append(
+            f"📅 {shift.date:%Y-%m-%d} {description} - {shift.department}: "
+            f"{report.headcount[position]}/{report.minimum[position]}"
+        )
+    await update.message.reply_text("\n".join(lines))
+
+
+def _format_workload(row: Any) -> str:
+    return (
+        f"{row.hours:g}h, {row.shifts} shifts, {row.nights} nights, {row.weekends} weekends, "
+        f"{row.swaps} swaps, {row.cancellations} cancellations"
+    )
+
+
+@instrumented("command", "department_report")
+async def department_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Rank staff by their workload over the last weeks.
+
+    Usage: /department_report [weeks] [hours|shifts|nights|weekends|swaps|cancellations]
+    Totals come from the weekly workload rollups; admins see every department.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    weeks, order_by = REPORT_WEEKS, "hours"
+    for arg in args[:2]:
+        if arg.isdigit():
+            weeks = int(arg)
+        elif arg.lower() in WORKLOAD_FIELDS:
+            order_by = arg.lower()
+        else:
+            weeks = 0
+    if not 1 <= weeks <= MAX_REPORT_WEEKS:
+        await update.message.reply_text(
+            f"Usage: /department_report [weeks] [{'|'.join(WORKLOAD_FIELDS)}], "
+            f"at most {MAX_REPORT_WEEKS} weeks"
+        )
+        return
+
+    end = date.today()
+    start = get_week_start(end) - timedelta(weeks=weeks - 1)
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+    if not department_ids:
+        await update.message.reply_text("You are not assigned to a department.")
+        return
+    rows = await get_workload_report(department_ids, start, end, order_by)
+    if not rows:
+        await update.message.reply_text("No shifts were worked in this period.")
+        return
+
+    lines = [f"Workload {start:%Y-%m-%d} to {end:%Y-%m-%d} by {order_by}, {len(rows)} staff:", ""]
+    for row in rows[:REPORT_LISTED_USERS]:
+        lines.append(f"👤 @{row.username}: {_format_workload(row)}")
+    averages = {
+        field: sum(getattr(row, field) for row in rows) / len(rows) for field in WORKLOAD_FIELDS
+    }
+    lines.append("")
+    lines.append(
+        "Average: " + ", ".join(f"{averages[field]:.1f} {field}" for field in WORKLOAD_FIELDS)
+    )
+    await update.message.reply_text("\n".join(lines))
+
+
+@instrumented("command", "match_swaps")
+async def match_swaps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Match pending swap requests into direct and multi-party swaps.
+
+    Usage: /match_swaps
+    Lists the swaps that respect rest rules, with a button approving exactly
+    the listed ones. Admins match requests across every department.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    if context.args:
+        await update.message.reply_text("Usage: /match_swaps")
+        return
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+    if not department_ids:
+        await update.message.reply_text("You are not assigned to a department.")
+        return
+
+    proposals = await find_swap_proposals(department_ids)
+    if not proposals.matches:
+        await update.message.reply_text(
+            f"None of the {proposals.pending} pending swap requests can be matched."
+        )
+        return
+
+    listed = proposals.matches[:LISTED_SWAP_MATCHES]
+    lines = [
+        f"{len(proposals.matches)} swaps match {proposals.matched} of "
+        f"{proposals.pending} pending requests:"
+    ]
+    for match in listed:
+        kind = "Direct swap" if match.is_direct else f"{len(match)}-way swap"
+        lines.append("")
+        lines.append(f"🔁 {kind}:")
+        lines.extend(f"  {line}" for line in proposals.describe(match))
+    if len(listed) < len(proposals.matches):
+        lines.append("")
+        lines.append(f"Only the {len(listed)} swaps listed are approved by the button.")
+    message = await update.message.reply_text(
+        "\n".join(lines), reply_markup=get_swap_matches_keyboard(profile.language)
+    )
+    # Kept server-side so the button approves exactly what this message lists
+    context.chat_data[SWAP_MATCHES_KEY] = {
+        "message_id": message.message_id,
+        "request_ids": [match.request_ids for match in listed],
+    }
+
+
+@instrumented("command", "replace")
+async def replace(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Find a replacement for a user's shift and offer it to the best candidates.
+
+    Usage: /replace @username [YYYY-MM-DD]
+    Without a date the user's next shift is replaced. Only shifts from today
+    to REPLACEMENT_HORIZON_WEEKS weeks ahead can be replaced. Candidates are staff of
+    the shift's department who can take it without breaking rest rules,
+    days off or weekly caps, cheapest by preference and workload first.
+    """
+    user = update.effective_user
+    profile = await get_user_profile(user.id)
+    if not profile.is_supervisor:
+        await update.message.reply_text("This command is available to supervisors only.")
+        return
+
+    args = context.args or []
+    try:
+        day = date.fromisoformat(args[1]) if len(args) > 1 else None
+    except ValueError:
+        args = []
+    if not 1 <= len(args) <= 2:
+        await update.message.reply_text("Usage: /replace @username [YYYY-MM-DD]")
+        return
+    first, last = get_replacement_range()
+    if day is not None and not first <= day <= last:
+        await update.message.reply_text(
+            f"Only shifts from {first:%Y-%m-%d} to {last:%Y-%m-%d} can be replaced."
+        )
+        return
+    username = args[0].lstrip("@")
+    async with get_session() as session:
+        department_ids = await _get_managed_department_ids(session, profile)
+    if not department_ids:
+        await update.message.reply_text("You are not assigned to a department.")
+        return
+
+    absence = await find_absence(username, department_ids, day)
+    if absence is None:
+        when = f"on {day:%Y-%m-%d}" if day else "coming up"
+        await update.message.reply_text(f"@{username} has no shift {when} in your departments.")
+        return
+    slot = get_scheduled_slot(absence.date, absence.slot)
+    shift = f"{slot.date:%Y-%m-%d} {slot.description}"
+    candidates = await find_replacements(absence, REPLACEMENT_CANDIDATES)
+    if not candidates:
+        await update.message.reply_text(f"No one can take over {shift} from @{username}.")
+        return
+
+    offered = candidates[:REPLACEMENT_OFFERS]
+    for notification in await offer_replacement(absence, offered, user.id):
+        await send_notification(context, notification)
+    lines = [f"Candidates to take over {shift} from @{username}:"]
+    for rank, candidate in enumerate(candidates, 1):
+        marker = " 📨" if rank <= len(offered) else ""
+        lines.append(f"{rank}. @{candidate.username} (cost {candidate.cost:.1f}){marker}")
+    lines.append("")
+    lines.append(
+        f"Offered to the first {len(offered)}; the first to accept takes the shift over."
+    )
+    await update.message.reply_text("\n".join(lines))
@@ -1,58 +1,165 @@
 """
 Basic commands for all users.
 """
-from typing import Any, Dict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from telegram import Update
+from telegram import InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
-from db.models.user import User
+from bot.calendar_feed import calendar_feed_url
+from bot.keyboards.callback_data import CallbackAction
+from bot.keyboards.keyboards import get_pagination_keyboard
+from bot.oncall import OnCallEntry, get_on_call
+from bot.profiles import get_user_profile
+from db.base import get_session
 from db.models.shift import Shift
-from db.models.shift_assignment import ShiftAssignment
+from db.repository.shift_repository import Cursor, ShiftRepository
+from utils.export import iter_csv, iter_ics, spool_export
+from utils.metrics import instrumented
+from utils.pagination import build_page, cursor_to_args
+from utils.scheduler import get_week_start
 
+# Maximum number of shifts fetched for one page
+PAGE_SIZE = 25
 
+ShiftPage = Tuple[str, Optional[InlineKeyboardMarkup]]
+
+# Export formats, scopes and the default and maximum number of exported days
+EXPORT_FORMATS = ("csv", "ics")
+EXPORT_SCOPES = ("me", "department")
+EXPORT_DAYS = 90
+MAX_EXPORT_DAYS = 366
+EXPORT_USAGE = "Usage: /export [csv|ics] [me|department] [days]"
+
+ONCALL_USAGE = "Usage: /oncall [HH:MM | YYYY-MM-DD HH:MM]"
+
+
+def _format_my_shift(shift: Shift) -> str:
+    return (
+        f"📅 {shift.date.strftime('%Y-%m-%d')}\n"
+        f"⏰ {shift.description}\n"
+        f"🏢 {shift.department.name}\n\n"
+    )
+
+
+def _format_schedule_shift(shift: Shift) -> str:
+    assigned = ", ".join(assignment.user.username for assignment in shift.assignments)
+    return (
+        f"📅 {shift.date.strftime('%Y-%m-%d')}\n"
+        f"⏰ {shift.description}\n"
+        f"👤 {assigned or 'Not assigned'}\n\n"
+    )
+
+
+def render_shift_page(
+    shifts: List[Shift],
+    header: str,
+    format_shift: Callable[[Shift], str],
+    action: CallbackAction,
+    has_cursor: bool,
+    backwards: bool
+) -> ShiftPage:
+    """
+    Render a page of at most PAGE_SIZE shifts under Telegram's message limit.
+
+    ``shifts`` holds up to PAGE_SIZE + 1 rows in date order; the extra row only
+    signals that another page exists in the direction of travel.
+    """
+    more = len(shifts) > PAGE_SIZE
+    if backwards:
+        shifts = shifts[-PAGE_SIZE:]
+        text, count = build_page(header, (format_shift(shift) for shift in shifts), from_end=True)
+        shown = shifts[len(shifts) - count:]
+        has_previous = more or count < len(shifts)
+        has_next = True
+    else:
+        shifts = shifts[:PAGE_SIZE]
+        text, count = build_page(header, (format_shift(shift) for shift in shifts))
+        shown = shifts[:count]
+        has_previous = has_cursor
+        has_next = more or count < len(shifts)
+
+    keyboard = get_pagination_keyboard(
+        action,
+        cursor_to_args(shown[0].date, shown[0].id) if has_previous else None,
+        cursor_to_args(shown[-1].date, shown[-1].id) if has_next else None,
+    )
+    return text, keyboard
+
+
+async def get_my_shifts_page(
+    telegram_id: int, cursor: Optional[Cursor] = None, backwards: bool = False
+) -> Optional[ShiftPage]:
+    """
+    Get a page of the user's upcoming shifts, or None if there are none.
+    """
+    async with get_session() as session:
+        shifts = await ShiftRepository(session).get_user_shifts_page(
+            telegram_id, date.today(), cursor, PAGE_SIZE + 1, backwards
+        )
+    if not shifts:
+        return None
+    return render_shift_page(
+        shifts, "Your shifts:\n\n", _format_my_shift,
+        CallbackAction.MY_SHIFTS_PAGE, cursor is not None, backwards
+    )
+
+
+async def get_schedule_page(
+    department_id: int, cursor: Optional[Cursor] = None, backwards: bool = False
+) -> Optional[ShiftPage]:
+    """
+    Get a page of the department schedule from the current week on, or None if empty.
+    """
+    async with get_session() as session:
+        shifts = await ShiftRepository(session).get_department_schedule_page(
+            department_id, get_week_start(date.today()), cursor, PAGE_SIZE + 1, backwards
+        )
+    if not shifts:
+        return None
+    return render_shift_page(
+        shifts, "Shift Schedule:\n\n", _format_schedule_shift,
+        CallbackAction.SCHEDULE_PAGE, cursor is not None, backwards
+    )
+
+
+@instrumented("command", "myshift")
 async def my_shifts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Show user's shifts.
     """
     user = update.effective_user
-    # TODO: Get user's shifts from database
-    shifts = []  # Placeholder for actual database query
-    
-    if not shifts:
+    page = await get_my_shifts_page(user.id)
+
+    if page is None:
         await update.message.reply_text("No shifts assigned to you.")
         return
 
-    message = "Your shifts:\n\n"
-    for shift in shifts:
-        message += f"📅 {shift.date.strftime('%Y-%m-%d')}\n"
-        message += f"⏰ {shift.shift_type}\n"
-        message += f"🏢 {shift.department.name}\n\n"
-
-    await update.message.reply_text(message)
+    text, keyboard = page
+    await update.message.reply_text(text, reply_markup=keyboard)
 
 
+@instrumented("command", "schedule")
 async def schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Show department schedule.
     """
     user = update.effective_user
-    # TODO: Get department schedule from database
-    schedule = []  # Placeholder for actual database query
-    
-    if not schedule:
+    profile = await get_user_profile(user.id)
+    page = None
+    if profile.department_id is not None:
+        page = await get_schedule_page(profile.department_id)
+
+    if page is None:
         await update.message.reply_text("No shift schedule available.")
         return
 
-    message = "Shift Schedule:\n\n"
-    for shift in schedule:
-        message += f"📅 {shift.date.strftime('%Y-%m-%d')}\n"
-        message += f"⏰ {shift.shift_type}\n"
-        message += f"👤 {shift.assigned_user.username if shift.assigned_user else 'Not assigned'}\n\n"
-
-    await update.message.reply_text(message)
+    text, keyboard = page
+    await update.message.reply_text(text, reply_markup=keyboard)
 
 
+@instrumented("command", "swap")
 async def swap_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle shift swap request.
@@ -62,4 +169,111 @@ async def swap_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(
         "To request a shift swap, please select the shift you want to swap.\n"
         "Use /myshift to view your shifts."
-    ) 
\ No newline at end of file
+    )
+
+
+def _parse_export_args(args: List[str]) -> Optional[Tuple[str, str, int]]:
+    export_format = args[0].lower() if args else "ics"
+    if export_format not in EXPORT_FORMATS:
+        return None
+    default_scope = "me" if export_format == "ics" else "department"
+    scope = args[1].lower() if len(args) > 1 else default_scope
+    if scope not in EXPORT_SCOPES:
+        return None
+    try:
+        days = int(args[2]) if len(args) > 2 else EXPORT_DAYS
+    except ValueError:
+        return None
+    if not 1 <= days <= MAX_EXPORT_DAYS:
+        return None
+    return export_format, scope, days
+
+
+@instrumented("command", "export")
+async def export(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Export the user's or the department's shifts as a CSV or iCalendar document.
+
+    Rows are streamed from the database and rendered line by line into a
+    spooled file, so the export never holds the shifts in memory.
+    """
+    parsed = _parse_export_args(context.args or [])
+    if parsed is None:
+        await update.message.reply_text(EXPORT_USAGE)
+        return
+    export_format, scope, days = parsed
+
+    user = update.effective_user
+    start = get_week_start(date.today())
+    end = start + timedelta(days=days - 1)
+    if scope == "department":
+        profile = await get_user_profile(user.id)
+        if profile.department_id is None:
+            await update.message.reply_text("No shift schedule available.")
+            return
+
+    async with get_session() as session:
+        repository = ShiftRepository(session)
+        if scope == "department":
+            rows = repository.stream_department_export(profile.department_id, start, end)
+        else:
+            rows = repository.stream_user_export(user.id, start, end)
+        if export_format == "csv":
+            document = await spool_export(iter_csv(rows))
+        else:
+            title = "Department shifts" if scope == "department" else "My shifts"
+            document = await spool_export(iter_ics(rows, title))
+
+    caption = None
+    feed_url = calendar_feed_url(user.id)
+    if export_format == "ics" and scope == "me" and feed_url:
+        caption = f"Subscribe to stay up to date: {feed_url}"
+    with document:
+        # The upload itself is sent from one buffer; spooled files have no name to send
+        await update.message.reply_document(
+            document=document.read(),
+            filename=f"shifts-{scope}-{start.isoformat()}.{export_format}",
+            caption=caption,
+        )
+
+
+def _parse_oncall_args(args: List[str], now: datetime) -> Optional[datetime]:
+    text = " ".join(args)
+    if not text:
+        return now
+    for pattern in ("%H:%M", "%Y-%m-%d %H:%M"):
+        try:
+            moment = datetime.strptime(text, pattern)
+        except ValueError:
+            continue
+        if pattern == "%H:%M":
+            moment = datetime.combine(now.date(), moment.time())
+        return moment
+    return None
+
+
+def _format_on_call(entry: OnCallEntry) -> str:
+    return f"👤 {entry.username} - {entry.description}, until {entry.end:%a %H:%M}\n"
+
+
+@instrumented("command", "oncall")
+async def oncall(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Show who in the user's department is on call now or at a given time.
+    """
+    moment = _parse_oncall_args(context.args or [], datetime.now())
+    if moment is None:
+        await update.message.reply_text(ONCALL_USAGE)
+        return
+    profile = await get_user_profile(update.effective_user.id)
+    if profile.department_id is None:
+        await update.message.reply_text("No shift schedule available.")
+        return
+
+    entries = await get_on_call(moment, profile.department_id)
+    if not entries:
+        await update.message.reply_text(f"Nobody is on call at {moment:%Y-%m-%d %H:%M}.")
+        return
+    await update.message.reply_text(
+        f"On call at {moment:%Y-%m-%d %H:%M}:\n\n" + "".join(map(_format_on_call, entries))
+    )
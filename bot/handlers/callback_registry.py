@@ -0,0 +1,36 @@
+"""
+Registry dispatching decoded callback data to its handler.
+"""
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from bot.keyboards.callback_data import CallbackAction
+from utils.translations import Language
+
+CallbackHandler = Callable[
+    [Update, ContextTypes.DEFAULT_TYPE, Language, Tuple[int, ...]], Awaitable[None]
+]
+
+CALLBACK_HANDLERS: Dict[CallbackAction, CallbackHandler] = {}
+
+
+def callback_handler(*actions: CallbackAction) -> Callable[[CallbackHandler], CallbackHandler]:
+    """
+    Register the decorated coroutine as the handler of the given actions.
+    """
+    def decorator(handler: CallbackHandler) -> CallbackHandler:
+        for action in actions:
+            if action in CALLBACK_HANDLERS:
+                raise ValueError(f"Callback action {action.name} is already registered")
+            CALLBACK_HANDLERS[action] = handler
+        return handler
+    return decorator
+
+
+def get_callback_handler(action: CallbackAction) -> Optional[CallbackHandler]:
+    """
+    Get the handler registered for an action.
+    """
+    return CALLBACK_HANDLERS.get(action)
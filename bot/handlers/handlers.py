@@ -1,130 +1,301 @@
 """
 Message and callback handlers for the Shift Scheduler Bot.
 """
-from typing import Dict, Any
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from bot.commands.basic_commands import (
+    ShiftPage,
+    get_my_shifts_page,
+    get_schedule_page,
+    my_shifts,
+    schedule,
+)
+from bot.handlers.callback_registry import callback_handler, get_callback_handler
+from bot.keyboards.callback_data import (
+    PAGE_BACKWARD,
+    SHIFT_TYPE_KEYS,
+    CallbackAction,
+    decode_callback,
+)
+from bot.notifications import Notification, collect_swap_decisions, send_notification
+from bot.profiles import get_user_profile
+from bot.replacements import COVERED, DECLINED, accept_replacement, decline_replacement
+from bot.swaps import SWAP_MATCHES_KEY, approve_swap_matches
 from bot.keyboards.keyboards import (
     get_main_menu_keyboard,
     get_shift_types_keyboard,
     get_swap_request_keyboard,
     get_user_management_keyboard,
 )
-from utils.translations import Language, get_translation
+from utils.metrics import track_handler
+from utils.pagination import args_to_cursor
+from utils.scheduler import ScheduledSlot
+from utils.translations import Language, get_translation, resolve_button
+
+logger = logging.getLogger(__name__)
+
+
+async def _show_my_shifts(update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language) -> None:
+    await my_shifts(update, context)
+
+
+async def _show_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language) -> None:
+    await schedule(update, context)
+
+
+async def _request_swap(update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language) -> None:
+    # TODO: Get available shifts for swap
+    await update.message.reply_text(
+        get_translation("no_shifts_available", language),
+        reply_markup=get_shift_types_keyboard(language)
+    )
+
+
+async def _create_shift(update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language) -> None:
+    # TODO: Check if user is supervisor
+    await update.message.reply_text(
+        get_translation("create_shift_prompt", language)
+    )
+
+
+async def _manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language) -> None:
+    # TODO: Check if user is supervisor
+    await update.message.reply_text(
+        get_translation("manage_users_prompt", language),
+        reply_markup=get_user_management_keyboard(language)
+    )
+
+
+# Menu key -> handler of the reply keyboard button
+MESSAGE_ACTIONS: Dict[str, Callable[[Update, ContextTypes.DEFAULT_TYPE, Language], Awaitable[None]]] = {
+    "my_shifts": _show_my_shifts,
+    "shift_schedule": _show_schedule,
+    "request_swap": _request_swap,
+    "create_shift": _create_shift,
+    "manage_users": _manage_users,
+}
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle incoming messages."""
-    user = update.effective_user
-    language = Language.ENGLISH  # Default language
-    
-    # TODO: Get user's preferred language from database
-    # user = await get_user_by_telegram_id(user.id)
-    # if user:
-    #     language = user.language
-    
-    text = update.message.text
-    
-    if text == get_translation("my_shifts", language):
-        # TODO: Get user's shifts from database
-        await update.message.reply_text(
-            get_translation("no_shifts_found", language)
-        )
-    
-    elif text == get_translation("shift_schedule", language):
-        # TODO: Get department schedule from database
-        await update.message.reply_text(
-            get_translation("no_schedule_found", language)
-        )
-    
-    elif text == get_translation("request_swap", language):
-        # TODO: Get available shifts for swap
-        await update.message.reply_text(
-            get_translation("no_shifts_available", language),
-            reply_markup=get_shift_types_keyboard(language)
-        )
-    
-    elif text == get_translation("create_shift", language):
-        # TODO: Check if user is supervisor
+    """
+    Handle incoming messages.
+
+    Button labels are resolved in a single lookup across all languages, and the
+    label's language is used for the reply.
+    """
+    button = resolve_button(update.message.text)
+    if button is None:
+        language = (await get_user_profile(update.effective_user.id)).language
         await update.message.reply_text(
-            get_translation("create_shift_prompt", language)
+            get_translation("unknown_command", language)
         )
-    
-    elif text == get_translation("manage_users", language):
-        # TODO: Check if user is supervisor
-        await update.message.reply_text(
-            get_translation("manage_users_prompt", language),
-            reply_markup=get_user_management_keyboard(language)
+        return
+
+    action, language = button
+    with track_handler("message", action):
+        await MESSAGE_ACTIONS[action](update, context, language)
+
+
+@callback_handler(CallbackAction.SHIFT_TYPE)
+async def _shift_type_selected(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    shift_type = SHIFT_TYPE_KEYS[args[0]]
+    # TODO: Process shift type selection
+    await update.callback_query.edit_message_text(
+        get_translation("shift_selected", language).format(
+            shift_type=get_translation(f"{shift_type}_shift", language)
         )
-    
-    else:
-        await update.message.reply_text(
-            get_translation("unknown_command", language)
+    )
+
+
+@callback_handler(CallbackAction.SWAP_ACCEPT)
+async def _swap_accepted(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    # TODO: Process swap request
+    await update.callback_query.edit_message_text(
+        get_translation("swap_accepted", language)
+    )
+
+
+@callback_handler(CallbackAction.SWAP_REJECT)
+async def _swap_rejected(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    await update.callback_query.edit_message_text(
+        get_translation("swap_rejected", language)
+    )
+
+
+@callback_handler(CallbackAction.USER_ADD)
+async def _user_add(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    # TODO: Process user management action
+    await update.callback_query.edit_message_text(
+        get_translation("add_user_prompt", language)
+    )
+
+
+@callback_handler(CallbackAction.USER_EDIT)
+async def _user_edit(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    await update.callback_query.edit_message_text(
+        get_translation("edit_permissions_prompt", language)
+    )
+
+
+@callback_handler(CallbackAction.USER_DELETE)
+async def _user_delete(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    await update.callback_query.edit_message_text(
+        get_translation("delete_user_prompt", language)
+    )
+
+
+async def _answer_offer(update: Update, language: Language, key: str, **kwargs: str) -> None:
+    # Keep the offer's text and drop its buttons
+    query = update.callback_query
+    await query.edit_message_text(
+        f"{query.message.text}\n\n{get_translation(key, language, **kwargs)}"
+    )
+
+
+async def _notify_manager(
+    context: ContextTypes.DEFAULT_TYPE, manager_id: int, key: str, update: Update,
+    slot: ScheduledSlot
+) -> None:
+    language = (await get_user_profile(manager_id)).language
+    user = update.effective_user
+    await send_notification(context, Notification(
+        manager_id,
+        get_translation(
+            key, language,
+            username=user.username or user.first_name or str(user.id),
+            shift=slot.description, date=slot.date.strftime("%Y-%m-%d"),
+        ),
+    ))
+
+
+@callback_handler(CallbackAction.REPLACEMENT_ACCEPT)
+async def _replacement_accepted(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    # The manager to notify comes from the recorded offer, not the callback data
+    outcome, slot, manager_id = await accept_replacement(args[0], update.effective_user.id)
+    if outcome != COVERED:
+        await _answer_offer(update, language, f"replacement_{outcome}")
+        return
+    date = slot.date.strftime("%Y-%m-%d")
+    await _answer_offer(update, language, "replacement_covered", shift=slot.description, date=date)
+    await _notify_manager(context, manager_id, "replacement_manager_covered", update, slot)
+
+
+@callback_handler(CallbackAction.REPLACEMENT_DECLINE)
+async def _replacement_declined(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    outcome, slot, manager_id = await decline_replacement(args[0], update.effective_user.id)
+    await _answer_offer(update, language, f"replacement_{outcome}")
+    if outcome == DECLINED:
+        await _notify_manager(context, manager_id, "replacement_manager_declined", update, slot)
+
+
+@callback_handler(CallbackAction.SWAP_MATCHES_APPROVE)
+async def _swap_matches_approved(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    query = update.callback_query
+    if not (await get_user_profile(update.effective_user.id)).is_supervisor:
+        return
+    # Only the latest /match_swaps listing of the chat can be approved, and only once
+    listed = context.chat_data.get(SWAP_MATCHES_KEY)
+    if listed is None or listed["message_id"] != query.message.message_id:
+        await query.edit_message_text(
+            f"{query.message.text}\n\n{get_translation('swap_matches_outdated', language)}"
         )
+        return
+    del context.chat_data[SWAP_MATCHES_KEY]
+    approved = await approve_swap_matches(listed["request_ids"], update.effective_user.id)
+    notices = await collect_swap_decisions(
+        request_id for match in approved for request_id in match
+    )
+    for notification in notices:
+        await send_notification(context, notification)
+    result = get_translation(
+        "swap_matches_approved", language,
+        approved=str(sum(len(match) for match in approved)),
+        listed=str(sum(len(match) for match in listed["request_ids"])),
+    )
+    await query.edit_message_text(f"{query.message.text}\n\n{result}")
+
+
+async def _edit_page(update: Update, page: Optional[ShiftPage]) -> None:
+    if page is None:
+        return
+    text, keyboard = page
+    await update.callback_query.edit_message_text(text, reply_markup=keyboard)
+
+
+@callback_handler(CallbackAction.MY_SHIFTS_PAGE)
+async def _my_shifts_page(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    direction, seconds, shift_id = args
+    page = await get_my_shifts_page(
+        update.effective_user.id, args_to_cursor(seconds, shift_id), direction == PAGE_BACKWARD
+    )
+    await _edit_page(update, page)
+
+
+@callback_handler(CallbackAction.SCHEDULE_PAGE)
+async def _schedule_page(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, language: Language, args: Tuple[int, ...]
+) -> None:
+    direction, seconds, shift_id = args
+    profile = await get_user_profile(update.effective_user.id)
+    if profile.department_id is None:
+        return
+    page = await get_schedule_page(
+        profile.department_id, args_to_cursor(seconds, shift_id), direction == PAGE_BACKWARD
+    )
+    await _edit_page(update, page)
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle callback queries."""
     query = update.callback_query
     user = update.effective_user
-    language = Language.ENGLISH  # Default language
-    
-    # TODO: Get user's preferred language from database
-    # user = await get_user_by_telegram_id(user.id)
-    # if user:
-    #     language = user.language
+    language = (await get_user_profile(user.id)).language
     
     await query.answer()
-    
-    if query.data.startswith("shift_type_"):
-        shift_type = query.data.split("_")[2]
-        # TODO: Process shift type selection
-        await query.edit_message_text(
-            get_translation("shift_selected", language).format(
-                shift_type=get_translation(f"{shift_type}_shift", language)
-            )
-        )
-    
-    elif query.data.startswith("swap_"):
-        action, shift_id = query.data.split("_")[1:]
-        # TODO: Process swap request
-        if action == "accept":
-            await query.edit_message_text(
-                get_translation("swap_accepted", language)
-            )
-        else:
-            await query.edit_message_text(
-                get_translation("swap_rejected", language)
-            )
-    
-    elif query.data.startswith("user_"):
-        action = query.data.split("_")[1]
-        # TODO: Process user management action
-        if action == "add":
-            await query.edit_message_text(
-                get_translation("add_user_prompt", language)
-            )
-        elif action == "edit":
-            await query.edit_message_text(
-                get_translation("edit_permissions_prompt", language)
-            )
-        else:
-            await query.edit_message_text(
-                get_translation("delete_user_prompt", language)
-            )
+
+    try:
+        action, args = decode_callback(query.data)
+    except ValueError:
+        logger.warning(f"Ignoring undecodable callback data {query.data!r}")
+        return
+
+    handler = get_callback_handler(action)
+    if handler is None:
+        logger.warning(f"No handler registered for callback action {action.name}")
+        return
+    with track_handler("callback", action.name):
+        await handler(update, context, language, args)
 
 
 async def handle_error(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle errors."""
     language = Language.ENGLISH  # Default language
-    
-    # TODO: Get user's preferred language from database
-    # if update.effective_user:
-    #     user = await get_user_by_telegram_id(update.effective_user.id)
-    #     if user:
-    #         language = user.language
+    if update.effective_user:
+        language = (await get_user_profile(update.effective_user.id)).language
     
     error_message = get_translation("error_occurred", language)
     if update.effective_message:
@@ -0,0 +1,94 @@
+"""
+Compact, versioned encoding of inline keyboard callback data.
+
+Payload layout: version byte, action id and integer arguments as varints
+(arguments zigzag-encoded so negative values stay short), packed as
+unpadded URL-safe base64. Telegram limits callback data to 64 bytes.
+"""
+import base64
+import binascii
+from enum import IntEnum
+from typing import List, Tuple
+
+CALLBACK_VERSION = 1
+MAX_CALLBACK_DATA_BYTES = 64
+
+
+class CallbackAction(IntEnum):
+    """Actions carried by inline keyboard buttons. Ids must never be reused."""
+    SHIFT_TYPE = 1
+    SWAP_ACCEPT = 2
+    SWAP_REJECT = 3
+    USER_ADD = 4
+    USER_EDIT = 5
+    USER_DELETE = 6
+    MY_SHIFTS_PAGE = 7
+    SCHEDULE_PAGE = 8
+    REPLACEMENT_ACCEPT = 9
+    REPLACEMENT_DECLINE = 10
+    SWAP_MATCHES_APPROVE = 11
+
+
+# First argument of page actions
+PAGE_FORWARD = 0
+PAGE_BACKWARD = 1
+
+
+# Shift types selectable from the shift types keyboard, by argument value
+SHIFT_TYPE_KEYS = ("morning", "evening", "night")
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(payload: bytes, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(payload):
+            raise ValueError("Truncated callback data")
+        byte = payload[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_callback(action: CallbackAction, *args: int) -> str:
+    """
+    Encode an action and its integer arguments as callback data.
+    """
+    payload = bytearray([CALLBACK_VERSION])
+    _write_varint(payload, int(action))
+    for arg in args:
+        _write_varint(payload, arg * 2 if arg >= 0 else -arg * 2 - 1)
+    data = base64.urlsafe_b64encode(bytes(payload)).rstrip(b"=").decode("ascii")
+    if len(data) > MAX_CALLBACK_DATA_BYTES:
+        raise ValueError(f"Callback data for {action.name} exceeds {MAX_CALLBACK_DATA_BYTES} bytes")
+    return data
+
+
+def decode_callback(data: str) -> Tuple[CallbackAction, Tuple[int, ...]]:
+    """
+    Decode callback data into its action and integer arguments.
+
+    Raises ValueError for malformed data, unknown versions or unknown actions.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError) as error:
+        raise ValueError(f"Malformed callback data: {data!r}") from error
+    if not payload or payload[0] != CALLBACK_VERSION:
+        raise ValueError(f"Unsupported callback data version: {data!r}")
+
+    action_id, offset = _read_varint(payload, 1)
+    args: List[int] = []
+    while offset < len(payload):
+        value, offset = _read_varint(payload, offset)
+        args.append((value >> 1) ^ -(value & 1))
+    return CallbackAction(action_id), tuple(args)
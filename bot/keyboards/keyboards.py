@@ -1,6 +1,12 @@
 """
 Keyboard layouts for the Shift Scheduler Bot.
+
+Keyboards that only depend on the role and language are built once and
+shared between updates; Telegram objects are immutable, so this is safe.
 """
+from functools import lru_cache
+from typing import Optional, Tuple
+
 from telegram import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -8,9 +14,16 @@ from telegram import (
     KeyboardButton
 )
 
+from bot.keyboards.callback_data import (
+    PAGE_BACKWARD,
+    PAGE_FORWARD,
+    CallbackAction,
+    encode_callback,
+)
 from utils.translations import Language, get_translation
 
 
+@lru_cache(maxsize=None)
 def get_main_menu_keyboard(is_supervisor: bool, language: Language = Language.ENGLISH) -> ReplyKeyboardMarkup:
     """
     Get the main menu keyboard based on user role.
@@ -32,6 +45,7 @@ def get_main_menu_keyboard(is_supervisor: bool, language: Language = Language.EN
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=None)
 def get_shift_types_keyboard(language: Language = Language.ENGLISH) -> InlineKeyboardMarkup:
     """
     Get keyboard for shift types selection.
@@ -40,42 +54,101 @@ def get_shift_types_keyboard(language: Language = Language.ENGLISH) -> InlineKey
         [
             InlineKeyboardButton(
                 get_translation("morning_shift", language),
-                callback_data="shift_type_morning"
+                callback_data=encode_callback(CallbackAction.SHIFT_TYPE, 0)
             ),
             InlineKeyboardButton(
                 get_translation("evening_shift", language),
-                callback_data="shift_type_evening"
+                callback_data=encode_callback(CallbackAction.SHIFT_TYPE, 1)
             ),
         ],
         [
             InlineKeyboardButton(
                 get_translation("night_shift", language),
-                callback_data="shift_type_night"
+                callback_data=encode_callback(CallbackAction.SHIFT_TYPE, 2)
             ),
         ],
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
+def _get_swap_request_labels(language: Language) -> Tuple[str, str]:
+    """
+    Get the translated labels of the swap request keyboard.
+    """
+    return get_translation("accept", language), get_translation("reject", language)
+
+
 def get_swap_request_keyboard(shift_id: int, language: Language = Language.ENGLISH) -> InlineKeyboardMarkup:
     """
     Get keyboard for swap request actions.
     """
+    accept, reject = _get_swap_request_labels(language)
     keyboard = [
         [
             InlineKeyboardButton(
-                get_translation("accept", language),
-                callback_data=f"swap_accept_{shift_id}"
+                accept,
+                callback_data=encode_callback(CallbackAction.SWAP_ACCEPT, shift_id)
             ),
             InlineKeyboardButton(
-                get_translation("reject", language),
-                callback_data=f"swap_reject_{shift_id}"
+                reject,
+                callback_data=encode_callback(CallbackAction.SWAP_REJECT, shift_id)
             ),
         ],
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
+def _get_replacement_offer_labels(language: Language) -> Tuple[str, str]:
+    """
+    Get the translated labels of the replacement offer keyboard.
+    """
+    return (
+        get_translation("replacement_accept", language),
+        get_translation("replacement_decline", language),
+    )
+
+
+def get_replacement_offer_keyboard(
+    assignment_id: int, language: Language = Language.ENGLISH
+) -> InlineKeyboardMarkup:
+    """
+    Get keyboard for answering an offer to cover an assignment.
+    """
+    accept, decline = _get_replacement_offer_labels(language)
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                accept,
+                callback_data=encode_callback(CallbackAction.REPLACEMENT_ACCEPT, assignment_id)
+            ),
+            InlineKeyboardButton(
+                decline,
+                callback_data=encode_callback(CallbackAction.REPLACEMENT_DECLINE, assignment_id)
+            ),
+        ],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+@lru_cache(maxsize=None)
+def get_swap_matches_keyboard(language: Language = Language.ENGLISH) -> InlineKeyboardMarkup:
+    """
+    Get keyboard for approving the swap matches listed in the message.
+    """
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                get_translation("approve_swap_matches", language),
+                callback_data=encode_callback(CallbackAction.SWAP_MATCHES_APPROVE)
+            ),
+        ],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+@lru_cache(maxsize=None)
 def get_user_management_keyboard(language: Language = Language.ENGLISH) -> InlineKeyboardMarkup:
     """
     Get keyboard for user management actions.
@@ -84,18 +157,52 @@ def get_user_management_keyboard(language: Language = Language.ENGLISH) -> Inlin
         [
             InlineKeyboardButton(
                 get_translation("add_user", language),
-                callback_data="user_add"
+                callback_data=encode_callback(CallbackAction.USER_ADD)
             ),
             InlineKeyboardButton(
                 get_translation("edit_permissions", language),
-                callback_data="user_edit"
+                callback_data=encode_callback(CallbackAction.USER_EDIT)
             ),
         ],
         [
             InlineKeyboardButton(
                 get_translation("delete_user", language),
-                callback_data="user_delete"
+                callback_data=encode_callback(CallbackAction.USER_DELETE)
             ),
         ],
     ]
-    return InlineKeyboardMarkup(keyboard) 
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard) 
+
+
+def get_pagination_keyboard(
+    action: CallbackAction,
+    previous_cursor: Optional[Tuple[int, int]],
+    next_cursor: Optional[Tuple[int, int]]
+) -> Optional[InlineKeyboardMarkup]:
+    """
+    Get previous/next page buttons carrying keyset cursors, or None for a single page.
+    """
+    buttons = []
+    if previous_cursor is not None:
+        buttons.append(InlineKeyboardButton(
+            "◀️", callback_data=encode_callback(action, PAGE_BACKWARD, *previous_cursor)
+        ))
+    if next_cursor is not None:
+        buttons.append(InlineKeyboardButton(
+            "▶️", callback_data=encode_callback(action, PAGE_FORWARD, *next_cursor)
+        ))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def warm_keyboard_cache() -> None:
+    """
+    Build the static keyboards of every role and language ahead of the first update.
+    """
+    for language in Language:
+        for is_supervisor in (False, True):
+            get_main_menu_keyboard(is_supervisor, language)
+        get_shift_types_keyboard(language)
+        get_user_management_keyboard(language)
+        _get_swap_request_labels(language)
+        _get_replacement_offer_labels(language)
+        get_swap_matches_keyboard(language)
@@ -3,26 +3,40 @@ Main entry point for the Shift Scheduler Bot.
 """
 import logging
 import os
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import (
     Application,
+    ApplicationBuilder,
+    BasePersistence,
     CommandHandler,
     ContextTypes,
     ConversationHandler,
     MessageHandler,
     CallbackQueryHandler,
+    TypeHandler,
     filters,
 )
 
-from bot.commands.basic_commands import my_shifts, schedule, swap_request
-from bot.commands.admin_commands import create_shift, assign_shift, approve_swap, manage_users
+from bot.commands.basic_commands import export, my_shifts, oncall, schedule, swap_request
+from bot.commands.admin_commands import (
+    create_shift, assign_shift, approve_swap, auto_assign_shifts, coverage, department_report,
+    manage_users, match_swaps, publish, replace,
+)
 from bot.handlers.handlers import handle_message, handle_callback, handle_error
-from bot.keyboards.keyboards import get_main_menu_keyboard
+from bot.keyboards.keyboards import get_main_menu_keyboard, warm_keyboard_cache
+from bot.notifications import REMINDER_TIME, NotificationService, send_shift_reminders
+from bot.rate_limiter import rate_limit_update
+from bot.sharding import run_sharded
+from bot.update_processor import ChatOrderedUpdateProcessor
+from bot.webhook import run_webhook
+from bot.profiles import get_user_profile
 from db.models.user import User
-from utils.translations import Language, get_translation
+from db.persistence import SQLitePersistence, create_persistence
+from utils.metrics import UPDATE_ERRORS, instrumented, start_metrics_server
+from utils.translations import get_translation
 
 # Load environment variables
 load_dotenv()
@@ -39,35 +53,33 @@ START, MAIN_MENU = range(2)
 # Bot token
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Serving mode and concurrency
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "64"))
+METRICS_PORT = os.getenv("METRICS_PORT")
+
 
+@instrumented("command", "start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start command handler."""
     user = update.effective_user
-    language = Language.ENGLISH  # Default language
-    
-    # TODO: Get user's preferred language from database
-    # user = await get_user_by_telegram_id(user.id)
-    # if user:
-    #     language = user.language
+    profile = await get_user_profile(user.id)
+    language = profile.language
     
     await update.message.reply_text(
         get_translation("welcome_message", language).format(
             first_name=user.first_name
         ),
-        reply_markup=get_main_menu_keyboard(False)
+        reply_markup=get_main_menu_keyboard(profile.is_supervisor, language)
     )
     return MAIN_MENU
 
 
+@instrumented("command", "help")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Help command handler."""
     user = update.effective_user
-    language = Language.ENGLISH  # Default language
-    
-    # TODO: Get user's preferred language from database
-    # user = await get_user_by_telegram_id(user.id)
-    # if user:
-    #     language = user.language
+    language = (await get_user_profile(user.id)).language
     
     help_text = get_translation("help_text", language)
     await update.message.reply_text(help_text)
@@ -76,13 +88,35 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log errors caused by updates."""
     logger.error(f"Update {update} caused error {context.error}")
+    UPDATE_ERRORS.labels(type(context.error).__name__).inc()
 
 
-def main() -> None:
-    """Start the bot."""
-    # Create the Application and pass it your bot's token
-    application = Application.builder().token(TOKEN).build()
+async def post_init(application: Application) -> None:
+    """Start background services once the bot is initialized."""
+    service = NotificationService(application.bot)
+    await service.start()
+    application.bot_data["notifications"] = service
+
+    if application.bot_data.get("shard", 0) != 0:
+        # In sharded mode only the first worker sends reminders
+        return
+    if application.job_queue is None:
+        logger.warning("JobQueue is not available, shift reminders are disabled")
+    else:
+        application.job_queue.run_daily(send_shift_reminders, time=REMINDER_TIME)
+
+
+async def post_shutdown(application: Application) -> None:
+    """Stop background services."""
+    service = application.bot_data.get("notifications")
+    if service is not None:
+        await service.stop()
+    if isinstance(application.persistence, SQLitePersistence):
+        await application.persistence.close()
+
 
+def add_handlers(application: Application) -> None:
+    """Register all handlers on the application."""
     # Add conversation handler
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
@@ -93,23 +127,79 @@ def main() -> None:
                 CommandHandler("myshift", my_shifts),
                 CommandHandler("schedule", schedule),
                 CommandHandler("swap", swap_request),
+                CommandHandler("export", export),
+                CommandHandler("oncall", oncall),
                 CommandHandler("create_shift", create_shift),
                 CommandHandler("assign_shift", assign_shift),
                 CommandHandler("approve_swap", approve_swap),
                 CommandHandler("manage_users", manage_users),
+                CommandHandler("publish", publish),
+                CommandHandler("auto_assign", auto_assign_shifts),
+                CommandHandler("coverage", coverage),
+                CommandHandler("department_report", department_report),
+                CommandHandler("match_swaps", match_swaps),
+                CommandHandler("replace", replace),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message),
                 CallbackQueryHandler(handle_callback),
             ],
         },
         fallbacks=[CommandHandler("start", start)],
+        name="main_conversation",
+        persistent=application.persistence is not None,
     )
 
+    # Throttle before any handler runs
+    application.add_handler(TypeHandler(Update, rate_limit_update), group=-1)
     application.add_handler(conv_handler)
     application.add_error_handler(error_handler)
 
+
+def build_application(
+    builder: Optional[ApplicationBuilder] = None,
+    max_concurrent_updates: int = MAX_CONCURRENT_UPDATES,
+    persistence: Optional[BasePersistence] = None
+) -> Application:
+    """
+    Build the application with all handlers.
+
+    Updates of different chats are processed concurrently (up to
+    ``max_concurrent_updates``), updates of the same chat in order.
+    Conversation states and user/chat data are kept in ``persistence`` if given.
+    """
+    warm_keyboard_cache()
+
+    # Create the Application and pass it your bot's token
+    if builder is None:
+        builder = Application.builder().token(TOKEN)
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    application = (
+        builder
+        .concurrent_updates(ChatOrderedUpdateProcessor(max_concurrent_updates))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    add_handlers(application)
+    return application
+
+
+def main() -> None:
+    """Start the bot in the mode selected by BOT_MODE (polling, webhook or sharded)."""
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    if BOT_MODE == "sharded":
+        run_sharded(TOKEN)
+        return
+
+    application = build_application(persistence=create_persistence())
+
     # Start the Bot
-    application.run_polling()
+    if BOT_MODE == "webhook":
+        run_webhook(application)
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
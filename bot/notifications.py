@@ -0,0 +1,237 @@
+"""
+Rate-limited delivery of shift reminders, swap decision notices and replacement offers.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from telegram.error import Forbidden, NetworkError, RetryAfter, TimedOut
+from telegram.ext import ContextTypes
+
+from db.base import get_session
+from db.models.swap_request import SwapRequestStatus
+from db.repository.shift_repository import ShiftRepository
+from db.repository.swap_repository import SwapRequestRepository
+from utils.rate_limit import TokenBucket
+from utils.translations import Language, get_translation
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages per second overall and 1 per second per chat
+GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "30"))
+PER_CHAT_RATE = float(os.getenv("NOTIFY_PER_CHAT_RATE", "1"))
+MAX_RETRIES = 5
+BASE_BACKOFF = 1.0
+SENDER_COUNT = 8
+# Idle per-chat buckets are pruned once this many are tracked
+MAX_CHAT_BUCKETS = 10000
+
+# Time of day at which reminders for the next day are sent
+REMINDER_TIME = time(int(os.getenv("REMINDER_HOUR", "18")), 0)
+
+
+class Notification:
+    """A message waiting to be delivered, optionally with an inline keyboard."""
+    __slots__ = ("chat_id", "text", "reply_markup", "attempts")
+
+    def __init__(self, chat_id: int, text: str, reply_markup: Optional[Any] = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.reply_markup = reply_markup
+        self.attempts = 0
+
+    def send_kwargs(self) -> Dict[str, Any]:
+        """Arguments of the bot's send_message call delivering the notification."""
+        kwargs: Dict[str, Any] = {"chat_id": self.chat_id, "text": self.text}
+        if self.reply_markup is not None:
+            kwargs["reply_markup"] = self.reply_markup
+        return kwargs
+
+
+class NotificationService:
+    """
+    Queue of notifications drained through global and per-chat token buckets.
+
+    ``bot`` only needs an async ``send_message(chat_id, text)``, also taking
+    ``reply_markup`` for notifications with a keyboard, so the service can be
+    exercised against a local fake bot.
+    """
+    def __init__(
+        self,
+        bot: Any,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        senders: int = SENDER_COUNT
+    ):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        # No burst capacity: Telegram counts messages over a sliding second
+        self.global_bucket = TokenBucket(global_rate, capacity=1)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.queue: "asyncio.Queue[Notification]" = asyncio.Queue()
+        self.senders = senders
+        self.stats = {"sent": 0, "failed": 0, "retried": 0}
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, notification: Notification) -> None:
+        """
+        Queue a notification for delivery.
+        """
+        self.queue.put_nowait(notification)
+
+    def enqueue_many(self, notifications: Iterable[Notification]) -> int:
+        """
+        Queue several notifications and return how many were queued.
+        """
+        count = 0
+        for notification in notifications:
+            self.queue.put_nowait(notification)
+            count += 1
+        return count
+
+    async def start(self) -> None:
+        """
+        Start the sender tasks.
+        """
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.senders)]
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued notification has been delivered or dropped.
+        """
+        await self.queue.join()
+        self.chat_buckets.clear()
+
+    async def stop(self) -> None:
+        """
+        Stop the sender tasks; undelivered notifications stay queued.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                self.chat_buckets = {
+                    key: value for key, value in self.chat_buckets.items()
+                    if value.delay() > 0
+                }
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+        return bucket
+
+    async def _run(self) -> None:
+        while True:
+            notification = await self.queue.get()
+            try:
+                await self._deliver(notification)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, notification: Notification) -> None:
+        while True:
+            await self._chat_bucket(notification.chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(**notification.send_kwargs())
+                self.stats["sent"] += 1
+                return
+            except RetryAfter as error:
+                # Flood control applies to the whole bot, so every sender backs off
+                retry_after = error.retry_after
+                seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else retry_after
+                self.global_bucket.pause(seconds)
+                delay = 0.0
+            except (TimedOut, NetworkError) as error:
+                delay = BASE_BACKOFF * 2 ** notification.attempts
+                logger.warning(f"Sending to {notification.chat_id} failed: {error}")
+            except Forbidden:
+                logger.info(f"Chat {notification.chat_id} blocked the bot, dropping notification")
+                self.stats["failed"] += 1
+                return
+
+            notification.attempts += 1
+            if notification.attempts > MAX_RETRIES:
+                logger.error(f"Giving up on notification to {notification.chat_id}")
+                self.stats["failed"] += 1
+                return
+            self.stats["retried"] += 1
+            await asyncio.sleep(delay)
+
+
+async def collect_shift_reminders(day: date) -> List[Notification]:
+    """
+    Build reminders for everyone assigned to a shift on the given day.
+    """
+    async with get_session() as session:
+        assignments = await ShiftRepository(session).get_assignments_on(day)
+    reminders = []
+    for assignment in assignments:
+        user = assignment.user
+        language = user.language or Language.ENGLISH
+        reminders.append(Notification(
+            user.telegram_id,
+            get_translation(
+                "shift_reminder", language,
+                shift_type=assignment.shift.shift_type.value,
+                date=assignment.shift.date.strftime("%Y-%m-%d"),
+            ),
+        ))
+    return reminders
+
+
+def swap_decision_notification(
+    telegram_id: int, shift_date: datetime, approved: bool, language: Language
+) -> Notification:
+    """
+    Build the notice sent to a user when their swap request is decided.
+    """
+    key = "swap_approved_notice" if approved else "swap_rejected_notice"
+    return Notification(
+        telegram_id,
+        get_translation(key, language, date=shift_date.strftime("%Y-%m-%d")),
+    )
+
+
+async def collect_swap_decisions(request_ids: Iterable[int]) -> List[Notification]:
+    """
+    Build decision notices for the requesters of the given approved or rejected swaps.
+    """
+    async with get_session() as session:
+        rows = await SwapRequestRepository(session).get_decisions(request_ids)
+    decided = (SwapRequestStatus.APPROVED, SwapRequestStatus.REJECTED)
+    return [
+        swap_decision_notification(
+            row.telegram_id, row.date, row.status == SwapRequestStatus.APPROVED,
+            row.language or Language.ENGLISH,
+        )
+        for row in rows
+        if row.status in decided
+    ]
+
+
+async def send_notification(context: ContextTypes.DEFAULT_TYPE, notification: Notification) -> None:
+    """
+    Queue a notification, or send it right away if no notification service runs.
+    """
+    service: Optional[NotificationService] = context.bot_data.get("notifications")
+    if service is not None:
+        service.enqueue(notification)
+    else:
+        await context.bot.send_message(**notification.send_kwargs())
+
+
+async def send_shift_reminders(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Job queueing reminders for tomorrow's shifts.
+    """
+    service: Optional[NotificationService] = context.bot_data.get("notifications")
+    if service is None:
+        return
+    reminders = await collect_shift_reminders(date.today() + timedelta(days=1))
+    logger.info(f"Queued {service.enqueue_many(reminders)} shift reminders")
@@ -0,0 +1,229 @@
+"""
+In-memory index of who is on call, for /oncall and escalation lookups.
+
+Held assignments of the shifts around today are loaded into one interval
+index per department; other dates are looked up in the database. Intervals
+come from ``get_shift_bounds``, so shifts crossing midnight (Night 22:00 -
+08:00, the chained weekend slots ending at 23:59) cover the right hours of
+the next day. Assignments committed by this
+process are applied incrementally; the whole window is reloaded every
+ONCALL_REFRESH_INTERVAL seconds to pick up changes made by other processes.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from db.base import get_session
+from db.listeners import add_assignment_listener
+from db.repository.assignment_repository import AssignmentRepository
+from utils.intervals import IntervalIndex
+from utils.scheduler import get_scheduled_slot, get_shift_bounds
+
+logger = logging.getLogger(__name__)
+
+# Days of shifts loaded after today; shifts of the day before are always loaded
+# because they may still be running
+ONCALL_HORIZON_DAYS = int(os.getenv("ONCALL_HORIZON_DAYS", "14"))
+ONCALL_REFRESH_INTERVAL = float(os.getenv("ONCALL_REFRESH_INTERVAL", "300"))
+
+
+class OnCallEntry:
+    """A held assignment with the bounds of its shift."""
+    __slots__ = (
+        "assignment_id", "shift_id", "department_id", "telegram_id", "username",
+        "description", "start", "end",
+    )
+
+    def __init__(self, row: Any):
+        slot = get_scheduled_slot(row.date, row.slot)
+        self.assignment_id: int = row.assignment_id
+        self.shift_id: int = row.shift_id
+        self.department_id: int = row.department_id
+        self.telegram_id: int = row.telegram_id
+        self.username: str = row.username
+        self.description = slot.description
+        self.start, self.end = get_shift_bounds(slot)
+
+
+class OnCallIndex:
+    """
+    Per-department interval indexes of held assignments within a date window.
+
+    Point and range lookups within the horizon (from the day before today
+    to ONCALL_HORIZON_DAYS after it) are O(log n + k) per department; the
+    window is reloaded when the day changes, and in the background when it
+    is stale while lookups keep being answered. Lookups outside the horizon
+    query just the requested range and leave the index alone.
+    """
+    def __init__(
+        self,
+        horizon_days: int = ONCALL_HORIZON_DAYS,
+        refresh_interval: float = ONCALL_REFRESH_INTERVAL
+    ):
+        self.horizon_days = horizon_days
+        self.refresh_interval = refresh_interval
+        self.departments: Dict[int, IntervalIndex[OnCallEntry]] = {}
+        self._department_of: Dict[int, int] = {}
+        # Inclusive range of shift dates loaded
+        self.window: Optional[Tuple[date, date]] = None
+        self.loaded_at = 0.0
+        self.reloads = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._department_of)
+
+    async def reload(self, start: date, end: date) -> None:
+        """
+        Load the held assignments of shifts dated within [start, end].
+        """
+        async with get_session() as session:
+            rows = await AssignmentRepository(session).get_active_between(start, end)
+        intervals: Dict[int, List[Tuple[int, datetime, datetime, OnCallEntry]]] = {}
+        for row in rows:
+            entry = OnCallEntry(row)
+            intervals.setdefault(entry.department_id, []).append(
+                (entry.assignment_id, entry.start, entry.end, entry)
+            )
+        departments: Dict[int, IntervalIndex[OnCallEntry]] = {}
+        for department_id, department_intervals in intervals.items():
+            departments[department_id] = IntervalIndex()
+            departments[department_id].replace(department_intervals)
+        self.departments = departments
+        self._department_of = {
+            entry.assignment_id: department_id
+            for department_id, department_intervals in intervals.items()
+            for _, _, _, entry in department_intervals
+        }
+        self.window = (start, end)
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
+        logger.info(f"Loaded {len(rows)} on-call assignments for {start} to {end}")
+
+    def _horizon(self) -> Tuple[date, date]:
+        # Shifts of the day before today may still be running
+        today = date.today()
+        return today - timedelta(days=1), today + timedelta(days=self.horizon_days)
+
+    def _in_horizon(self, start: datetime, end: datetime) -> bool:
+        first, last = self._horizon()
+        return first < start.date() and end.date() <= last
+
+    async def _ensure_loaded(self) -> None:
+        if self.window != self._horizon():
+            async with self._lock:
+                if self.window != self._horizon():
+                    await self.reload(*self._horizon())
+        elif time.monotonic() - self.loaded_at > self.refresh_interval:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh_window())
+
+    async def _refresh_window(self) -> None:
+        async with self._lock:
+            if time.monotonic() - self.loaded_at <= self.refresh_interval:
+                return
+            try:
+                await self.reload(*self._horizon())
+            except Exception as error:
+                logger.error(f"Failed to reload on-call assignments: {error}")
+
+    async def _query(
+        self, start: datetime, end: datetime, department_id: Optional[int]
+    ) -> List[OnCallEntry]:
+        # One-off lookup outside the horizon, bounded by the requested range
+        async with get_session() as session:
+            rows = await AssignmentRepository(session).get_active_between(
+                start.date() - timedelta(days=1),
+                end.date(),
+                [department_id] if department_id is not None else None,
+            )
+        return [OnCallEntry(row) for row in rows]
+
+    def _indexes(self, department_id: Optional[int]) -> List[IntervalIndex[OnCallEntry]]:
+        if department_id is None:
+            return list(self.departments.values())
+        index = self.departments.get(department_id)
+        return [index] if index is not None else []
+
+    async def at(self, moment: datetime, department_id: Optional[int] = None) -> List[OnCallEntry]:
+        """
+        Get the assignments whose shift is running at the given moment.
+        """
+        if self._in_horizon(moment, moment):
+            await self._ensure_loaded()
+            entries = [
+                entry for index in self._indexes(department_id) for entry in index.at(moment)
+            ]
+        else:
+            entries = [
+                entry
+                for entry in await self._query(moment, moment, department_id)
+                if entry.start <= moment < entry.end
+            ]
+        return sorted(entries, key=lambda entry: (entry.start, entry.username))
+
+    async def between(
+        self, start: datetime, end: datetime, department_id: Optional[int] = None
+    ) -> List[OnCallEntry]:
+        """
+        Get the assignments whose shift overlaps [start, end), in start order.
+        """
+        if self._in_horizon(start, end):
+            await self._ensure_loaded()
+            entries = [
+                entry
+                for index in self._indexes(department_id)
+                for entry in index.overlapping(start, end)
+            ]
+        else:
+            entries = [
+                entry
+                for entry in await self._query(start, end, department_id)
+                if entry.start < end and start < entry.end
+            ]
+        return sorted(entries, key=lambda entry: (entry.start, entry.username))
+
+    def _remove(self, assignment_id: int) -> None:
+        department_id = self._department_of.pop(assignment_id, None)
+        if department_id is not None:
+            self.departments[department_id].remove(assignment_id)
+
+    async def apply_changes(self, changed: Set[int], deleted: Set[int]) -> None:
+        """
+        Update the index after assignments were changed or deleted.
+        """
+        async with self._lock:
+            if self.window is None:
+                return
+            rows = []
+            if changed:
+                async with get_session() as session:
+                    rows = await AssignmentRepository(session).get_active_by_ids(changed)
+            for assignment_id in deleted | changed:
+                self._remove(assignment_id)
+            start, end = self.window
+            for row in rows:
+                if not start <= row.date.date() <= end:
+                    continue
+                entry = OnCallEntry(row)
+                self.departments.setdefault(entry.department_id, IntervalIndex()).add(
+                    entry.assignment_id, entry.start, entry.end, entry
+                )
+                self._department_of[entry.assignment_id] = entry.department_id
+
+
+oncall_index = OnCallIndex()
+add_assignment_listener(oncall_index.apply_changes)
+
+
+async def get_on_call(
+    moment: Optional[datetime] = None, department_id: Optional[int] = None
+) -> List[OnCallEntry]:
+    """
+    Get who is on call at a moment (default now), in one department or all.
+    """
+    return await oncall_index.at(moment or datetime.now(), department_id)
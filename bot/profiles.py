@@ -0,0 +1,179 @@
+"""
+Cached user profiles (language, role and department) used on every update.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from db.base import get_session
+from db.models.user import UserRole
+from db.repository.user_repository import UserRepository
+from utils.cache import CacheStats, TTLCache, get_redis_client
+from utils.metrics import register_cache
+from utils.translations import Language
+
+logger = logging.getLogger(__name__)
+
+SUPERVISOR_ROLES = {UserRole.ADMIN, UserRole.DEPARTMENT_MANAGER, UserRole.SHIFT_MANAGER}
+
+# Time to live of cached profiles, in seconds. The in-process tier is kept
+# short because invalidations only reach the process that made the change.
+PROFILE_MEMORY_TTL = float(os.getenv("PROFILE_MEMORY_TTL", "60"))
+PROFILE_REDIS_TTL = int(os.getenv("PROFILE_REDIS_TTL", "600"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+REDIS_KEY_PREFIX = "profile:"
+
+
+class UserProfile:
+    """The parts of a user needed to answer an update."""
+    __slots__ = ("telegram_id", "language", "role", "department_id", "registered")
+
+    def __init__(
+        self,
+        telegram_id: int,
+        language: Language = Language.ENGLISH,
+        role: UserRole = UserRole.EMPLOYEE,
+        department_id: Optional[int] = None,
+        registered: bool = False
+    ):
+        self.telegram_id = telegram_id
+        self.language = language
+        self.role = role
+        self.department_id = department_id
+        self.registered = registered
+
+    @property
+    def is_supervisor(self) -> bool:
+        """Whether the user may use supervisor commands."""
+        return self.registered and self.role in SUPERVISOR_ROLES
+
+    def to_json(self) -> str:
+        """Serialize the profile for the Redis tier."""
+        return json.dumps({
+            "language": self.language.value,
+            "role": self.role.value,
+            "department_id": self.department_id,
+            "registered": self.registered,
+        })
+
+    @classmethod
+    def from_json(cls, telegram_id: int, data: str) -> "UserProfile":
+        """Deserialize a profile stored in the Redis tier."""
+        fields = json.loads(data)
+        return cls(
+            telegram_id,
+            language=Language(fields["language"]),
+            role=UserRole(fields["role"]),
+            department_id=fields["department_id"],
+            registered=fields["registered"],
+        )
+
+
+class ProfileCache:
+    """
+    Two-tier profile cache: an in-process LRU with an optional shared Redis tier.
+
+    Unknown users are cached as unregistered default profiles so that they do
+    not cost a database query on every update either.
+    """
+    def __init__(self, redis: Any = None, max_size: int = PROFILE_CACHE_SIZE):
+        self.memory: TTLCache[UserProfile] = TTLCache(max_size=max_size, ttl=PROFILE_MEMORY_TTL)
+        self.redis = redis
+        self.redis_stats = CacheStats()
+        self.database_loads = 0
+
+    async def get(self, telegram_id: int) -> UserProfile:
+        """
+        Get a profile, loading it from Redis or the database on a miss.
+        """
+        profile = self.memory.get(telegram_id)
+        if profile is not None:
+            return profile
+
+        profile = await self._get_from_redis(telegram_id)
+        if profile is None:
+            profile = await self._load(telegram_id)
+            await self._set_in_redis(profile)
+        self.memory.set(telegram_id, profile)
+        return profile
+
+    async def invalidate(self, telegram_id: int) -> None:
+        """
+        Drop a profile from every tier after the user has been changed.
+        """
+        self.memory.invalidate(telegram_id)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(f"{REDIS_KEY_PREFIX}{telegram_id}")
+            except Exception as error:
+                logger.warning(f"Could not invalidate profile {telegram_id} in Redis: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit-rate counters of both tiers.
+        """
+        return {
+            "memory": self.memory.stats.as_dict(),
+            "redis": self.redis_stats.as_dict(),
+            "database_loads": self.database_loads,
+        }
+
+    async def _get_from_redis(self, telegram_id: int) -> Optional[UserProfile]:
+        if self.redis is None:
+            return None
+        try:
+            data = await self.redis.get(f"{REDIS_KEY_PREFIX}{telegram_id}")
+        except Exception as error:
+            logger.warning(f"Could not read profile {telegram_id} from Redis: {error}")
+            return None
+        if data is None:
+            self.redis_stats.misses += 1
+            return None
+        self.redis_stats.hits += 1
+        return UserProfile.from_json(telegram_id, data)
+
+    async def _set_in_redis(self, profile: UserProfile) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                f"{REDIS_KEY_PREFIX}{profile.telegram_id}", profile.to_json(), ex=PROFILE_REDIS_TTL
+            )
+        except Exception as error:
+            logger.warning(f"Could not store profile {profile.telegram_id} in Redis: {error}")
+
+    async def _load(self, telegram_id: int) -> UserProfile:
+        self.database_loads += 1
+        async with get_session() as session:
+            user = await UserRepository(session).get_by_telegram_id(telegram_id)
+        if user is None:
+            return UserProfile(telegram_id)
+        return UserProfile(
+            telegram_id,
+            language=user.language or Language.ENGLISH,
+            role=user.role,
+            department_id=user.department_id,
+            registered=True,
+        )
+
+
+profile_cache = ProfileCache(redis=get_redis_client())
+register_cache("profile", lambda: {
+    "memory": profile_cache.memory.stats,
+    "redis": profile_cache.redis_stats,
+})
+
+
+async def get_user_profile(telegram_id: int) -> UserProfile:
+    """
+    Get the cached profile of a Telegram user.
+    """
+    return await profile_cache.get(telegram_id)
+
+
+async def invalidate_user_profile(telegram_id: int) -> None:
+    """
+    Invalidate the cached profile of a Telegram user.
+    """
+    await profile_cache.invalidate(telegram_id)
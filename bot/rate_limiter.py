@@ -0,0 +1,178 @@
+"""
+Inbound rate limiting of updates, applied before any other handler runs.
+"""
+import logging
+import os
+import time
+from typing import Any, Dict
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from bot.profiles import get_user_profile
+from utils.cache import TTLCache, get_redis_client
+from utils.rate_limit import TokenBucket
+from utils.translations import Language, get_translation
+
+logger = logging.getLogger(__name__)
+
+# Tokens per second and burst size, per user and for the whole bot
+USER_RATE = float(os.getenv("RATE_LIMIT_USER_RATE", "1"))
+USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", "100"))
+GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "200"))
+
+# Cost of each command; anything not listed costs DEFAULT_COST
+COMMAND_COSTS: Dict[str, float] = {
+    "start": 1,
+    "help": 1,
+    "myshift": 2,
+    "schedule": 3,
+    "export": 5,
+    "oncall": 1,
+    "swap": 2,
+    "create_shift": 2,
+    "assign_shift": 2,
+    "approve_swap": 2,
+    "manage_users": 2,
+    "publish": 5,
+    "auto_assign": 5,
+    "coverage": 3,
+    "department_report": 3,
+    "match_swaps": 5,
+    "replace": 3,
+}
+DEFAULT_COST = 1.0
+
+# Full (idle) user buckets are pruned once this many are tracked
+MAX_USER_BUCKETS = 100000
+
+# A limited user is told to slow down at most once per interval
+SLOW_DOWN_NOTICE_INTERVAL = 10.0
+SLOW_DOWN_MESSAGES = {language: get_translation("slow_down", language) for language in Language}
+
+# Atomically refills and charges a user bucket and the global bucket.
+# KEYS: user bucket, global bucket. ARGV: cost, user rate/burst, global rate/burst.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local tokens = {}
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2])
+    local burst = tonumber(ARGV[index * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local current = tonumber(state[1]) or burst
+    local updated_at = tonumber(state[2]) or now
+    tokens[index] = math.min(burst, current + (now - updated_at) * rate)
+end
+local allowed = tokens[1] >= cost and tokens[2] >= cost
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2])
+    local burst = tonumber(ARGV[index * 2 + 1])
+    local remaining = tokens[index]
+    if allowed then remaining = remaining - cost end
+    redis.call('HSET', key, 'tokens', remaining, 'updated_at', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+if allowed then return 1 end
+return 0
+"""
+
+
+class MemoryRateLimiter:
+    """Per-user and global token buckets held in this process."""
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_BURST)
+        self.user_buckets: Dict[int, TokenBucket] = {}
+
+    async def allow(self, user_id: int, cost: float) -> bool:
+        """
+        Charge the cost to the user and the bot; return False if either is exhausted.
+        """
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            if len(self.user_buckets) >= MAX_USER_BUCKETS:
+                self.user_buckets = {
+                    key: value for key, value in self.user_buckets.items()
+                    if value.delay(USER_BURST) > 0
+                }
+            bucket = self.user_buckets[user_id] = TokenBucket(USER_RATE, capacity=USER_BURST)
+        if bucket.delay(cost) > 0 or self.global_bucket.delay(cost) > 0:
+            return False
+        bucket.try_acquire(cost)
+        self.global_bucket.try_acquire(cost)
+        return True
+
+
+class RedisRateLimiter:
+    """Token buckets kept in Redis, shared by every bot process."""
+    def __init__(self, redis: Any):
+        self.redis = redis
+        self.script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.fallback = MemoryRateLimiter()
+
+    async def allow(self, user_id: int, cost: float) -> bool:
+        """
+        Charge the cost to the user and the bot; return False if either is exhausted.
+        """
+        try:
+            allowed = await self.script(
+                keys=[f"ratelimit:user:{user_id}", "ratelimit:global"],
+                args=[cost, USER_RATE, USER_BURST, GLOBAL_RATE, GLOBAL_BURST],
+            )
+        except Exception as error:
+            logger.warning(f"Redis rate limiter unavailable, using in-process buckets: {error}")
+            return await self.fallback.allow(user_id, cost)
+        return bool(allowed)
+
+
+def create_rate_limiter() -> Any:
+    """
+    Create the Redis-backed limiter if REDIS_URL is configured, else the in-process one.
+    """
+    redis = get_redis_client()
+    return RedisRateLimiter(redis) if redis is not None else MemoryRateLimiter()
+
+
+rate_limiter = create_rate_limiter()
+_notified = TTLCache(max_size=10000, ttl=SLOW_DOWN_NOTICE_INTERVAL)
+
+
+def get_update_cost(update: Update) -> float:
+    """
+    Get the cost weight of an update from the command it carries.
+    """
+    message = update.effective_message
+    if update.callback_query is None and message is not None and message.text:
+        text = message.text
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+            return COMMAND_COSTS.get(command, DEFAULT_COST)
+    return DEFAULT_COST
+
+
+async def rate_limit_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Stop processing of updates from users that exceed their rate.
+
+    Registered in a group before the conversation handler. Limited users get
+    a pre-translated reply instead of a full handler run.
+    """
+    user = update.effective_user
+    if user is None:
+        return
+    if await rate_limiter.allow(user.id, get_update_cost(update)):
+        return
+
+    if _notified.get(user.id) is None:
+        _notified.set(user.id, time.monotonic())
+        language = (await get_user_profile(user.id)).language
+        message = SLOW_DOWN_MESSAGES[language]
+        if update.callback_query is not None:
+            await update.callback_query.answer(message)
+        elif update.effective_message is not None:
+            await update.effective_message.reply_text(message)
+    elif update.callback_query is not None:
+        await update.callback_query.answer()
+    raise ApplicationHandlerStop
@@ -0,0 +1,334 @@
+"""
+Last-minute replacements ranked from in-memory availability bitmaps.
+
+Every user's availability over the slots of this and the coming weeks
+(REPLACEMENT_HORIZON_WEEKS, from the day before this week starts) is kept in
+a utils.availability.AvailabilityMatrix with the shifts they hold, so all
+users able to cover a slot are ranked with a few vectorized masks instead
+of one conflict check per user. Only shifts from today to the end of that
+window can be replaced, so the window never grows. Assignments committed by
+this process are applied incrementally; the matrix is rebuilt when the week
+changes and every REPLACEMENT_REFRESH_INTERVAL seconds to pick up preference
+changes, new users and changes made by other processes.
+
+The best candidates are offered the shift through accept and decline
+buttons. Offers are recorded in the database with the manager who sent
+them, so only offered users can answer, whichever process handles the
+answer, and the manager is told about it; the first to accept takes the
+shift over and later ones are told it is covered.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bot.keyboards.keyboards import get_replacement_offer_keyboard
+from bot.notifications import Notification
+from bot.workload import WORKLOAD_FAIRNESS_WEEKS
+from db.base import get_session
+from db.listeners import add_assignment_listener
+from db.repository.assignment_repository import AssignmentRepository
+from db.repository.replacement_repository import ReplacementOfferRepository
+from db.repository.user_repository import UserRepository
+from db.repository.workload_repository import WorkloadRepository
+from utils.assignment import StaffMember
+from utils.availability import AvailabilityMatrix
+from utils.scheduler import ScheduledSlot, get_scheduled_slot, get_week_start
+from utils.translations import Language, get_translation
+
+logger = logging.getLogger(__name__)
+
+# Weeks of shifts loaded from this week on, and seconds between full reloads
+REPLACEMENT_HORIZON_WEEKS = int(os.getenv("REPLACEMENT_HORIZON_WEEKS", "2"))
+REPLACEMENT_REFRESH_INTERVAL = float(os.getenv("REPLACEMENT_REFRESH_INTERVAL", "300"))
+
+# Outcomes of answering a replacement offer
+COVERED = "covered"
+DECLINED = "declined"
+TAKEN = "taken"
+UNAVAILABLE = "unavailable"
+NOT_OFFERED = "not_offered"
+
+# (staff id, day, slot) of a held assignment
+HeldShift = Tuple[str, date, int]
+
+
+def _held_shift(row: Any) -> HeldShift:
+    return str(row.user_id), row.date.date(), row.slot
+
+
+class ReplacementCandidate:
+    """A user able to cover a shift, with their assignment cost."""
+    __slots__ = ("user_id", "telegram_id", "username", "language", "cost")
+
+    def __init__(self, member: Any, cost: float):
+        self.user_id: int = member.id
+        self.telegram_id: int = member.telegram_id
+        self.username: str = member.username
+        self.language: Language = member.language or Language.ENGLISH
+        self.cost = cost
+
+
+class ReplacementIndex:
+    """
+    Availability of every user over this and the coming weeks, with the shifts they hold.
+
+    The window is reloaded when the week changes, and in the background
+    when it is stale while rankings keep being answered. Slots outside it
+    have no candidates.
+    """
+    def __init__(
+        self,
+        horizon_weeks: int = REPLACEMENT_HORIZON_WEEKS,
+        refresh_interval: float = REPLACEMENT_REFRESH_INTERVAL
+    ):
+        self.horizon_weeks = horizon_weeks
+        self.refresh_interval = refresh_interval
+        self.matrix: Optional[AvailabilityMatrix] = None
+        self.members: Dict[str, Any] = {}
+        self._held: Dict[int, HeldShift] = {}
+        # Inclusive range of days loaded; the first one only counts for rest rules
+        self.window: Optional[Tuple[date, date]] = None
+        self.loaded_at = 0.0
+        self.reloads = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._held)
+
+    def _window_for(self, today: date) -> Tuple[date, date]:
+        week = get_week_start(today)
+        return week - timedelta(days=1), week + timedelta(weeks=self.horizon_weeks, days=-1)
+
+    async def reload(self, first: date, last: date) -> None:
+        """
+        Rebuild the matrix from every user and the assignments held within [first, last].
+        """
+        today = date.today()
+        async with get_session() as session:
+            members = await UserRepository(session).get_members()
+            hours = await WorkloadRepository(session).get_hours(
+                None,
+                today - timedelta(weeks=WORKLOAD_FAIRNESS_WEEKS),
+                today - timedelta(weeks=1),
+            )
+            rows = await AssignmentRepository(session).get_active_between(first, last)
+        staff = [
+            StaffMember.from_preference(
+                str(member.id), member.UserPreference, prior_load=hours.get(member.id, 0.0)
+            )
+            for member in members
+        ]
+        matrix = AvailabilityMatrix(
+            first, (last - first).days + 1, staff, [member.department_id for member in members]
+        )
+        held = {row.assignment_id: _held_shift(row) for row in rows}
+        matrix.add_many(held.values())
+        self.matrix = matrix
+        self.members = {str(member.id): member for member in members}
+        self._held = held
+        self.window = (first, last)
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
+        logger.info(
+            f"Loaded availability of {len(members)} users and {len(rows)} assignments "
+            f"for {first} to {last}"
+        )
+
+    def _covers(self, day: date) -> bool:
+        return self.window is not None and self.window[0] < day <= self.window[1]
+
+    async def _ensure_loaded(self) -> None:
+        if self.window != self._window_for(date.today()):
+            async with self._lock:
+                if self.window != self._window_for(date.today()):
+                    await self.reload(*self._window_for(date.today()))
+        elif time.monotonic() - self.loaded_at > self.refresh_interval:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh_window())
+
+    async def _refresh_window(self) -> None:
+        async with self._lock:
+            if time.monotonic() - self.loaded_at <= self.refresh_interval:
+                return
+            try:
+                await self.reload(*self._window_for(date.today()))
+            except Exception as error:
+                logger.error(f"Failed to reload availability: {error}")
+
+    async def candidates(
+        self, row: Any, limit: int, exclude: Iterable[int] = ()
+    ) -> List[ReplacementCandidate]:
+        """
+        Rank the users of a held assignment's department able to take it over, best first.
+
+        The holder and the excluded user ids are left out.
+        """
+        day = row.date.date()
+        await self._ensure_loaded()
+        if not self._covers(day):
+            return []
+        excluded = {str(row.user_id)} | {str(user_id) for user_id in exclude}
+        ranked = self.matrix.rank(day, row.slot, limit, row.department_id, excluded)
+        return [ReplacementCandidate(self.members[staff_id], cost) for staff_id, cost in ranked]
+
+    async def is_available(self, user_id: int, day: date, slot: int) -> bool:
+        """
+        Whether a user can take a slot on top of the shifts they hold.
+        """
+        await self._ensure_loaded()
+        return self._covers(day) and self.matrix.is_available(str(user_id), day, slot)
+
+    async def apply_changes(self, changed: Set[int], deleted: Set[int]) -> None:
+        """
+        Update the held shifts after assignments were changed or deleted.
+        """
+        async with self._lock:
+            if self.matrix is None:
+                return
+            rows = []
+            if changed:
+                async with get_session() as session:
+                    rows = await AssignmentRepository(session).get_active_by_ids(changed)
+            for assignment_id in deleted | changed:
+                held = self._held.pop(assignment_id, None)
+                if held is not None:
+                    self.matrix.remove(*held)
+            for row in rows:
+                held = _held_shift(row)
+                if self.matrix.add(*held):
+                    self._held[row.assignment_id] = held
+
+
+replacement_index = ReplacementIndex()
+add_assignment_listener(replacement_index.apply_changes)
+
+
+def get_replacement_range(today: Optional[date] = None) -> Tuple[date, date]:
+    """
+    Get the first and last day whose shifts can be replaced: today to the end of the horizon.
+    """
+    today = today or date.today()
+    return today, replacement_index._window_for(today)[1]
+
+
+async def find_absence(
+    username: str, department_ids: List[int], day: Optional[date] = None
+) -> Optional[Any]:
+    """
+    Get a user's held assignment on a day, or their next one, within some departments.
+
+    The row is like AssignmentRepository.get_active_between's; None is
+    returned if the user is unknown or holds no such assignment.
+    """
+    start, end = (day, day) if day else get_replacement_range()
+    async with get_session() as session:
+        user = await UserRepository(session).get_by_username(username)
+        if user is None:
+            return None
+        rows = await AssignmentRepository(session).get_active_for_users([user.id], start, end)
+    rows = [row for row in rows if row.department_id in department_ids]
+    return min(rows, key=lambda row: (row.date, row.slot), default=None)
+
+
+async def find_replacements(row: Any, limit: int) -> List[ReplacementCandidate]:
+    """
+    Rank who can take over a held assignment, leaving out users who declined it.
+    """
+    async with get_session() as session:
+        declined = await ReplacementOfferRepository(session).get_declined(row.assignment_id)
+    return await replacement_index.candidates(row, limit, declined)
+
+
+def replacement_offer_notification(candidate: ReplacementCandidate, row: Any) -> Notification:
+    """
+    Build the offer to cover an assignment, with accept and decline buttons.
+    """
+    slot = get_scheduled_slot(row.date, row.slot)
+    return Notification(
+        candidate.telegram_id,
+        get_translation(
+            "replacement_offer", candidate.language,
+            shift=slot.description, date=slot.date.strftime("%Y-%m-%d"),
+        ),
+        reply_markup=get_replacement_offer_keyboard(row.assignment_id, candidate.language),
+    )
+
+
+async def offer_replacement(
+    row: Any, candidates: List[ReplacementCandidate], manager_telegram_id: int
+) -> List[Notification]:
+    """
+    Record that a manager offers an assignment to some candidates; return the offers to send.
+    """
+    async with get_session() as session:
+        manager = await UserRepository(session).get_by_telegram_id(manager_telegram_id)
+        if manager is None:
+            return []
+        await ReplacementOfferRepository(session).record(
+            row.assignment_id, (candidate.user_id for candidate in candidates), manager.id
+        )
+    return [replacement_offer_notification(candidate, row) for candidate in candidates]
+
+
+async def accept_replacement(
+    assignment_id: int, telegram_id: int
+) -> Tuple[str, Optional[ScheduledSlot], Optional[int]]:
+    """
+    Hand an assignment over to a user accepting the offer they were sent for it.
+
+    Returns the outcome, the slot and the Telegram id of the manager who
+    sent the offer: COVERED with both if the user took the slot over,
+    NOT_OFFERED if the user has no open offer for the assignment, TAKEN if
+    it is no longer held (someone else accepted first), or UNAVAILABLE with
+    the slot if the user can no longer take it.
+    """
+    async with get_session() as session:
+        user = await UserRepository(session).get_by_telegram_id(telegram_id)
+        offer = None
+        if user is not None:
+            offer = await ReplacementOfferRepository(session).get_open(assignment_id, user.id)
+        if offer is None:
+            return NOT_OFFERED, None, None
+        repository = AssignmentRepository(session)
+        rows = await repository.get_active_by_ids([assignment_id])
+        if not rows:
+            return TAKEN, None, None
+        row = rows[0]
+        slot = get_scheduled_slot(row.date, row.slot)
+        if (
+            user.department_id != row.department_id
+            or not await replacement_index.is_available(user.id, row.date.date(), row.slot)
+        ):
+            return UNAVAILABLE, slot, None
+        if await repository.hand_over(assignment_id, user.id) is None:
+            return TAKEN, None, None
+    return COVERED, slot, offer.manager_telegram_id
+
+
+async def decline_replacement(
+    assignment_id: int, telegram_id: int
+) -> Tuple[str, Optional[ScheduledSlot], Optional[int]]:
+    """
+    Record that a user declined the offer they were sent for an assignment.
+
+    Returns DECLINED with the slot and the Telegram id of the manager who
+    sent the offer, NOT_OFFERED if the user has no open offer for the
+    assignment, or TAKEN if it is no longer held.
+    """
+    async with get_session() as session:
+        user = await UserRepository(session).get_by_telegram_id(telegram_id)
+        repository = ReplacementOfferRepository(session)
+        offer = None
+        if user is not None:
+            offer = await repository.get_open(assignment_id, user.id)
+        if offer is None:
+            return NOT_OFFERED, None, None
+        await repository.decline(offer.id)
+        rows = await AssignmentRepository(session).get_active_by_ids([assignment_id])
+    if not rows:
+        return TAKEN, None, None
+    return DECLINED, get_scheduled_slot(rows[0].date, rows[0].slot), offer.manager_telegram_id
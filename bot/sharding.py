@@ -0,0 +1,279 @@
+"""
+Sharded serving mode: one supervisor receives updates, worker processes handle them.
+
+The supervisor fetches updates once (long polling, or a webhook if
+WEBHOOK_URL is set) and routes each to a worker process chosen by its chat
+id, so all updates of a chat are handled in order by the same worker. Each
+worker runs a complete application on its own core; workers share state
+through the database and the SQLite persistence, and serve their own
+metrics. Crashed workers are restarted on a fresh queue: a process killed
+while reading may leave the old queue's lock held, so updates still queued
+for it are dropped.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+from telegram import Bot, Update
+from telegram.error import NetworkError
+from telegram.ext import Application
+
+from bot.update_processor import get_update_chat_id
+from bot.webhook import create_update_app
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = int(os.getenv("BOT_WORKERS", str(os.cpu_count() or 1)))
+# Updates waiting per worker before the supervisor blocks
+QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))
+# Seconds between checks for crashed workers
+WORKER_CHECK_INTERVAL = 1.0
+# Seconds a worker gets to finish its queued updates on shutdown
+WORKER_STOP_TIMEOUT = 30.0
+POLL_TIMEOUT = 10
+
+ApplicationFactory = Callable[[int], Application]
+
+
+def create_worker_application(shard: int) -> Application:
+    """
+    Build the application of a worker, with the shared persistence.
+
+    Metrics are recorded in the worker that handles an update, so with
+    METRICS_PORT set every worker serves its own on METRICS_PORT + 1 + shard.
+    """
+    # Imported here: bot.main imports this module
+    from bot.main import METRICS_PORT, build_application
+    from db.persistence import create_persistence
+    from utils.metrics import start_metrics_server
+
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT) + 1 + shard)
+    return build_application(persistence=create_persistence())
+
+
+async def _serve_shard(
+    shard: int,
+    updates: multiprocessing.Queue,
+    ready: Any,
+    application_factory: ApplicationFactory
+) -> None:
+    application = application_factory(shard)
+    application.bot_data["shard"] = shard
+    loop = asyncio.get_running_loop()
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        ready.set()
+        logger.info(f"Worker {shard} started")
+        while True:
+            data = await loop.run_in_executor(None, updates.get)
+            if data is None:
+                break
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        # Waits for every queued and running update
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    logger.info(f"Worker {shard} stopped")
+
+
+def run_worker(
+    shard: int,
+    updates: multiprocessing.Queue,
+    ready: Any,
+    application_factory: ApplicationFactory
+) -> None:
+    """
+    Entry point of a worker process: handle updates from the queue until it yields None.
+    """
+    # The supervisor handles interrupts and stops workers through their queues
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_shard(shard, updates, ready, application_factory))
+
+
+class ShardSupervisor:
+    """
+    Routes updates by chat id to worker processes and restarts crashed workers.
+    """
+    def __init__(
+        self,
+        workers: int = WORKER_COUNT,
+        application_factory: ApplicationFactory = create_worker_application,
+        queue_size: int = QUEUE_SIZE
+    ):
+        self.workers = max(workers, 1)
+        self.application_factory = application_factory
+        self.queue_size = queue_size
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue(queue_size) for _ in range(self.workers)]
+        self.ready = [self._context.Event() for _ in range(self.workers)]
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self.restarts = 0
+        self._stopping = False
+        self._monitor: Optional[asyncio.Task] = None
+
+    def _start_worker(self, shard: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(shard, self.queues[shard], self.ready[shard], self.application_factory),
+            name=f"shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[shard] = process
+
+    def start(self) -> None:
+        """Start every worker and the crash monitor."""
+        for shard in range(self.workers):
+            self._start_worker(shard)
+        self._monitor = asyncio.create_task(self._watch_workers())
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every worker has started; return False on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        for ready in self.ready:
+            if not await loop.run_in_executor(None, ready.wait, timeout):
+                return False
+        return True
+
+    async def _watch_workers(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL)
+            for shard, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.error(f"Worker {shard} exited with code {process.exitcode}, restarting")
+                    self.restarts += 1
+                    self._replace_queue(shard)
+                    self._start_worker(shard)
+
+    def _replace_queue(self, shard: int) -> None:
+        old = self.queues[shard]
+        self.queues[shard] = self._context.Queue(self.queue_size)
+        self.ready[shard] = self._context.Event()
+        try:
+            dropped = old.qsize()
+        except NotImplementedError:
+            dropped = "unknown"
+        logger.warning(f"Dropped {dropped} updates queued for worker {shard}")
+        old.cancel_join_thread()
+        old.close()
+
+    def shard_of(self, update: Update) -> int:
+        """
+        Get the worker of an update: by chat id, so each chat stays on one worker.
+        """
+        chat_id = get_update_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        return key % self.workers
+
+    async def dispatch(self, data: Dict[str, Any]) -> None:
+        """
+        Queue the JSON payload of an update for its worker, waiting while the queue is full.
+        """
+        updates = self.queues[self.shard_of(Update.de_json(data, None))]
+        try:
+            updates.put_nowait(data)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, updates.put, data)
+
+    async def stop(self, timeout: float = WORKER_STOP_TIMEOUT) -> None:
+        """
+        Let every worker finish its queued updates, then stop it.
+        """
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        loop = asyncio.get_running_loop()
+        for updates in self.queues:
+            await loop.run_in_executor(None, updates.put, None)
+        for shard, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {shard} did not stop in time, terminating")
+                process.terminate()
+
+
+async def poll_updates(bot: Bot, supervisor: ShardSupervisor, stop_event: asyncio.Event) -> None:
+    """
+    Fetch updates by long polling and dispatch them until the stop event is set.
+    """
+    await bot.delete_webhook()
+    offset = 0
+    while not stop_event.is_set():
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES
+            )
+        except NetworkError as error:
+            logger.warning(f"Failed to fetch updates: {error}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            await supervisor.dispatch(update.to_dict())
+    # Confirm the dispatched updates so they are not delivered again
+    await bot.get_updates(offset=offset, timeout=0)
+
+
+async def serve_sharded(
+    token: str,
+    workers: int = WORKER_COUNT,
+    stop_event: Optional[asyncio.Event] = None
+) -> None:
+    """
+    Run the supervisor and its workers until the stop event is set.
+    """
+    stop_event = stop_event or asyncio.Event()
+    supervisor = ShardSupervisor(workers)
+    supervisor.start()
+    if await supervisor.wait_ready(WORKER_STOP_TIMEOUT):
+        logger.info(f"Dispatching updates to {supervisor.workers} workers")
+    else:
+        logger.warning("Not every worker started in time, dispatching anyway")
+
+    webhook_url = os.getenv("WEBHOOK_URL")
+    async with Bot(token) as bot:
+        if webhook_url:
+            secret_token = os.getenv("WEBHOOK_SECRET")
+            runner = web.AppRunner(create_update_app(supervisor.dispatch, secret_token))
+            await runner.setup()
+            await web.TCPSite(
+                runner, os.getenv("WEBHOOK_HOST", "0.0.0.0"), int(os.getenv("WEBHOOK_PORT", "8443"))
+            ).start()
+            await bot.set_webhook(
+                url=webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES
+            )
+            try:
+                await stop_event.wait()
+            finally:
+                await runner.cleanup()
+        else:
+            await poll_updates(bot, supervisor, stop_event)
+
+    await supervisor.stop()
+
+
+def run_sharded(token: str) -> None:
+    """
+    Run the sharded mode configured by BOT_WORKERS until interrupted.
+    """
+    async def main() -> None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await serve_sharded(token, stop_event=stop_event)
+
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""
+Batch matching of pending swap requests into direct and multi-party swaps.
+
+Pending requests whose users still hold the offered shift are matched by
+utils.swap_matching against a ConflictChecker loaded with every involved
+user's held shifts around the requested dates, so proposed swaps respect
+rest hours, days off and weekly caps. Approving a match checks it again,
+then marks the given away assignments as swapped and assigns the
+requested shifts, in one transaction per match.
+"""
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from db.base import get_session
+from db.repository.assignment_repository import AssignmentRepository
+from db.repository.shift_repository import ShiftRepository
+from db.repository.swap_repository import SwapRequestRepository
+from db.repository.user_repository import UserRepository
+from utils.assignment import StaffMember
+from utils.conflicts import ConflictChecker
+from utils.scheduler import ScheduledSlot, get_scheduled_slot, get_week_start
+from utils.swap_matching import SwapMatch, SwapMatcher, SwapOffer
+
+# chat_data key of the matches listed by the last /match_swaps, awaiting approval
+SWAP_MATCHES_KEY = "swap_matches"
+
+
+class SwapProposals:
+    """Matches found in one batch run, with the shifts and users they involve."""
+    def __init__(
+        self,
+        matches: List[SwapMatch],
+        pending: int,
+        shifts: Dict[int, ScheduledSlot],
+        usernames: Dict[str, str]
+    ):
+        self.matches = matches
+        self.pending = pending
+        self.shifts = shifts
+        self.usernames = usernames
+
+    @property
+    def matched(self) -> int:
+        """Number of requests taking part in a match."""
+        return sum(len(match) for match in self.matches)
+
+    def describe(self, match: SwapMatch) -> List[str]:
+        """
+        Describe who takes which shift in a match, one line per request.
+        """
+        lines = []
+        for offer in match.offers:
+            slot = self.shifts[offer.wanted]
+            lines.append(
+                f"@{self.usernames.get(offer.staff_id, offer.staff_id)} takes "
+                f"{slot.date:%Y-%m-%d} {slot.description}"
+            )
+        return lines
+
+
+async def _load_swaps(
+    department_ids: Optional[List[int]], request_ids: Optional[List[int]] = None
+) -> Tuple[List[SwapOffer], Dict[int, ScheduledSlot], ConflictChecker, Dict[str, str]]:
+    """
+    Load pending requests as offers, with their shifts and a checker of the users' held shifts.
+    """
+    async with get_session() as session:
+        requests = await SwapRequestRepository(session).get_pending(department_ids, request_ids)
+        if not requests:
+            return [], {}, ConflictChecker(), {}
+        user_ids = {request.user_id for request in requests}
+        shift_ids = {request.shift_id for request in requests}
+        shift_ids |= {request.requested_shift_id for request in requests}
+        shifts = {
+            row.id: get_scheduled_slot(row.date, row.slot)
+            for row in await ShiftRepository(session).get_slots(shift_ids)
+        }
+        # Whole weeks around the requested shifts, and the night before them
+        days = [slot.date.date() for slot in shifts.values()]
+        start = get_week_start(min(days)) - timedelta(days=1)
+        end = get_week_start(max(days)) + timedelta(days=7)
+        held = await AssignmentRepository(session).get_active_for_users(user_ids, start, end)
+        preferences = await UserRepository(session).get_preferences(user_ids)
+
+    checker = ConflictChecker(
+        StaffMember.from_preference(str(user_id), preferences.get(user_id))
+        for user_id in user_ids
+    )
+    usernames = {}
+    for row in held:
+        checker.add(str(row.user_id), row.shift_id, get_scheduled_slot(row.date, row.slot))
+        usernames[str(row.user_id)] = row.username
+    offers = [
+        SwapOffer(request.id, str(request.user_id), request.shift_id, request.requested_shift_id)
+        for request in requests
+        if request.requested_shift_id in shifts
+    ]
+    return offers, shifts, checker, usernames
+
+
+async def find_swap_proposals(department_ids: Optional[List[int]] = None) -> SwapProposals:
+    """
+    Match the pending swap requests of the given departments' users, or of everyone.
+    """
+    offers, shifts, checker, usernames = await _load_swaps(department_ids)
+    matches = SwapMatcher(offers, shifts, checker).match()
+    return SwapProposals(matches, len(offers), shifts, usernames)
+
+
+async def approve_swap_matches(
+    request_ids: List[List[int]], approver_telegram_id: int
+) -> List[List[int]]:
+    """
+    Approve the given matches, each as the request ids of a cycle; return the approved ones.
+
+    Matches are checked again against the current shifts first: one is
+    skipped if a request is no longer pending, its user no longer holds the
+    offered shift, or the exchange now breaks a rule.
+    """
+    offers, shifts, checker, _ = await _load_swaps(
+        None, [request_id for match in request_ids for request_id in match]
+    )
+    by_id = {offer.request_id: offer for offer in offers}
+    approved: List[List[int]] = []
+    for match in request_ids:
+        cycle = [by_id[request_id] for request_id in match if request_id in by_id]
+        if len(cycle) < len(match) or any(
+            offer.wanted != following.offered
+            for offer, following in zip(cycle, cycle[1:] + cycle[:1])
+        ):
+            continue
+        assignments = [(offer.staff_id, offer.offered, shifts[offer.offered]) for offer in cycle]
+        if checker.check_cycle(assignments) is not None:
+            continue
+        async with get_session() as session:
+            approver = await UserRepository(session).get_by_telegram_id(approver_telegram_id)
+            if approver is None:
+                return approved
+            if not await SwapRequestRepository(session).approve_cycle(match, approver.id):
+                continue
+        checker.apply_cycle(assignments)
+        approved.append(match)
+    return approved
@@ -0,0 +1,71 @@
+"""
+Concurrent update processing that keeps updates of the same chat in order.
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from utils.metrics import track_update
+
+
+def get_update_chat_id(update: object) -> Optional[int]:
+    """
+    Get the id of the chat (or, failing that, the user) an update belongs to.
+    """
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Process updates of different chats concurrently and updates of one chat in order.
+
+    Updates wait for their chat's lock before taking one of the
+    ``max_concurrent_updates`` processing slots, so a busy chat cannot hold
+    slots while its updates queue up. Locks are handed out in arrival order.
+    """
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: Optional[int] = None):
+        super().__init__(max_pending_updates or max_concurrent_updates * 16)
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # chat id -> (lock, number of updates holding or waiting for it)
+        self._chat_locks: Dict[int, Tuple[asyncio.Lock, int]] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Run the update once its chat is free and a processing slot is available.
+        """
+        chat_id = get_update_chat_id(update)
+        if chat_id is None:
+            async with self._running:
+                with track_update():
+                    await coroutine
+            return
+
+        lock, users = self._chat_locks.get(chat_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._chat_locks[chat_id] = (lock, users + 1)
+        try:
+            async with lock:
+                async with self._running:
+                    with track_update():
+                        await coroutine
+        finally:
+            lock, users = self._chat_locks[chat_id]
+            if users == 1:
+                del self._chat_locks[chat_id]
+            else:
+                self._chat_locks[chat_id] = (lock, users - 1)
+
+    async def initialize(self) -> None:
+        """Nothing to allocate."""
+
+    async def shutdown(self) -> None:
+        """Nothing to release."""
@@ -0,0 +1,142 @@
+"""
+Webhook serving mode on a local aiohttp server.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import signal
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from telegram import Update
+from telegram.ext import Application
+
+from bot.calendar_feed import CALENDAR_ROUTE, handle_calendar_feed
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/telegram"
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+APPLICATION_KEY = web.AppKey("application", Application)
+
+# Receives the JSON payload of every accepted update
+UpdateSink = Callable[[Dict[str, Any]], Awaitable[None]]
+UPDATE_SINK_KEY = web.AppKey("update_sink", object)
+
+
+async def handle_update(request: web.Request) -> web.Response:
+    """
+    Accept an update from Telegram and hand it to the update sink.
+    """
+    secret = request.app.get("secret_token")
+    if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+        return web.Response(status=403)
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+    await request.app[UPDATE_SINK_KEY](data)
+    return web.Response()
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """
+    Expose Prometheus metrics.
+    """
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def create_update_app(
+    sink: UpdateSink,
+    secret_token: Optional[str] = None,
+    path: str = WEBHOOK_PATH
+) -> web.Application:
+    """
+    Create the aiohttp application passing received update payloads to ``sink``.
+    """
+    app = web.Application()
+    app[UPDATE_SINK_KEY] = sink
+    app["secret_token"] = secret_token
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get(CALENDAR_ROUTE, handle_calendar_feed)
+    return app
+
+
+def create_webhook_app(
+    application: Application,
+    secret_token: Optional[str] = None,
+    path: str = WEBHOOK_PATH
+) -> web.Application:
+    """
+    Create the aiohttp application receiving updates for the bot application.
+    """
+    async def queue_update(data: Dict[str, Any]) -> None:
+        await application.update_queue.put(Update.de_json(data, application.bot))
+
+    app = create_update_app(queue_update, secret_token, path)
+    app[APPLICATION_KEY] = application
+    return app
+
+
+async def serve_webhook(
+    application: Application,
+    host: str,
+    port: int,
+    webhook_url: Optional[str],
+    secret_token: Optional[str] = None,
+    stop_event: Optional[asyncio.Event] = None
+) -> None:
+    """
+    Run the bot behind the webhook server until the stop event is set.
+
+    Registers the webhook with Telegram when ``webhook_url`` is given.
+    """
+    stop_event = stop_event or asyncio.Event()
+    app = create_webhook_app(application, secret_token)
+    runner = web.AppRunner(app)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Webhook server listening on {host}:{port}{WEBHOOK_PATH}")
+        try:
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+
+def run_webhook(application: Application) -> None:
+    """
+    Run the webhook mode configured by WEBHOOK_URL, WEBHOOK_HOST, WEBHOOK_PORT
+    and WEBHOOK_SECRET until interrupted.
+    """
+    async def main() -> None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await serve_webhook(
+            application,
+            host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBHOOK_PORT", "8443")),
+            webhook_url=os.getenv("WEBHOOK_URL"),
+            secret_token=os.getenv("WEBHOOK_SECRET"),
+            stop_event=stop_event,
+        )
+
+    asyncio.run(main())
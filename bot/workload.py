@@ -0,0 +1,105 @@
+"""
+Weekly workload rollups: incremental upkeep, backfills and fairness input.
+
+Rollups of the users and weeks touched by committed assignment changes are
+recomputed after every commit of this process (swap approvals and
+cancellations change assignment statuses, so they are covered too).
+Changes made by other processes or through Core statements are picked up
+by a backfill:
+
+    python -m bot.workload [--start 2024-01-01] [--end 2024-12-31]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, List, Optional, Set, Tuple
+
+from sqlalchemy import Row
+
+from db.base import dispose_engine, get_session
+from db.listeners import add_holder_listener
+from db.repository.user_repository import UserRepository
+from db.repository.workload_repository import WorkloadRepository
+from utils.assignment import StaffMember
+
+logger = logging.getLogger(__name__)
+
+# Weeks of past workload counted as a staff member's prior load
+WORKLOAD_FAIRNESS_WEEKS = int(os.getenv("WORKLOAD_FAIRNESS_WEEKS", "13"))
+
+
+async def refresh_workload(holders: Set[Tuple[int, int]]) -> None:
+    """
+    Recompute the rollups of the users and weeks of changed assignments.
+    """
+    async with get_session() as session:
+        await WorkloadRepository(session).refresh_holders(holders)
+
+
+add_holder_listener(refresh_workload)
+
+
+async def backfill_workload(start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """
+    Rebuild the rollups of the weeks of a date range, or of all time.
+    """
+    async with get_session() as session:
+        return await WorkloadRepository(session).backfill(start, end)
+
+
+async def get_workload_report(
+    department_ids: List[int], start: date, end: date, order_by: str = "hours"
+) -> List[Row[Any]]:
+    """
+    Get the summed workload of the departments' users over the weeks of a date range.
+    """
+    async with get_session() as session:
+        return await WorkloadRepository(session).get_totals(start, end, department_ids, order_by)
+
+
+async def get_staff_members(
+    department_id: int, today: Optional[date] = None, weeks: int = WORKLOAD_FAIRNESS_WEEKS
+) -> List[StaffMember]:
+    """
+    Build the assignment engine's view of a department's staff.
+
+    Staff ids are user ids; the prior load is the hours worked in the given
+    number of weeks before today's week, read from the rollups.
+    """
+    today = today or date.today()
+    async with get_session() as session:
+        members = await UserRepository(session).get_members([department_id])
+        hours = await WorkloadRepository(session).get_hours(
+            (member.id for member in members),
+            today - timedelta(weeks=weeks),
+            today - timedelta(weeks=1),
+        )
+    return [
+        StaffMember.from_preference(
+            str(member.id), member.UserPreference, prior_load=hours[member.id]
+        )
+        for member in members
+    ]
+
+
+def main() -> None:
+    """Backfill the rollups from the command line."""
+    parser = argparse.ArgumentParser(description="Rebuild the weekly workload rollups.")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day, default all time")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, default all time")
+    args = parser.parse_args()
+
+    async def run() -> int:
+        try:
+            return await backfill_workload(args.start, args.end)
+        finally:
+            await dispose_engine()
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Wrote {asyncio.run(run())} workload rollups")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Database base configuration: declarative base, async engine and sessions.
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from db.models.base import Base
+from utils.metrics import instrument_engine
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///shift_scheduler.db"
+
+# Async drivers used for plain database URLs
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_database_url() -> str:
+    """
+    Get the async database URL from the environment.
+
+    Plain ``sqlite://`` and ``postgresql://`` URLs are mapped to their async drivers.
+    """
+    url = make_url(os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+def create_engine(url: Optional[str] = None, **kwargs: Any) -> AsyncEngine:
+    """
+    Create an async engine with the connection pool configured from the environment.
+    """
+    url = url or get_database_url()
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    if not make_url(url).drivername.startswith("sqlite"):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+    options.update(kwargs)
+    engine = create_async_engine(url, **options)
+    instrument_engine(engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Get the shared async engine, creating it on first use.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    Get the shared session factory bound to the shared engine.
+    """
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(get_engine(), expire_on_commit=False)
+    return _session_factory
+
+
+def configure_database(engine: AsyncEngine) -> None:
+    """
+    Replace the shared engine, e.g. with an in-memory database.
+    """
+    global _engine, _session_factory
+    _engine = engine
+    _session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    Provide a session that commits on success and rolls back on error.
+    """
+    async with get_session_factory()() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def init_models(engine: Optional[AsyncEngine] = None) -> None:
+    """
+    Create all tables. Intended for local SQLite databases.
+    """
+    async with (engine or get_engine()).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def dispose_engine() -> None:
+    """
+    Close all pooled connections of the shared engine.
+    """
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
@@ -0,0 +1,126 @@
+"""
+Notifications about committed shift assignment changes.
+
+Sessions record which assignments they insert, update or delete while
+flushing; once the transaction commits, every registered listener is called
+with those ids on the running event loop. Holder listeners are called with
+the (user id, shift id) pairs of those assignments instead, before and after
+the change, so they also learn about users who lost a shift. Changes made
+through Core statements or by other processes are not reported.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from db.models.shift_assignment import ShiftAssignment
+
+logger = logging.getLogger(__name__)
+
+# Called with the ids of changed (inserted or updated) and of deleted assignments
+AssignmentListener = Callable[[Set[int], Set[int]], Awaitable[None]]
+# Called with the (user id, shift id) pairs of changed assignments
+HolderListener = Callable[[Set[Tuple[int, int]]], Awaitable[None]]
+
+_CHANGED_KEY = "changed_assignments"
+_DELETED_KEY = "deleted_assignments"
+_HOLDERS_KEY = "assignment_holders"
+
+_listeners: List[AssignmentListener] = []
+_holder_listeners: List[HolderListener] = []
+_tasks: Set[asyncio.Task] = set()
+
+
+def add_assignment_listener(listener: AssignmentListener) -> None:
+    """
+    Register a coroutine function called after assignments change.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_assignment_listener(listener: AssignmentListener) -> None:
+    """Unregister an assignment listener."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def add_holder_listener(listener: HolderListener) -> None:
+    """
+    Register a coroutine function called with the holders of changed assignments.
+    """
+    if listener not in _holder_listeners:
+        _holder_listeners.append(listener)
+
+
+def remove_holder_listener(listener: HolderListener) -> None:
+    """Unregister a holder listener."""
+    if listener in _holder_listeners:
+        _holder_listeners.remove(listener)
+
+
+def _holders(instance: ShiftAssignment) -> Set[Tuple[int, int]]:
+    # Current and, for reassigned ones, previous user and shift
+    state = inspect(instance)
+    user_ids = {instance.user_id, *state.attrs.user_id.history.deleted}
+    shift_ids = {instance.shift_id, *state.attrs.shift_id.history.deleted}
+    return {
+        (user_id, shift_id)
+        for user_id in user_ids
+        for shift_id in shift_ids
+        if user_id is not None and shift_id is not None
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context: object) -> None:
+    if not _listeners and not _holder_listeners:
+        return
+    changed = session.info.setdefault(_CHANGED_KEY, set())
+    deleted = session.info.setdefault(_DELETED_KEY, set())
+    holders = session.info.setdefault(_HOLDERS_KEY, set())
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, ShiftAssignment):
+            changed.add(instance.id)
+            holders |= _holders(instance)
+    for instance in session.deleted:
+        if isinstance(instance, ShiftAssignment):
+            deleted.add(instance.id)
+            holders |= _holders(instance)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_listeners(session: Session) -> None:
+    changed = session.info.pop(_CHANGED_KEY, set())
+    deleted = session.info.pop(_DELETED_KEY, set())
+    holders = session.info.pop(_HOLDERS_KEY, set())
+    if not changed and not deleted:
+        return
+    changed -= deleted
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("Assignment changes committed outside an event loop were not reported")
+        return
+    calls = [(listener, (set(changed), set(deleted))) for listener in _listeners]
+    calls += [(listener, (set(holders),)) for listener in _holder_listeners]
+    for listener, args in calls:
+        task = loop.create_task(_call(listener, *args))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_DELETED_KEY, None)
+    session.info.pop(_HOLDERS_KEY, None)
+
+
+async def _call(listener: Callable[..., Awaitable[None]], *args: Any) -> None:
+    try:
+        await listener(*args)
+    except Exception as error:
+        logger.error(f"Assignment listener {listener.__qualname__} failed: {error}")
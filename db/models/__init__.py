@@ -1,4 +1,12 @@
 """
 Database models for the Shift Scheduler Bot.
 Contains SQLAlchemy models for all database tables.
-""" 
\ No newline at end of file
+"""
+from .department import Department
+from .replacement_offer import ReplacementOffer
+from .shift import Shift
+from .shift_assignment import ShiftAssignment
+from .swap_request import SwapRequest
+from .user import User
+from .user_preference import UserPreference
+from .workload_rollup import WorkloadRollup
@@ -0,0 +1,29 @@
+"""
+Replacement offer model recording who was offered to cover an assignment.
+"""
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, UniqueConstraint
+
+from .base import Base
+
+
+class ReplacementOffer(Base):
+    """
+    Offer to a user, sent by a manager, to take over a held assignment.
+    """
+    __table_args__ = (
+        # One offer per assignment and user, also serving an assignment's offers
+        UniqueConstraint("assignment_id", "user_id", name="uq_replacementoffer_assignment_user"),
+    )
+
+    assignment_id = Column(Integer, ForeignKey("shiftassignment.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    offered_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    declined = Column(Boolean, nullable=False, default=False)
+
+    def __repr__(self) -> str:
+        """
+        String representation of the replacement offer.
+        """
+        return (
+            f"<ReplacementOffer assignment_id={self.assignment_id} user_id={self.user_id}>"
+        )
@@ -1,40 +1,66 @@
 """
 Shift model representing work shifts.
 """
-from datetime import datetime
-from enum import Enum
+from datetime import datetime, time
 from typing import List, Optional
 
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, String
+from sqlalchemy import (
+    Column, DateTime, Enum as SQLEnum, ForeignKey, Index, Integer, String, UniqueConstraint
+)
 from sqlalchemy.orm import relationship
 
 from .base import Base
-
-
-class ShiftType(str, Enum):
-    """
-    Enum for shift types.
-    """
-    MORNING = "morning"
-    EVENING = "evening"
-    NIGHT = "night"
+from utils.scheduler import ShiftType, SlotDefinition, WEEKLY_TEMPLATE
 
 
 class Shift(Base):
     """
     Shift model representing a work shift.
+
+    A shift is one slot of the weekly template (``utils.scheduler``) on a
+    date; ``slot`` is its index among the slots of that weekday.
     """
+    __table_args__ = (
+        # Also serves a department's shifts by date range
+        UniqueConstraint("department_id", "date", "slot", name="uq_shift_department_date_slot"),
+        # Shifts of every department on a day (reminders)
+        Index("ix_shift_date", "date"),
+    )
+
     date = Column(DateTime, nullable=False)
+    slot = Column(Integer, nullable=False)
     shift_type = Column(SQLEnum(ShiftType), nullable=False)
     department_id = Column(Integer, ForeignKey("department.id"), nullable=False)
 
     # Relationships
     department = relationship("Department", back_populates="shifts")
     assignments = relationship("ShiftAssignment", back_populates="shift")
-    swap_requests = relationship("SwapRequest", back_populates="shift")
+    swap_requests = relationship(
+        "SwapRequest", back_populates="shift", foreign_keys="SwapRequest.shift_id"
+    )
+
+    @property
+    def definition(self) -> SlotDefinition:
+        """Template definition of the shift's slot."""
+        return WEEKLY_TEMPLATE[self.date.weekday()][self.slot]
+
+    @property
+    def start_time(self) -> time:
+        """Start time of the shift."""
+        return self.definition.start_time
+
+    @property
+    def end_time(self) -> time:
+        """End time of the shift."""
+        return self.definition.end_time
+
+    @property
+    def description(self) -> str:
+        """Description of the shift's slot."""
+        return self.definition.description
 
     def __repr__(self) -> str:
         """
         String representation of the shift.
         """
-        return f"<Shift {self.date.date()} {self.shift_type}>" 
\ No newline at end of file
+        return f"<Shift {self.date.date()} {self.shift_type}>"
\ No newline at end of file
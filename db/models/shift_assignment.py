@@ -3,7 +3,7 @@ Shift assignment model representing the assignment of shifts to users.
 """
 from typing import Optional
 
-from sqlalchemy import Column, ForeignKey, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -13,12 +13,19 @@ class ShiftAssignment(Base):
     """
     Shift assignment model representing the assignment of a shift to a user.
     """
-    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    __table_args__ = (
+        # A user's shifts: joined from users, then to shift by id
+        Index("ix_shiftassignment_user_shift", "user_id", "shift_id"),
+        # Assignments of a shift, filtered by status
+        Index("ix_shiftassignment_shift_status", "shift_id", "status"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     shift_id = Column(Integer, ForeignKey("shift.id"), nullable=False)
     status = Column(String, nullable=False, default="assigned")  # assigned, swapped, cancelled
 
     # Relationships
-    user = relationship("User", back_populates="shift_assignments")
+    user = relationship("User", back_populates="shifts")
     shift = relationship("Shift", back_populates="assignments")
 
     def __repr__(self) -> str:
@@ -4,7 +4,7 @@ Swap request model representing requests to swap shifts between users.
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, Enum as SQLEnum, ForeignKey, String
+from sqlalchemy import Column, Enum as SQLEnum, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -24,11 +24,20 @@ class SwapRequest(Base):
     """
     Swap request model representing a request to swap shifts between users.
     """
-    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    __table_args__ = (
+        # Pending swaps by shift; decided requests are never looked up by shift
+        Index(
+            "ix_swaprequest_pending_shift", "shift_id", "requested_shift_id",
+            sqlite_where=text("status = 'PENDING'"),
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     shift_id = Column(Integer, ForeignKey("shift.id"), nullable=False)
     requested_shift_id = Column(Integer, ForeignKey("shift.id"), nullable=False)
     status = Column(SQLEnum(SwapRequestStatus), nullable=False, default=SwapRequestStatus.PENDING)
-    approved_by = Column(Integer, ForeignKey("user.id"), nullable=True)
+    approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     reason = Column(String, nullable=True)
 
     # Relationships
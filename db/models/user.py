@@ -5,10 +5,10 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
-from db.base import Base
+from .base import Base
 from utils.translations import Language
 
 
@@ -30,15 +30,19 @@ class User(Base):
     first_name = Column(String)
     last_name = Column(String)
     role = Column(SQLEnum(UserRole), nullable=False)
-    department_id = Column(Integer, nullable=False)
+    # Indexed for per-department reports joining from users
+    department_id = Column(Integer, ForeignKey("department.id"), nullable=False, index=True)
     language = Column(SQLEnum(Language), default=Language.ENGLISH)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
+    department = relationship("Department", back_populates="users")
     shifts = relationship("ShiftAssignment", back_populates="user")
     preferences = relationship("UserPreference", back_populates="user")
-    swap_requests = relationship("SwapRequest", back_populates="user")
+    swap_requests = relationship(
+        "SwapRequest", back_populates="user", foreign_keys="SwapRequest.user_id"
+    )
 
     def __repr__(self) -> str:
         """
@@ -3,7 +3,7 @@ User preference model representing user preferences for shift assignments.
 """
 from typing import Optional
 
-from sqlalchemy import Column, ForeignKey, JSON, String
+from sqlalchemy import Column, ForeignKey, Integer, JSON, String
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -13,7 +13,7 @@ class UserPreference(Base):
     """
     User preference model representing user preferences for shift assignments.
     """
-    user_id = Column(Integer, ForeignKey("user.id"), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     preferred_shifts = Column(JSON, nullable=True)  # List of preferred shift types
     unavailable_days = Column(JSON, nullable=True)  # List of days when user is unavailable
     max_shifts_per_week = Column(Integer, nullable=True)
@@ -0,0 +1,32 @@
+"""
+Workload rollup model holding per-user weekly workload aggregates.
+"""
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, UniqueConstraint
+
+from .base import Base
+
+
+class WorkloadRollup(Base):
+    """
+    Workload of one user in one week (starting on Sunday), kept up to date
+    from the user's shift assignments.
+    """
+    __table_args__ = (
+        # One row per user and week, also serving a user's range of weeks
+        UniqueConstraint("user_id", "week_start", name="uq_workloadrollup_user_week"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    week_start = Column(Date, nullable=False)
+    hours = Column(Float, nullable=False, default=0.0)
+    shifts = Column(Integer, nullable=False, default=0)
+    nights = Column(Integer, nullable=False, default=0)
+    weekends = Column(Integer, nullable=False, default=0)
+    swaps = Column(Integer, nullable=False, default=0)
+    cancellations = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """
+        String representation of the workload rollup.
+        """
+        return f"<WorkloadRollup user_id={self.user_id} week_start={self.week_start}>"
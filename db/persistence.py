@@ -0,0 +1,294 @@
+"""
+Conversation, user and chat data persistence in a shared SQLite (WAL) database.
+"""
+import asyncio
+import json
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Column, Float, LargeBinary, MetaData, String, Table, delete, event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from telegram.ext import BasePersistence, PersistenceInput
+
+from db.base import create_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERSISTENCE_PATH = "bot_persistence.db"
+
+# Seconds between the application handing data to the persistence
+UPDATE_INTERVAL = float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", "10"))
+# Seconds a chat's or user's data is trusted before it is re-read from the database
+REFRESH_INTERVAL = float(os.getenv("PERSISTENCE_REFRESH_INTERVAL", "30"))
+# Writes arriving within this many seconds are flushed in one transaction
+FLUSH_DELAY = 0.05
+
+USER_DATA = "user"
+CHAT_DATA = "chat"
+
+metadata = MetaData()
+
+persistent_data = Table(
+    "persistent_data",
+    metadata,
+    Column("kind", String, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("data", LargeBinary, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+persistent_conversations = Table(
+    "persistent_conversations",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("state", LargeBinary, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+ConversationKey = Tuple[int, ...]
+ConversationDict = Dict[ConversationKey, object]
+
+# (kind, key) or (conversation name, key) -> pickled value, None to delete
+PendingWrites = Dict[Tuple[str, str], Optional[bytes]]
+
+
+def _enable_wal(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Persistence shared by every bot process through one SQLite database in WAL mode.
+
+    Writes handed over by the application are buffered and flushed in a
+    single transaction. User and chat data are not loaded at startup but on
+    first use of each user or chat, and re-read after ``refresh_interval``
+    seconds so data written by other processes is picked up. Bot data and
+    callback data are not stored: bot data holds live services.
+    """
+    def __init__(
+        self,
+        path: str = DEFAULT_PERSISTENCE_PATH,
+        update_interval: float = UPDATE_INTERVAL,
+        refresh_interval: float = REFRESH_INTERVAL
+    ):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._engine: Optional[AsyncEngine] = None
+        self._engine_lock = asyncio.Lock()
+        self._pending_data: PendingWrites = {}
+        self._pending_conversations: PendingWrites = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # (kind, key) -> (monotonic time of last read, updated_at of the stored row)
+        self._loaded: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    async def _get_engine(self) -> AsyncEngine:
+        async with self._engine_lock:
+            if self._engine is None:
+                engine = create_engine(f"sqlite+aiosqlite:///{self.path}")
+                event.listen(engine.sync_engine, "connect", _enable_wal)
+                async with engine.begin() as connection:
+                    await connection.run_sync(metadata.create_all)
+                self._engine = engine
+        return self._engine
+
+    # Loading
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        """User data is loaded per user in refresh_user_data."""
+        return {}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        """Chat data is loaded per chat in refresh_chat_data."""
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        """Bot data is not stored."""
+        return {}
+
+    async def get_callback_data(self) -> None:
+        """Callback data is not stored."""
+        return None
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        """
+        Load the states of every conversation of a conversation handler.
+        """
+        engine = await self._get_engine()
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                select(persistent_conversations.c.key, persistent_conversations.c.state)
+                .where(persistent_conversations.c.name == name)
+            )
+            return {tuple(json.loads(key)): pickle.loads(state) for key, state in result}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        """
+        Load the user's stored data on first use or once it may be stale.
+        """
+        await self._refresh(USER_DATA, str(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        """
+        Load the chat's stored data on first use or once it may be stale.
+        """
+        await self._refresh(CHAT_DATA, str(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        """Bot data is not stored."""
+
+    async def _refresh(self, kind: str, key: str, data: Dict[Any, Any]) -> None:
+        now = time.monotonic()
+        read_at, seen = self._loaded.get((kind, key), (None, 0.0))
+        if read_at is not None and now - read_at < self.refresh_interval:
+            return
+        if (kind, key) in self._pending_data:
+            # Our own unflushed write is the newest version
+            self._loaded[(kind, key)] = (now, seen)
+            return
+
+        engine = await self._get_engine()
+        async with engine.connect() as connection:
+            row = (await connection.execute(
+                select(persistent_data.c.data, persistent_data.c.updated_at)
+                .where(persistent_data.c.kind == kind, persistent_data.c.key == key)
+            )).first()
+        if row is None or row.updated_at <= seen:
+            self._loaded[(kind, key)] = (now, seen)
+            return
+        data.clear()
+        data.update(pickle.loads(row.data))
+        self._loaded[(kind, key)] = (now, row.updated_at)
+
+    # Buffered writes
+
+    def _write(self, pending: PendingWrites, key: Tuple[str, str], value: Any) -> None:
+        pending[key] = None if value is None else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self) -> None:
+        await asyncio.sleep(FLUSH_DELAY)
+        try:
+            await self.flush()
+        except Exception as error:
+            logger.error(f"Failed to flush persistence, retrying with the next write: {error}")
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        """Buffer the user's data for the next flush."""
+        self._write(self._pending_data, (USER_DATA, str(user_id)), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        """Buffer the chat's data for the next flush."""
+        self._write(self._pending_data, (CHAT_DATA, str(chat_id)), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        """Bot data is not stored."""
+
+    async def update_callback_data(self, data: Any) -> None:
+        """Callback data is not stored."""
+
+    async def drop_user_data(self, user_id: int) -> None:
+        """Buffer the deletion of the user's data."""
+        self._write(self._pending_data, (USER_DATA, str(user_id)), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        """Buffer the deletion of the chat's data."""
+        self._write(self._pending_data, (CHAT_DATA, str(chat_id)), None)
+
+    async def update_conversation(
+        self, name: str, key: ConversationKey, new_state: Optional[object]
+    ) -> None:
+        """Buffer a conversation's new state; None ends the conversation."""
+        self._write(self._pending_conversations, (name, json.dumps(list(key))), new_state)
+
+    async def flush(self) -> None:
+        """
+        Write every buffered change in one transaction.
+
+        Changes that fail to be written are kept unless newer ones replaced them.
+        """
+        async with self._flush_lock:
+            pending_data, self._pending_data = self._pending_data, {}
+            pending_conversations, self._pending_conversations = self._pending_conversations, {}
+            if not pending_data and not pending_conversations:
+                return
+            updated_at = time.time()
+            try:
+                engine = await self._get_engine()
+                async with engine.begin() as connection:
+                    await _write_rows(
+                        connection, persistent_data, "kind", "data", pending_data, updated_at
+                    )
+                    await _write_rows(
+                        connection, persistent_conversations, "name", "state",
+                        pending_conversations, updated_at
+                    )
+            except Exception:
+                for key, value in pending_data.items():
+                    self._pending_data.setdefault(key, value)
+                for key, value in pending_conversations.items():
+                    self._pending_conversations.setdefault(key, value)
+                raise
+
+            for key, value in pending_data.items():
+                if key in self._loaded:
+                    self._loaded[key] = (self._loaded[key][0], updated_at)
+
+    async def close(self) -> None:
+        """
+        Flush buffered changes and close the database.
+        """
+        await self.flush()
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+async def _write_rows(
+    connection: Any, table: Table, group_column: str, value_column: str,
+    pending: PendingWrites, updated_at: float
+) -> None:
+    upserts = [
+        {group_column: group, "key": key, value_column: value, "updated_at": updated_at}
+        for (group, key), value in pending.items() if value is not None
+    ]
+    if upserts:
+        statement = insert(table)
+        await connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[group_column, "key"],
+                set_={
+                    value_column: statement.excluded[value_column],
+                    "updated_at": statement.excluded.updated_at,
+                },
+            ),
+            upserts,
+        )
+    for (group, key), value in pending.items():
+        if value is None:
+            await connection.execute(
+                delete(table).where(table.c[group_column] == group, table.c.key == key)
+            )
+
+
+def create_persistence() -> Optional[SQLitePersistence]:
+    """
+    Create the persistence at PERSISTENCE_PATH; an empty path disables persistence.
+    """
+    path = os.getenv("PERSISTENCE_PATH", DEFAULT_PERSISTENCE_PATH)
+    return SQLitePersistence(path) if path else None
@@ -0,0 +1,5 @@
+"""
+Repositories for the Shift Scheduler Bot.
+Contains async query helpers that load everything a command needs in a fixed
+number of round-trips.
+"""
@@ -0,0 +1,119 @@
+"""
+Shift assignment repository.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Row, Select, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from db.models.shift import Shift
+from db.models.shift_assignment import ShiftAssignment
+from db.models.user import User
+from db.repository.shift_repository import ACTIVE_STATUS
+
+# Status of the assignment of a user who was replaced
+CANCELLED_STATUS = "cancelled"
+
+
+class AssignmentRepository:
+    """Queries for shift assignments."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _active_query() -> Select:
+        return (
+            select(
+                ShiftAssignment.id.label("assignment_id"),
+                ShiftAssignment.user_id,
+                Shift.id.label("shift_id"),
+                Shift.date,
+                Shift.slot,
+                Shift.department_id,
+                User.telegram_id,
+                User.username,
+            )
+            .join(Shift, Shift.id == ShiftAssignment.shift_id)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .where(ShiftAssignment.status == ACTIVE_STATUS)
+        )
+
+    async def get_active_between(
+        self, start: date, end: date, department_ids: Optional[Iterable[int]] = None
+    ) -> List[Row[Any]]:
+        """
+        Get the held assignments of shifts within an inclusive date range.
+
+        Rows carry the assignment and shift ids, the shift's date, slot and
+        department, and the assigned user's id, Telegram id and username.
+        """
+        query = self._active_query().where(
+            Shift.date >= datetime.combine(start, time.min),
+            Shift.date < datetime.combine(end + timedelta(days=1), time.min),
+        )
+        if department_ids is not None:
+            query = query.where(Shift.department_id.in_(list(department_ids)))
+        return list(await self.session.execute(query))
+
+    async def get_active_for_users(
+        self, user_ids: Iterable[int], start: date, end: date
+    ) -> List[Row[Any]]:
+        """
+        Get the held assignments of the given users within an inclusive date range.
+        """
+        result = await self.session.execute(
+            self._active_query().where(
+                ShiftAssignment.user_id.in_(list(user_ids)),
+                Shift.date >= datetime.combine(start, time.min),
+                Shift.date < datetime.combine(end + timedelta(days=1), time.min),
+            )
+        )
+        return list(result)
+
+    async def get_active_by_ids(self, assignment_ids: Iterable[int]) -> List[Row[Any]]:
+        """
+        Get the given assignments that are held, as rows like get_active_between.
+        """
+        result = await self.session.execute(
+            self._active_query().where(ShiftAssignment.id.in_(list(assignment_ids)))
+        )
+        return list(result)
+
+    async def hand_over(self, assignment_id: int, user_id: int) -> Optional[ShiftAssignment]:
+        """
+        Cancel a held assignment and assign its shift to another user.
+
+        The assignment is claimed with one conditional update, so of
+        concurrent hand-overs of one assignment only the first succeeds;
+        None is returned if the assignment is no longer held.
+        """
+        result = await self.session.execute(
+            update(ShiftAssignment)
+            .where(ShiftAssignment.id == assignment_id, ShiftAssignment.status == ACTIVE_STATUS)
+            .values(status=CANCELLED_STATUS)
+        )
+        if result.rowcount != 1:
+            return None
+        assignment = await self.session.get(ShiftAssignment, assignment_id)
+        # Flushed again so that assignment listeners learn about the cancellation
+        flag_modified(assignment, "status")
+        replacement = ShiftAssignment(
+            user_id=user_id, shift_id=assignment.shift_id, status=ACTIVE_STATUS
+        )
+        self.session.add(replacement)
+        await self.session.flush()
+        return replacement
+
+    async def assign(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """
+        Assign shifts to users from (shift id, user id) pairs; return how many were added.
+        """
+        assignments = [
+            ShiftAssignment(user_id=user_id, shift_id=shift_id, status=ACTIVE_STATUS)
+            for shift_id, user_id in pairs
+        ]
+        self.session.add_all(assignments)
+        await self.session.flush()
+        return len(assignments)
@@ -0,0 +1,22 @@
+"""
+Department repository.
+"""
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.department import Department
+
+
+class DepartmentRepository:
+    """Queries for departments."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_ids(self) -> List[int]:
+        """
+        Get the ids of every department.
+        """
+        result = await self.session.execute(select(Department.id).order_by(Department.id))
+        return list(result.scalars())
@@ -0,0 +1,79 @@
+"""
+Replacement offer repository.
+"""
+from typing import Any, Iterable, Optional, Set
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.replacement_offer import ReplacementOffer
+from db.models.user import User
+
+
+class ReplacementOfferRepository:
+    """Queries for replacement offers."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record(self, assignment_id: int, user_ids: Iterable[int], offered_by: int) -> None:
+        """
+        Record that a manager (by user id) offered an assignment to the given users.
+
+        Users offered the assignment before keep their offer, now sent by this manager.
+        """
+        user_ids = list(user_ids)
+        result = await self.session.execute(
+            select(ReplacementOffer).where(
+                ReplacementOffer.assignment_id == assignment_id,
+                ReplacementOffer.user_id.in_(user_ids),
+            )
+        )
+        offers = {offer.user_id: offer for offer in result.scalars()}
+        for user_id in user_ids:
+            offer = offers.get(user_id)
+            if offer is None:
+                self.session.add(ReplacementOffer(
+                    assignment_id=assignment_id, user_id=user_id, offered_by=offered_by,
+                    declined=False,
+                ))
+            else:
+                offer.offered_by = offered_by
+        await self.session.flush()
+
+    async def get_open(self, assignment_id: int, user_id: int) -> Optional[Row[Any]]:
+        """
+        Get a user's offer for an assignment unless they declined it.
+
+        Rows carry the offer id and the Telegram id of the manager who sent it.
+        """
+        result = await self.session.execute(
+            select(ReplacementOffer.id, User.telegram_id.label("manager_telegram_id"))
+            .join(User, User.id == ReplacementOffer.offered_by)
+            .where(
+                ReplacementOffer.assignment_id == assignment_id,
+                ReplacementOffer.user_id == user_id,
+                ReplacementOffer.declined.is_(False),
+            )
+        )
+        return result.first()
+
+    async def decline(self, offer_id: int) -> None:
+        """
+        Mark an offer as declined.
+        """
+        offer = await self.session.get(ReplacementOffer, offer_id)
+        if offer is not None:
+            offer.declined = True
+            await self.session.flush()
+
+    async def get_declined(self, assignment_id: int) -> Set[int]:
+        """
+        Get the ids of the users who declined an assignment.
+        """
+        result = await self.session.execute(
+            select(ReplacementOffer.user_id).where(
+                ReplacementOffer.assignment_id == assignment_id,
+                ReplacementOffer.declined.is_(True),
+            )
+        )
+        return set(result.scalars())
@@ -0,0 +1,373 @@
+"""
+Shift repository.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Row, Select, and_, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from db.models.department import Department
+from db.models.shift import Shift
+from db.models.shift_assignment import ShiftAssignment
+from db.models.user import User
+from utils.scheduler import iter_shift_schedule
+
+# Assignment status of shifts that are currently held
+ACTIVE_STATUS = "assigned"
+
+
+# Rows fetched per round trip when streaming exports
+STREAM_BATCH_SIZE = 500
+
+# Dialect-specific INSERT statements supporting ON CONFLICT DO NOTHING
+CONFLICT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Keyset cursor: (Shift.date, Shift.id) of the row next to the page
+Cursor = Tuple[datetime, int]
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def _keyset_page(
+    query: Select, cursor: Optional[Cursor], limit: int, backwards: bool
+) -> Select:
+    """
+    Restrict a shift query to the rows after (or before) a keyset cursor.
+    """
+    if cursor is not None:
+        when, shift_id = cursor
+        if backwards:
+            query = query.where(
+                or_(Shift.date < when, and_(Shift.date == when, Shift.id < shift_id))
+            )
+        else:
+            query = query.where(
+                or_(Shift.date > when, and_(Shift.date == when, Shift.id > shift_id))
+            )
+    if backwards:
+        return query.order_by(Shift.date.desc(), Shift.id.desc()).limit(limit)
+    return query.order_by(Shift.date, Shift.id).limit(limit)
+
+
+class ShiftRepository:
+    """Queries for shifts and their assignments."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_user_shifts(
+        self, telegram_id: int, date_range: Tuple[date, date]
+    ) -> List[Shift]:
+        """
+        Get the shifts assigned to a user within an inclusive date range.
+
+        The department of every shift is joined in the same query.
+        """
+        start, end = date_range
+        result = await self.session.execute(
+            select(Shift)
+            .join(ShiftAssignment, ShiftAssignment.shift_id == Shift.id)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                ShiftAssignment.status == ACTIVE_STATUS,
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+            .options(joinedload(Shift.department))
+            .order_by(Shift.date, Shift.id)
+        )
+        return list(result.scalars().unique())
+
+    async def get_department_schedule(self, department_id: int, week: date) -> List[Shift]:
+        """
+        Get the shifts of a department for the week starting on the given day.
+
+        Assignments and their users are loaded with one additional query.
+        """
+        result = await self.session.execute(
+            select(Shift)
+            .where(
+                Shift.department_id == department_id,
+                Shift.date >= _day_start(week),
+                Shift.date < _day_start(week + timedelta(days=7)),
+            )
+            .options(
+                selectinload(
+                    Shift.assignments.and_(ShiftAssignment.status == ACTIVE_STATUS)
+                ).joinedload(ShiftAssignment.user)
+            )
+            .order_by(Shift.date, Shift.id)
+        )
+        return list(result.scalars())
+
+    async def get_user_shifts_page(
+        self,
+        telegram_id: int,
+        since: date,
+        cursor: Optional[Cursor] = None,
+        limit: int = 25,
+        backwards: bool = False
+    ) -> List[Shift]:
+        """
+        Get one page of a user's shifts from the given day on, in date order.
+
+        Pages are addressed by keyset cursor, so every page costs the same
+        regardless of how many shifts precede it.
+        """
+        query = (
+            select(Shift)
+            .join(ShiftAssignment, ShiftAssignment.shift_id == Shift.id)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                ShiftAssignment.status == ACTIVE_STATUS,
+                Shift.date >= _day_start(since),
+            )
+            .options(joinedload(Shift.department))
+        )
+        result = await self.session.execute(_keyset_page(query, cursor, limit, backwards))
+        shifts = list(result.scalars().unique())
+        return shifts[::-1] if backwards else shifts
+
+    async def get_department_schedule_page(
+        self,
+        department_id: int,
+        since: date,
+        cursor: Optional[Cursor] = None,
+        limit: int = 25,
+        backwards: bool = False
+    ) -> List[Shift]:
+        """
+        Get one page of a department's shifts from the given day on, in date order.
+        """
+        query = (
+            select(Shift)
+            .where(
+                Shift.department_id == department_id,
+                Shift.date >= _day_start(since),
+            )
+            .options(
+                selectinload(
+                    Shift.assignments.and_(ShiftAssignment.status == ACTIVE_STATUS)
+                ).joinedload(ShiftAssignment.user)
+            )
+        )
+        result = await self.session.execute(_keyset_page(query, cursor, limit, backwards))
+        shifts = list(result.scalars())
+        return shifts[::-1] if backwards else shifts
+
+    async def get_assignments_on(self, day: date) -> List[ShiftAssignment]:
+        """
+        Get the active assignments of shifts on a day, with shift and user joined.
+        """
+        result = await self.session.execute(
+            select(ShiftAssignment)
+            .join(Shift, Shift.id == ShiftAssignment.shift_id)
+            .where(
+                ShiftAssignment.status == ACTIVE_STATUS,
+                Shift.date >= _day_start(day),
+                Shift.date < _day_start(day + timedelta(days=1)),
+            )
+            .options(joinedload(ShiftAssignment.shift), joinedload(ShiftAssignment.user))
+        )
+        return list(result.scalars())
+
+    def _export_query(self, start: date, end: date) -> Select:
+        return (
+            select(
+                Shift.id.label("shift_id"),
+                Shift.date,
+                Shift.shift_type,
+                Shift.slot,
+                Department.name.label("department"),
+                User.telegram_id,
+                User.username,
+            )
+            .join(Department, Department.id == Shift.department_id)
+            .where(
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+            .order_by(Shift.date, Shift.id, User.username)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+    async def stream_department_export(
+        self, department_id: int, start: date, end: date
+    ) -> AsyncIterator[Row[Any]]:
+        """
+        Stream one row per held assignment (or per unassigned shift) of a department.
+
+        Rows come from a server-side cursor in batches of STREAM_BATCH_SIZE,
+        so memory use does not grow with the date range.
+        """
+        query = (
+            self._export_query(start, end)
+            .outerjoin(
+                ShiftAssignment,
+                and_(ShiftAssignment.shift_id == Shift.id, ShiftAssignment.status == ACTIVE_STATUS),
+            )
+            .outerjoin(User, User.id == ShiftAssignment.user_id)
+            .where(Shift.department_id == department_id)
+        )
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    async def stream_user_export(
+        self, telegram_id: int, start: date, end: date
+    ) -> AsyncIterator[Row[Any]]:
+        """
+        Stream the rows of the shifts a user holds, like stream_department_export.
+        """
+        query = (
+            self._export_query(start, end)
+            .join(ShiftAssignment, ShiftAssignment.shift_id == Shift.id)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .where(User.telegram_id == telegram_id, ShiftAssignment.status == ACTIVE_STATUS)
+        )
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    async def get_user_export_version(
+        self, telegram_id: int, start: date, end: date
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        Get the number of a user's assignments in a range and their latest change.
+
+        Assignments in any status count, so cancellations change the version too.
+        """
+        row = (await self.session.execute(
+            select(
+                func.count(ShiftAssignment.id),
+                func.max(ShiftAssignment.updated_at),
+                func.max(Shift.updated_at),
+            )
+            .join(Shift, Shift.id == ShiftAssignment.shift_id)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+        )).one()
+        count, assignment_changed, shift_changed = row
+        changes = [value for value in (assignment_changed, shift_changed) if value is not None]
+        return count, max(changes) if changes else None
+
+    async def get_period_shifts(
+        self, start: date, end: date, department_ids: Optional[Iterable[int]] = None
+    ) -> List[Row[Any]]:
+        """
+        Get the shifts of an inclusive date range, optionally of some departments only.
+
+        Rows carry the shift's id, department id and name, date, slot and
+        type, ordered by shift id.
+        """
+        query = (
+            select(
+                Shift.id,
+                Shift.department_id,
+                Department.name.label("department"),
+                Shift.date,
+                Shift.slot,
+                Shift.shift_type,
+            )
+            .join(Department, Department.id == Shift.department_id)
+            .where(
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+            .order_by(Shift.id)
+        )
+        if department_ids is not None:
+            query = query.where(Shift.department_id.in_(list(department_ids)))
+        return list(await self.session.execute(query))
+
+    async def get_active_shift_ids(
+        self, start: date, end: date, department_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """
+        Get the shift id of every held assignment in an inclusive date range.
+        """
+        query = (
+            select(ShiftAssignment.shift_id)
+            .join(Shift, Shift.id == ShiftAssignment.shift_id)
+            .where(
+                ShiftAssignment.status == ACTIVE_STATUS,
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+        )
+        if department_ids is not None:
+            query = query.where(Shift.department_id.in_(list(department_ids)))
+        return list((await self.session.execute(query)).scalars())
+
+    async def get_slots(self, shift_ids: Iterable[int]) -> List[Row[Any]]:
+        """
+        Get the id, date and slot of the given shifts.
+        """
+        result = await self.session.execute(
+            select(Shift.id, Shift.date, Shift.slot).where(Shift.id.in_(list(shift_ids)))
+        )
+        return list(result)
+
+    async def materialize_schedule(
+        self, department_ids: Iterable[int], start: date, end: date
+    ) -> int:
+        """
+        Create the template shifts of an inclusive date range for every department.
+
+        On SQLite and PostgreSQL all rows go out in one executemany of
+        INSERT ... ON CONFLICT DO NOTHING on (department_id, date, slot);
+        elsewhere the existing shifts of the range are selected first and
+        only the missing ones inserted. Existing shifts are kept and re-running
+        a range is a no-op. Returns the number of shifts created.
+        """
+        connection = await self.session.connection()
+        dialect = connection.dialect.name
+        department_ids = list(department_ids)
+
+        now = datetime.utcnow()
+        slots = [
+            {"date": slot.date, "slot": slot.index, "shift_type": slot.shift_type}
+            for slot in iter_shift_schedule(_day_start(start), _day_start(end))
+        ]
+        rows: List[Dict[str, Any]] = [
+            dict(slot, department_id=department_id, created_at=now, updated_at=now)
+            for department_id in department_ids
+            for slot in slots
+        ]
+        if not rows:
+            return 0
+        if dialect in CONFLICT_INSERTS:
+            statement = CONFLICT_INSERTS[dialect](Shift).on_conflict_do_nothing(
+                index_elements=["department_id", "date", "slot"]
+            )
+            result = await connection.execute(statement, rows)
+            return max(result.rowcount, 0)
+
+        result = await connection.execute(
+            select(Shift.department_id, Shift.date, Shift.slot).where(
+                Shift.department_id.in_(department_ids),
+                Shift.date >= _day_start(start),
+                Shift.date < _day_start(end + timedelta(days=1)),
+            )
+        )
+        existing = set(result.tuples())
+        rows = [
+            row for row in rows
+            if (row["department_id"], row["date"], row["slot"]) not in existing
+        ]
+        if rows:
+            await connection.execute(insert(Shift), rows)
+        return len(rows)
@@ -0,0 +1,165 @@
+"""
+Swap request repository.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Row, and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from db.models.shift import Shift
+from db.models.shift_assignment import ShiftAssignment
+from db.models.swap_request import SwapRequest, SwapRequestStatus
+from db.models.user import User
+from db.repository.shift_repository import ACTIVE_STATUS
+
+# Status of the assignment a user gave away in an approved swap
+SWAPPED_STATUS = "swapped"
+
+
+class SwapRequestRepository:
+    """Queries for swap requests."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_pending_for_shifts(self, shift_ids: Iterable[int]) -> List[SwapRequest]:
+        """
+        Get the pending swap requests offering any of the given shifts.
+        """
+        result = await self.session.execute(
+            select(SwapRequest)
+            .where(
+                SwapRequest.status == SwapRequestStatus.PENDING,
+                SwapRequest.shift_id.in_(list(shift_ids)),
+            )
+            .order_by(SwapRequest.id)
+        )
+        return list(result.scalars())
+
+    async def get_pending(
+        self,
+        department_ids: Optional[Iterable[int]] = None,
+        request_ids: Optional[Iterable[int]] = None
+    ) -> List[Row[Any]]:
+        """
+        Get the pending swap requests whose user still holds the offered shift.
+
+        Rows carry the request id, the user id and the offered and requested
+        shift ids, ordered by request id. Requests may be limited to users of
+        some departments, or to the given request ids.
+        """
+        query = (
+            select(
+                SwapRequest.id,
+                SwapRequest.user_id,
+                SwapRequest.shift_id,
+                SwapRequest.requested_shift_id,
+            )
+            .join(
+                ShiftAssignment,
+                (ShiftAssignment.user_id == SwapRequest.user_id)
+                & (ShiftAssignment.shift_id == SwapRequest.shift_id),
+            )
+            .where(
+                SwapRequest.status == SwapRequestStatus.PENDING,
+                ShiftAssignment.status == ACTIVE_STATUS,
+            )
+            .distinct()
+            .order_by(SwapRequest.id)
+        )
+        if department_ids is not None:
+            query = query.join(User, User.id == SwapRequest.user_id).where(
+                User.department_id.in_(list(department_ids))
+            )
+        if request_ids is not None:
+            query = query.where(SwapRequest.id.in_(list(request_ids)))
+        return list(await self.session.execute(query))
+
+    async def get_decisions(self, request_ids: Iterable[int]) -> List[Row[Any]]:
+        """
+        Get the given swap requests with what is needed to notify their users.
+
+        Rows carry the request id and status, the requester's Telegram id and
+        language, and the date of the offered shift.
+        """
+        result = await self.session.execute(
+            select(
+                SwapRequest.id,
+                SwapRequest.status,
+                User.telegram_id,
+                User.language,
+                Shift.date,
+            )
+            .join(User, User.id == SwapRequest.user_id)
+            .join(Shift, Shift.id == SwapRequest.shift_id)
+            .where(SwapRequest.id.in_(list(request_ids)))
+            .order_by(SwapRequest.id)
+        )
+        return list(result)
+
+    async def approve_cycle(self, request_ids: List[int], approver_id: int) -> bool:
+        """
+        Approve pending requests passing their shifts around a cycle.
+
+        Every requester gives away the offered shift (its assignment is marked
+        swapped) and takes the requested one, which the next request offers.
+        Requests and assignments are claimed with conditional updates, so of
+        concurrent approvals of overlapping cycles only the first succeeds.
+        If a request is no longer pending or its user no longer holds the
+        offered shift, the session's transaction is rolled back and False is
+        returned.
+        """
+        result = await self.session.execute(
+            select(SwapRequest).where(SwapRequest.id.in_(request_ids))
+        )
+        requests = {request.id: request for request in result.scalars()}
+        if len(requests) < len(request_ids):
+            return False
+        result = await self.session.execute(
+            select(ShiftAssignment).where(
+                ShiftAssignment.status == ACTIVE_STATUS,
+                or_(*(
+                    and_(
+                        ShiftAssignment.user_id == request.user_id,
+                        ShiftAssignment.shift_id == request.shift_id,
+                    )
+                    for request in requests.values()
+                )),
+            )
+        )
+        held: Dict[Tuple[int, int], ShiftAssignment] = {}
+        for assignment in result.scalars():
+            held.setdefault((assignment.user_id, assignment.shift_id), assignment)
+        assignments = [
+            held.get((requests[request_id].user_id, requests[request_id].shift_id))
+            for request_id in request_ids
+        ]
+        if None in assignments:
+            return False
+
+        claimed = await self.session.execute(
+            update(SwapRequest)
+            .where(SwapRequest.id.in_(request_ids), SwapRequest.status == SwapRequestStatus.PENDING)
+            .values(status=SwapRequestStatus.APPROVED, approved_by=approver_id)
+        )
+        given = await self.session.execute(
+            update(ShiftAssignment)
+            .where(
+                ShiftAssignment.id.in_([assignment.id for assignment in assignments]),
+                ShiftAssignment.status == ACTIVE_STATUS,
+            )
+            .values(status=SWAPPED_STATUS)
+        )
+        if claimed.rowcount != len(request_ids) or given.rowcount != len(assignments):
+            await self.session.rollback()
+            return False
+        for request_id, assignment in zip(request_ids, assignments):
+            # Flushed again so that assignment listeners learn about the swap
+            flag_modified(assignment, "status")
+            self.session.add(ShiftAssignment(
+                user_id=requests[request_id].user_id,
+                shift_id=requests[request_id].requested_shift_id,
+                status=ACTIVE_STATUS,
+            ))
+        await self.session.flush()
+        return True
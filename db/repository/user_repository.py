@@ -0,0 +1,78 @@
+"""
+User repository.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.user import User
+from db.models.user_preference import UserPreference
+
+
+class UserRepository:
+    """Queries for users."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+        """
+        Get a user by Telegram id.
+        """
+        result = await self.session.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        """
+        Get a user by Telegram username, without the leading @.
+        """
+        result = await self.session.execute(
+            select(User).where(User.username == username).order_by(User.id).limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_members(self, department_ids: Optional[Iterable[int]] = None) -> List[Row[Any]]:
+        """
+        Get every user, or the given departments' users, with their stored preference.
+
+        Rows carry the user's id, Telegram id, username, department id and
+        language, and the UserPreference or None, ordered by user id.
+        """
+        query = (
+            select(
+                User.id,
+                User.telegram_id,
+                User.username,
+                User.department_id,
+                User.language,
+                UserPreference,
+            )
+            .outerjoin(UserPreference, UserPreference.user_id == User.id)
+            .order_by(User.id)
+        )
+        if department_ids is not None:
+            query = query.where(User.department_id.in_(list(department_ids)))
+        return list(await self.session.execute(query))
+
+    async def get_preferences(self, user_ids: Iterable[int]) -> Dict[int, UserPreference]:
+        """
+        Get the stored preferences of the given users by user id.
+        """
+        result = await self.session.execute(
+            select(UserPreference).where(UserPreference.user_id.in_(list(user_ids)))
+        )
+        return {preference.user_id: preference for preference in result.scalars()}
+
+    async def update_user(self, telegram_id: int, **fields: Any) -> Optional[User]:
+        """
+        Update the given fields of a user.
+        """
+        user = await self.get_by_telegram_id(telegram_id)
+        if user is None:
+            return None
+        for name, value in fields.items():
+            setattr(user, name, value)
+        await self.session.flush()
+        return user
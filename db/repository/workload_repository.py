@@ -0,0 +1,214 @@
+"""
+Workload rollup repository.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Row, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.shift import Shift
+from db.models.shift_assignment import ShiftAssignment
+from db.models.user import User
+from db.models.workload_rollup import WorkloadRollup
+from db.repository.shift_repository import CONFLICT_INSERTS
+from utils.scheduler import get_week_start
+from utils.workload import WORKLOAD_FIELDS, WorkloadTotals, aggregate_workload
+
+# (user id, week start) of one rollup row
+RollupKey = Tuple[int, date]
+
+# Rows per executemany batch when backfilling
+BACKFILL_BATCH_SIZE = 10000
+
+
+def _week_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    # Shift dates from the start of the first week to the end of the last
+    return (
+        datetime.combine(get_week_start(start), time.min),
+        datetime.combine(get_week_start(end) + timedelta(weeks=1), time.min),
+    )
+
+
+class WorkloadRepository:
+    """Queries and maintenance of the weekly workload rollups."""
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _aggregate(self, *conditions: Any) -> WorkloadTotals:
+        result = await self.session.execute(
+            select(ShiftAssignment.user_id, Shift.date, Shift.slot, ShiftAssignment.status)
+            .join(Shift, Shift.id == ShiftAssignment.shift_id)
+            .where(*conditions)
+        )
+        rows = result.all()
+        columns = list(zip(*rows)) if rows else [(), (), (), ()]
+        return aggregate_workload(*columns)
+
+    async def refresh(self, keys: Iterable[RollupKey]) -> int:
+        """
+        Recompute the rollups of the given (user id, week start) pairs.
+
+        Every pair is upserted, with zeros once a user has no assignments left
+        in the week: with INSERT ... ON CONFLICT DO UPDATE on SQLite and
+        PostgreSQL, elsewhere by updating the stored rows and inserting the
+        rest. Returns the number of rows written.
+        """
+        keys = set(keys)
+        if not keys:
+            return 0
+        connection = await self.session.connection()
+        dialect = connection.dialect.name
+
+        weeks = [week for _, week in keys]
+        first, last = _week_bounds(min(weeks), max(weeks))
+        totals = await self._aggregate(
+            ShiftAssignment.user_id.in_({user_id for user_id, _ in keys}),
+            Shift.date >= first,
+            Shift.date < last,
+        )
+        now = datetime.utcnow()
+        zeros = dict.fromkeys(WORKLOAD_FIELDS, 0)
+        rows: Dict[RollupKey, Dict[str, Any]] = {
+            key: dict(zeros, user_id=key[0], week_start=key[1], created_at=now, updated_at=now)
+            for key in keys
+        }
+        for row in totals.rows():
+            key = (row["user_id"], row["week_start"])
+            if key in rows:
+                rows[key].update(row)
+
+        if dialect not in CONFLICT_INSERTS:
+            await self._write(rows)
+            return len(rows)
+        statement = CONFLICT_INSERTS[dialect](WorkloadRollup)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "week_start"],
+            set_={
+                field: statement.excluded[field] for field in WORKLOAD_FIELDS + ("updated_at",)
+            },
+        )
+        await connection.execute(statement, list(rows.values()))
+        return len(rows)
+
+    async def _write(self, rows: Dict[RollupKey, Dict[str, Any]]) -> None:
+        # Portable upsert: update the stored rows by primary key, insert the others
+        result = await self.session.execute(
+            select(WorkloadRollup.id, WorkloadRollup.user_id, WorkloadRollup.week_start).where(
+                WorkloadRollup.user_id.in_({user_id for user_id, _ in rows}),
+                WorkloadRollup.week_start.in_({week for _, week in rows}),
+            )
+        )
+        stored = {(user_id, week): rollup_id for rollup_id, user_id, week in result}
+        updates = [
+            dict({field: row[field] for field in WORKLOAD_FIELDS + ("updated_at",)}, id=stored[key])
+            for key, row in rows.items()
+            if key in stored
+        ]
+        inserts = [row for key, row in rows.items() if key not in stored]
+        if updates:
+            await self.session.execute(update(WorkloadRollup), updates)
+        if inserts:
+            await self.session.execute(insert(WorkloadRollup), inserts)
+
+    async def refresh_holders(self, holders: Iterable[Tuple[int, int]]) -> int:
+        """
+        Recompute the rollups touched by changes to the given (user id, shift id) pairs.
+        """
+        holders = set(holders)
+        if not holders:
+            return 0
+        result = await self.session.execute(
+            select(Shift.id, Shift.date).where(Shift.id.in_({shift_id for _, shift_id in holders}))
+        )
+        weeks = {shift_id: get_week_start(shift_date.date()) for shift_id, shift_date in result}
+        return await self.refresh(
+            (user_id, weeks[shift_id]) for user_id, shift_id in holders if shift_id in weeks
+        )
+
+    async def backfill(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        Rebuild the rollups of the weeks of an inclusive date range, or of all time.
+
+        The assignments of the range are aggregated in one vectorized pass and
+        replace the stored rows. Returns the number of rows written.
+        """
+        conditions, stale = [], []
+        if start is not None:
+            first, _ = _week_bounds(start, start)
+            conditions.append(Shift.date >= first)
+            stale.append(WorkloadRollup.week_start >= first.date())
+        if end is not None:
+            _, last = _week_bounds(end, end)
+            conditions.append(Shift.date < last)
+            stale.append(WorkloadRollup.week_start < last.date())
+        totals = await self._aggregate(*conditions)
+
+        await self.session.execute(delete(WorkloadRollup).where(*stale))
+        now = datetime.utcnow()
+        rows = [dict(row, created_at=now, updated_at=now) for row in totals.rows()]
+        for offset in range(0, len(rows), BACKFILL_BATCH_SIZE):
+            await self.session.execute(
+                insert(WorkloadRollup), rows[offset:offset + BACKFILL_BATCH_SIZE]
+            )
+        return len(rows)
+
+    async def get_totals(
+        self,
+        start: date,
+        end: date,
+        department_ids: Optional[Iterable[int]] = None,
+        order_by: str = "hours"
+    ) -> List[Row[Any]]:
+        """
+        Get every user's workload summed over the weeks of an inclusive date range.
+
+        Rows carry the user's id, Telegram id, username and department id and
+        the WORKLOAD_FIELDS totals, ordered by ``order_by`` descending.
+        """
+        if order_by not in WORKLOAD_FIELDS:
+            raise ValueError(f"Unknown workload field: {order_by}")
+        first, last = _week_bounds(start, end)
+        totals = [
+            func.sum(getattr(WorkloadRollup, field)).label(field) for field in WORKLOAD_FIELDS
+        ]
+        query = (
+            select(User.id, User.telegram_id, User.username, User.department_id, *totals)
+            .join(WorkloadRollup, WorkloadRollup.user_id == User.id)
+            .where(
+                WorkloadRollup.week_start >= first.date(),
+                WorkloadRollup.week_start < last.date(),
+            )
+            .group_by(User.id, User.telegram_id, User.username, User.department_id)
+            .order_by(func.sum(getattr(WorkloadRollup, order_by)).desc(), User.id)
+        )
+        if department_ids is not None:
+            query = query.where(User.department_id.in_(list(department_ids)))
+        return list(await self.session.execute(query))
+
+    async def get_hours(
+        self, user_ids: Optional[Iterable[int]], start: date, end: date
+    ) -> Dict[int, float]:
+        """
+        Get the hours worked by the given users over the weeks of an inclusive date range.
+
+        With None instead of user ids, the hours of every user with a rollup
+        in the range are returned.
+        """
+        first, last = _week_bounds(start, end)
+        query = (
+            select(WorkloadRollup.user_id, func.sum(WorkloadRollup.hours))
+            .where(
+                WorkloadRollup.week_start >= first.date(),
+                WorkloadRollup.week_start < last.date(),
+            )
+            .group_by(WorkloadRollup.user_id)
+        )
+        hours: Dict[int, float] = {}
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            query = query.where(WorkloadRollup.user_id.in_(user_ids))
+            hours = dict.fromkeys(user_ids, 0.0)
+        result = await self.session.execute(query)
+        hours.update((user_id, float(total)) for user_id, total in result)
+        return hours
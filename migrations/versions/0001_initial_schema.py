@@ -0,0 +1,119 @@
+"""
+Initial schema.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps(nullable: bool = False) -> list:
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=nullable),
+        sa.Column("updated_at", sa.DateTime(), nullable=nullable),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "department",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_department_id", "department", ["id"])
+    op.create_index("ix_department_name", "department", ["name"], unique=True)
+
+    op.create_table(
+        "shift",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+        sa.Column(
+            "shift_type",
+            sa.Enum(
+                "MORNING_CALLS", "MORNING_TICKETS", "EVENING", "NIGHT", "FRIDAY", "WEEKEND",
+                name="shifttype",
+            ),
+            nullable=False,
+        ),
+        sa.Column("department_id", sa.Integer(), sa.ForeignKey("department.id"), nullable=False),
+        *_timestamps(),
+        sa.UniqueConstraint("department_id", "date", "slot", name="uq_shift_department_date_slot"),
+    )
+    op.create_index("ix_shift_id", "shift", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("telegram_id", sa.Integer(), nullable=False, unique=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=True),
+        sa.Column("last_name", sa.String(), nullable=True),
+        sa.Column(
+            "role",
+            sa.Enum("ADMIN", "DEPARTMENT_MANAGER", "SHIFT_MANAGER", "EMPLOYEE", name="userrole"),
+            nullable=False,
+        ),
+        sa.Column("department_id", sa.Integer(), sa.ForeignKey("department.id"), nullable=False),
+        sa.Column(
+            "language", sa.Enum("ENGLISH", "ARABIC", "HEBREW", name="language"), nullable=True
+        ),
+        *_timestamps(nullable=True),
+    )
+
+    op.create_table(
+        "shiftassignment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("shift_id", sa.Integer(), sa.ForeignKey("shift.id"), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        *_timestamps(),
+    )
+    op.create_index("ix_shiftassignment_id", "shiftassignment", ["id"])
+
+    op.create_table(
+        "swaprequest",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("shift_id", sa.Integer(), sa.ForeignKey("shift.id"), nullable=False),
+        sa.Column("requested_shift_id", sa.Integer(), sa.ForeignKey("shift.id"), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "APPROVED", "REJECTED", "CANCELLED", name="swaprequeststatus"),
+            nullable=False,
+        ),
+        sa.Column("approved_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("reason", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_swaprequest_id", "swaprequest", ["id"])
+
+    op.create_table(
+        "userpreference",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+        sa.Column("preferred_shifts", sa.JSON(), nullable=True),
+        sa.Column("unavailable_days", sa.JSON(), nullable=True),
+        sa.Column("max_shifts_per_week", sa.Integer(), nullable=True),
+        sa.Column("min_rest_days", sa.Integer(), nullable=True),
+        sa.Column("notes", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_userpreference_id", "userpreference", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("userpreference", "swaprequest", "shiftassignment", "users", "shift", "department"):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in ("shifttype", "userrole", "language", "swaprequeststatus"):
+        sa.Enum(name=enum).drop(bind, checkfirst=True)
@@ -0,0 +1,41 @@
+"""
+Indexes for the hot repository queries.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+PENDING_SWAPS = sa.text("status = 'PENDING'")
+
+# name, table, columns, dialect options
+INDEXES = (
+    ("ix_shift_date", "shift", ["date"], {}),
+    ("ix_shiftassignment_user_shift", "shiftassignment", ["user_id", "shift_id"], {}),
+    ("ix_shiftassignment_shift_status", "shiftassignment", ["shift_id", "status"], {}),
+    (
+        "ix_swaprequest_pending_shift", "swaprequest", ["shift_id", "requested_shift_id"],
+        {"sqlite_where": PENDING_SWAPS, "postgresql_where": PENDING_SWAPS},
+    ),
+)
+
+
+def upgrade() -> None:
+    # On PostgreSQL the indexes are built without blocking writes, which
+    # cannot happen inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
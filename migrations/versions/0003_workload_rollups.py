@@ -0,0 +1,43 @@
+"""
+Weekly workload rollups, and users by department for the reports reading them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "workloadrollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("hours", sa.Float(), nullable=False),
+        sa.Column("shifts", sa.Integer(), nullable=False),
+        sa.Column("nights", sa.Integer(), nullable=False),
+        sa.Column("weekends", sa.Integer(), nullable=False),
+        sa.Column("swaps", sa.Integer(), nullable=False),
+        sa.Column("cancellations", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("user_id", "week_start", name="uq_workloadrollup_user_week"),
+    )
+    op.create_index("ix_workloadrollup_id", "workloadrollup", ["id"])
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_department_id", "users", ["department_id"], postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_department_id", table_name="users", postgresql_concurrently=True)
+    op.drop_table("workloadrollup")
@@ -0,0 +1,37 @@
+"""
+Replacement offers, recording who was offered to cover an assignment and by whom.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "replacementoffer",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "assignment_id", sa.Integer(), sa.ForeignKey("shiftassignment.id"), nullable=False
+        ),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("offered_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("declined", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint(
+            "assignment_id", "user_id", name="uq_replacementoffer_assignment_user"
+        ),
+    )
+    op.create_index("ix_replacementoffer_id", "replacementoffer", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("replacementoffer")
@@ -0,0 +1,282 @@
+"""
+Automatic assignment of staff to generated shifts.
+
+Each day of the horizon is solved as a rectangular assignment problem over
+staff x open seats (one seat per required staff member of every shift). The
+cost matrix combines shift preferences and accumulated workload, and seats a
+staff member cannot legally take (unavailable day, weekly cap, rest period)
+are priced out. Solving day by day keeps the weekly and rest constraints,
+which span days, exact while every single solve stays a few milliseconds.
+"""
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from utils.metrics import timed
+from utils.scheduler import (
+    MIN_REST_HOURS,
+    SHIFT_REQUIREMENTS,
+    Shift,
+    ShiftType,
+    get_shift_bounds,
+    get_week_start,
+)
+
+if TYPE_CHECKING:
+    from db.models.user_preference import UserPreference
+
+
+# Cost weights
+INFEASIBLE_COST = 1e9
+PREFERENCE_PENALTY = 10.0
+FAIRNESS_WEIGHT = 1.0
+
+WEEKDAY_NAMES = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+
+SHIFT_TYPES = list(ShiftType)
+SHIFT_TYPE_INDEX = {shift_type: index for index, shift_type in enumerate(SHIFT_TYPES)}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def parse_shift_types(values: Optional[Iterable[Any]]) -> Set[ShiftType]:
+    """
+    Parse preferred shift types stored as enum names, values or prefixes.
+
+    "morning" matches both morning shifts, "NIGHT" and "Night" match the night shift.
+    """
+    shift_types: Set[ShiftType] = set()
+    for value in values or []:
+        if isinstance(value, ShiftType):
+            shift_types.add(value)
+            continue
+        token = str(getattr(value, "value", value)).strip().lower()
+        for shift_type in ShiftType:
+            if token in (shift_type.name.lower(), shift_type.value.lower()) or (
+                token and shift_type.value.lower().startswith(token)
+            ):
+                shift_types.add(shift_type)
+    return shift_types
+
+
+def parse_unavailable_days(values: Optional[Iterable[Any]]) -> Tuple[Set[int], Set[date]]:
+    """
+    Parse unavailable days into weekdays (0 is Monday) and specific dates.
+
+    Accepts weekday names, weekday numbers and ISO formatted dates.
+    """
+    weekdays: Set[int] = set()
+    dates: Set[date] = set()
+    for value in values or []:
+        if isinstance(value, datetime):
+            dates.add(value.date())
+        elif isinstance(value, date):
+            dates.add(value)
+        elif isinstance(value, int):
+            weekdays.add(value % 7)
+        else:
+            token = str(value).strip().lower()
+            if token in WEEKDAY_NAMES:
+                weekdays.add(WEEKDAY_NAMES[token])
+            else:
+                try:
+                    dates.add(date.fromisoformat(token))
+                except ValueError:
+                    continue
+    return weekdays, dates
+
+
+class StaffMember:
+    """A staff member together with the constraints used for assignment."""
+    def __init__(
+        self,
+        staff_id: str,
+        preferred_shifts: Optional[Set[ShiftType]] = None,
+        unavailable_weekdays: Optional[Set[int]] = None,
+        unavailable_dates: Optional[Set[date]] = None,
+        max_shifts_per_week: Optional[int] = None,
+        min_rest_days: Optional[int] = None,
+        prior_load: float = 0.0
+    ):
+        self.staff_id = staff_id
+        self.preferred_shifts = preferred_shifts or set()
+        self.unavailable_weekdays = unavailable_weekdays or set()
+        self.unavailable_dates = unavailable_dates or set()
+        self.max_shifts_per_week = max_shifts_per_week
+        self.min_rest_days = min_rest_days
+        self.prior_load = prior_load
+
+    @property
+    def weekly_cap(self) -> int:
+        """Maximum number of shifts (one per day) this member may work in a week."""
+        cap = 7 - (self.min_rest_days or 0)
+        if self.max_shifts_per_week is not None:
+            cap = min(cap, self.max_shifts_per_week)
+        return max(cap, 0)
+
+    @classmethod
+    def from_preference(
+        cls,
+        staff_id: str,
+        preference: Optional["UserPreference"],
+        prior_load: float = 0.0
+    ) -> "StaffMember":
+        """
+        Build a staff member from a stored user preference.
+        """
+        if preference is None:
+            return cls(staff_id, prior_load=prior_load)
+        weekdays, dates = parse_unavailable_days(preference.unavailable_days)
+        return cls(
+            staff_id,
+            preferred_shifts=parse_shift_types(preference.preferred_shifts),
+            unavailable_weekdays=weekdays,
+            unavailable_dates=dates,
+            max_shifts_per_week=preference.max_shifts_per_week,
+            min_rest_days=preference.min_rest_days,
+            prior_load=prior_load,
+        )
+
+
+class AssignmentResult:
+    """Outcome of an assignment run."""
+    def __init__(self, shifts: List[Shift], unfilled: List[Tuple[Shift, int]], total_cost: float):
+        self.shifts = shifts
+        self.unfilled = unfilled
+        self.total_cost = total_cost
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether every shift reached its minimum staffing."""
+        return not self.unfilled
+
+
+def _to_hours(value: datetime) -> float:
+    return (value - EPOCH).total_seconds() / 3600
+
+
+@timed("assign_shifts")
+def assign_shifts(
+    shifts: List[Shift], staff: List[StaffMember], fill_from: Optional[date] = None
+) -> AssignmentResult:
+    """
+    Fill the shifts up to their minimum staffing with the given staff.
+
+    Staff already listed in ``shift.assigned_staff`` are kept and counted
+    towards the requirements. Shifts before ``fill_from`` are left as they
+    are and only count towards the weekly and rest constraints. Each staff
+    member works at most one shift per day, at most ``weekly_cap`` shifts per
+    week and gets at least ``MIN_REST_HOURS`` between shifts, unless one
+    continues the other across midnight (see is_midnight_chain). Seats that
+    cannot be filled legally are reported in ``AssignmentResult.unfilled``.
+    """
+    count = len(staff)
+    index_by_id = {member.staff_id: index for index, member in enumerate(staff)}
+
+    preferred = np.zeros((count, len(SHIFT_TYPES)), dtype=bool)
+    has_preferences = np.zeros(count, dtype=bool)
+    unavailable_weekday = np.zeros((count, 7), dtype=bool)
+    unavailable_dates: Dict[date, List[int]] = {}
+    for index, member in enumerate(staff):
+        for shift_type in member.preferred_shifts:
+            preferred[index, SHIFT_TYPE_INDEX[shift_type]] = True
+        has_preferences[index] = bool(member.preferred_shifts)
+        for weekday in member.unavailable_weekdays:
+            unavailable_weekday[index, weekday] = True
+        for day in member.unavailable_dates:
+            unavailable_dates.setdefault(day, []).append(index)
+
+    weekly_cap = np.array([member.weekly_cap for member in staff], dtype=np.int64)
+    load = np.array([member.prior_load for member in staff], dtype=float)
+    last_end = np.full(count, -np.inf)
+    week_count = np.zeros(count, dtype=np.int64)
+
+    # Preference cost per staff member and shift type
+    preference_cost = np.where(preferred, 0.0, PREFERENCE_PENALTY)
+    preference_cost[~has_preferences] = PREFERENCE_PENALTY / 2
+
+    shifts_by_day: Dict[date, List[Shift]] = {}
+    for shift in shifts:
+        day = shift.date.date() if isinstance(shift.date, datetime) else shift.date
+        shifts_by_day.setdefault(day, []).append(shift)
+
+    unfilled: List[Tuple[Shift, int]] = []
+    total_cost = 0.0
+    current_week: Optional[date] = None
+
+    for day in sorted(shifts_by_day):
+        week = get_week_start(day)
+        if week != current_week:
+            current_week = week
+            week_count[:] = 0
+
+        available = ~unavailable_weekday[:, day.weekday()] & (week_count < weekly_cap)
+        if day in unavailable_dates:
+            available[unavailable_dates[day]] = False
+
+        # Register staff that were assigned beforehand
+        day_shifts = sorted(shifts_by_day[day], key=lambda shift: shift.start_time)
+        for shift in day_shifts:
+            start, end = get_shift_bounds(shift)
+            for staff_id in shift.assigned_staff:
+                index = index_by_id.get(staff_id)
+                if index is None:
+                    continue
+                available[index] = False
+                week_count[index] += 1
+                load[index] += (end - start).total_seconds() / 3600
+                last_end[index] = max(last_end[index], _to_hours(end))
+        if fill_from is not None and day < fill_from:
+            continue
+
+        seats: List[Tuple[Shift, float, float, int]] = []
+        for shift in day_shifts:
+            missing = SHIFT_REQUIREMENTS[shift.shift_type].min_staff - len(shift.assigned_staff)
+            start, end = get_shift_bounds(shift)
+            seats.extend(
+                (shift, _to_hours(start), _to_hours(end), SHIFT_TYPE_INDEX[shift.shift_type])
+                for _ in range(max(missing, 0))
+            )
+        if not seats:
+            continue
+
+        candidates = np.flatnonzero(available)
+        if candidates.size:
+            seat_start = np.array([seat[1] for seat in seats])
+            seat_type = np.array([seat[3] for seat in seats])
+            rested = (last_end[candidates, None] + MIN_REST_HOURS) <= seat_start[None, :]
+            # Seats starting at midnight continue a shift ending then (is_midnight_chain)
+            rested |= (last_end[candidates, None] == seat_start[None, :]) & (
+                seat_start[None, :] % 24 == 0
+            )
+            cost = preference_cost[candidates][:, seat_type] + FAIRNESS_WEIGHT * load[candidates, None]
+            cost = np.where(rested, cost, INFEASIBLE_COST)
+
+            rows, cols = linear_sum_assignment(cost)
+            for row, col in zip(rows, cols):
+                if cost[row, col] >= INFEASIBLE_COST:
+                    continue
+                index = int(candidates[row])
+                shift, start_hours, end_hours, _ = seats[col]
+                shift.assigned_staff.append(staff[index].staff_id)
+                week_count[index] += 1
+                load[index] += end_hours - start_hours
+                last_end[index] = end_hours
+                total_cost += float(cost[row, col])
+
+        for shift in day_shifts:
+            missing = SHIFT_REQUIREMENTS[shift.shift_type].min_staff - len(shift.assigned_staff)
+            if missing > 0:
+                unfilled.append((shift, missing))
+
+    return AssignmentResult(shifts, unfilled, total_cost)
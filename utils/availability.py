@@ -0,0 +1,264 @@
+"""
+Availability bitmaps of staff over the slots of a window, for finding replacements.
+
+Every staff member has one boolean row over the (day, slot) columns of the
+window: whether their preferences allow the slot at all. Held shifts are
+counted per column, and fixed column x column relation matrices (overlap,
+less than MIN_REST_HOURS of rest before or after, chained across midnight
+before or after, from get_shift_bounds) turn them into per-column counts,
+updated with one row addition per assignment change. Ranking a slot is
+then a few vectorized masks over all staff plus the weekly counters, the
+same rules ConflictChecker applies one assignment at a time: only shifts
+chained across midnight (is_midnight_chain) may follow each other without
+rest, and rest is measured from the end of the whole chained stretch.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.assignment import (
+    FAIRNESS_WEIGHT,
+    PREFERENCE_PENALTY,
+    SHIFT_TYPE_INDEX,
+    SHIFT_TYPES,
+    StaffMember,
+)
+from utils.scheduler import (
+    MIN_REST_HOURS,
+    WEEKLY_TEMPLATE,
+    get_scheduled_slot,
+    get_shift_bounds,
+    get_week_start,
+)
+
+SLOTS_PER_DAY = max(len(day_slots) for day_slots in WEEKLY_TEMPLATE)
+
+# Stand-in for "no cap" in the per-staff limits
+NO_LIMIT = np.iinfo(np.int32).max
+
+# Relations of a held column to another column, first axis of the relation counts
+OVERLAP, REST_BEFORE, REST_AFTER, CHAIN_BEFORE, CHAIN_AFTER = range(5)
+
+
+class AvailabilityMatrix:
+    """
+    Staff x slot availability over the days of a window, with held shifts.
+
+    Columns are ``day * SLOTS_PER_DAY + slot``; columns of slots a weekday
+    does not have are never available. Weekly rules only see the shifts
+    held within the window, so windows should start before a week starts.
+    """
+    def __init__(
+        self,
+        first_day: date,
+        days: int,
+        staff: Sequence[StaffMember],
+        department_ids: Sequence[int],
+        min_rest_hours: float = MIN_REST_HOURS
+    ):
+        self.first_day = first_day
+        self.days = days
+        self.staff_ids = [member.staff_id for member in staff]
+        self.rows: Dict[str, int] = {staff_id: row for row, staff_id in enumerate(self.staff_ids)}
+        self.department_ids = np.asarray(department_ids, dtype=np.int64)
+        count, columns = len(staff), days * SLOTS_PER_DAY
+
+        # Slot properties per column
+        self.valid = np.zeros(columns, dtype=bool)
+        self.shift_types = np.zeros(columns, dtype=np.int64)
+        starts = np.zeros(columns)
+        ends = np.zeros(columns)
+        day_of_column = np.repeat(np.arange(days), SLOTS_PER_DAY)
+        origin = datetime.combine(first_day, time.min)
+        for day_index in range(days):
+            day = first_day + timedelta(days=day_index)
+            for slot, definition in enumerate(WEEKLY_TEMPLATE[day.weekday()]):
+                column = day_index * SLOTS_PER_DAY + slot
+                start, end = get_shift_bounds(get_scheduled_slot(day, slot))
+                self.valid[column] = True
+                self.shift_types[column] = SHIFT_TYPE_INDEX[definition.shift_type]
+                starts[column] = (start - origin).total_seconds() / 3600
+                ends[column] = (end - origin).total_seconds() / 3600
+        self.hours = np.where(self.valid, ends - starts, 0.0)
+
+        # How a held column (rows) relates to every other column: the gaps
+        # from its end to their start, and from their end to its start. A
+        # zero gap is only a chain at midnight (hours from a midnight origin)
+        before = starts[None, :] - ends[:, None]
+        after = starts[:, None] - ends[None, :]
+        chain_before = (before == 0) & (starts[None, :] % 24 == 0)
+        chain_after = (after == 0) & (starts[:, None] % 24 == 0)
+        relations = np.stack([
+            (before < 0) & (after < 0),
+            (before >= 0) & (before < min_rest_hours) & ~chain_before,
+            (after >= 0) & (after < min_rest_hours) & ~chain_after,
+            chain_before,
+            chain_after,
+        ])
+        relations &= self.valid[:, None] & self.valid[None, :]
+        relations[OVERLAP][np.diag_indices(columns)] = self.valid
+        self.relations = relations.astype(np.float32)
+
+        # Day and week of every column, and the days of every week in the window
+        self.day_of_column = day_of_column
+        week_starts = [get_week_start(first_day + timedelta(days=index)) for index in range(days)]
+        self.week_of_day = np.unique(week_starts, return_inverse=True)[1].reshape(-1)
+
+        # Static availability and preferences per staff member
+        unavailable_weekday = np.zeros((count, 7), dtype=bool)
+        preferred = np.zeros((count, len(SHIFT_TYPES)), dtype=bool)
+        has_preferences = np.zeros(count, dtype=bool)
+        self.max_shifts = np.full(count, NO_LIMIT, dtype=np.int64)
+        self.max_days = np.full(count, 7, dtype=np.int64)
+        self.prior_load = np.zeros(count)
+        self.free = np.zeros((count, columns), dtype=bool)
+        weekday_of_column = np.array(
+            [(first_day + timedelta(days=int(day))).weekday() for day in day_of_column],
+            dtype=np.int64,
+        )
+        unavailable_days = []
+        for row, member in enumerate(staff):
+            for weekday in member.unavailable_weekdays:
+                unavailable_weekday[row, weekday] = True
+            for shift_type in member.preferred_shifts:
+                preferred[row, SHIFT_TYPE_INDEX[shift_type]] = True
+            has_preferences[row] = bool(member.preferred_shifts)
+            if member.max_shifts_per_week is not None:
+                self.max_shifts[row] = member.max_shifts_per_week
+            self.max_days[row] = 7 - (member.min_rest_days or 0)
+            self.prior_load[row] = member.prior_load
+            unavailable_days.extend(
+                (row, (day - first_day).days) for day in member.unavailable_dates
+            )
+        self.free[:] = self.valid & ~unavailable_weekday[:, weekday_of_column]
+        for row, day_index in unavailable_days:
+            if 0 <= day_index < days:
+                self.free[row, day_of_column == day_index] = False
+        self.preference_cost = np.where(preferred, 0.0, PREFERENCE_PENALTY)
+        self.preference_cost[~has_preferences] = PREFERENCE_PENALTY / 2
+
+        # Held shifts per column, their relations to every column and shifts per day
+        self.held = np.zeros((count, columns), dtype=np.int16)
+        self.related = np.zeros((len(self.relations), count, columns), dtype=np.int16)
+        self.day_shifts = np.zeros((count, days), dtype=np.int16)
+
+    def __len__(self) -> int:
+        return len(self.staff_ids)
+
+    def column(self, day: date, slot: int) -> Optional[int]:
+        """
+        Get the column of a slot, or None if it is outside the window or does not exist.
+        """
+        day_index = (day - self.first_day).days
+        column = day_index * SLOTS_PER_DAY + slot
+        if not 0 <= day_index < self.days or not 0 <= slot < SLOTS_PER_DAY:
+            return None
+        return column if self.valid[column] else None
+
+    def add_many(self, held: Iterable[Tuple[str, date, int]]) -> int:
+        """
+        Record many held shifts at once; return how many fell within the window.
+        """
+        rows, columns = [], []
+        for staff_id, day, slot in held:
+            row, column = self.rows.get(staff_id), self.column(day, slot)
+            if row is not None and column is not None:
+                rows.append(row)
+                columns.append(column)
+        if not rows:
+            return 0
+        added = np.zeros_like(self.held)
+        np.add.at(added, (np.array(rows), np.array(columns)), 1)
+        self.held += added
+        self.related += (added.astype(np.float32) @ self.relations).astype(np.int16)
+        self.day_shifts += added.reshape(len(self), self.days, SLOTS_PER_DAY).sum(axis=2)
+        return len(rows)
+
+    def _update(self, staff_id: str, day: date, slot: int, delta: int) -> bool:
+        row, column = self.rows.get(staff_id), self.column(day, slot)
+        if row is None or column is None:
+            return False
+        if delta < 0 and not self.held[row, column]:
+            return False
+        self.held[row, column] += delta
+        self.related[:, row] += (delta * self.relations[:, column]).astype(np.int16)
+        self.day_shifts[row, self.day_of_column[column]] += delta
+        return True
+
+    def add(self, staff_id: str, day: date, slot: int) -> bool:
+        """Record a held shift; return whether it is within the window."""
+        return self._update(staff_id, day, slot, 1)
+
+    def remove(self, staff_id: str, day: date, slot: int) -> bool:
+        """Forget a held shift; return whether it was recorded."""
+        return self._update(staff_id, day, slot, -1)
+
+    def _available(self, column: int, rows: Union[np.ndarray, slice]) -> np.ndarray:
+        # Whether each of the given staff rows can take the column
+        day = self.day_of_column[column]
+        week = self.week_of_day == self.week_of_day[day]
+        week_shifts = self.day_shifts[rows][:, week]
+        works_that_day = self.day_shifts[rows, day] > 0
+        related = self.related[:, rows, column]
+        # A shift chained to the column is its nearest neighbour on that side, and
+        # the shifts beyond it were checked against the start or end of the stretch
+        return (
+            self.free[rows, column]
+            & (related[OVERLAP] == 0)
+            & ((related[REST_BEFORE] == 0) | (related[CHAIN_BEFORE] > 0))
+            & ((related[REST_AFTER] == 0) | (related[CHAIN_AFTER] > 0))
+            & (week_shifts.sum(axis=1) < self.max_shifts[rows])
+            & (works_that_day | ((week_shifts > 0).sum(axis=1) < self.max_days[rows]))
+        )
+
+    def is_available(self, staff_id: str, day: date, slot: int) -> bool:
+        """
+        Whether the staff member can take the slot on top of the shifts they hold.
+        """
+        row, column = self.rows.get(staff_id), self.column(day, slot)
+        if row is None or column is None:
+            return False
+        return bool(self._available(column, np.array([row]))[0])
+
+    def rank(
+        self,
+        day: date,
+        slot: int,
+        limit: int,
+        department_id: Optional[int] = None,
+        exclude: Iterable[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """
+        Get up to ``limit`` staff able to take the slot, best first, with their costs.
+
+        The cost is the assignment engine's: the preference penalty of the
+        slot's shift type plus the fairness weight times the prior load and
+        the hours already held in the slot's week.
+        """
+        column = self.column(day, slot)
+        if column is None:
+            raise ValueError(f"Slot {slot} of {day} is not within the availability window")
+        if department_id is None:
+            candidates = np.flatnonzero(self._available(column, slice(None)))
+        else:
+            rows = np.flatnonzero(self.department_ids == department_id)
+            candidates = rows[self._available(column, rows)]
+        excluded = [self.rows[staff_id] for staff_id in exclude if staff_id in self.rows]
+        if excluded:
+            candidates = candidates[~np.isin(candidates, excluded)]
+        if not len(candidates):
+            return []
+
+        week = self.week_of_day[self.day_of_column] == self.week_of_day[self.day_of_column[column]]
+        week_hours = self.held[candidates][:, week] @ self.hours[week]
+        costs = (
+            self.preference_cost[candidates, self.shift_types[column]]
+            + FAIRNESS_WEIGHT * (self.prior_load[candidates] + week_hours)
+        )
+        if len(candidates) > limit:
+            best = np.argpartition(costs, limit - 1)[:limit]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(costs[best], kind="stable")]
+        return [(self.staff_ids[candidates[index]], float(costs[index])) for index in best]
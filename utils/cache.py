@@ -0,0 +1,99 @@
+"""
+Caching helpers.
+"""
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@lru_cache(maxsize=None)
+def get_redis_client() -> Any:
+    """
+    Get the shared async Redis client, or None if REDIS_URL is not configured.
+    """
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    from redis.asyncio import Redis
+
+    return Redis.from_url(url, decode_responses=True)
+
+
+class CacheStats:
+    """Hit and miss counters of a cache."""
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counters as a plain dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class TTLCache(Generic[V]):
+    """
+    Least recently used cache whose entries expire after a fixed time to live.
+    """
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Get a value, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+        """
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove a value.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all values.
+        """
+        self._entries.clear()
@@ -0,0 +1,257 @@
+"""
+Per-staff timeline checks for overlapping shifts and rest rules.
+
+Every staff member has a timeline of the shifts they hold, indexed by
+interval (see utils.intervals) with bounds from ``get_shift_bounds``, so
+shifts crossing midnight are compared by their real hours. A new assignment
+is checked against its neighbours in O(log n) and against per-week counters
+in O(1). Only shifts chained across midnight (see
+utils.scheduler.is_midnight_chain) form one continuous stretch, with rest
+measured between stretches; any other shifts closer than the minimum rest
+conflict, including one starting as the other ends.
+"""
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from utils.assignment import StaffMember
+from utils.intervals import IntervalIndex
+from utils.scheduler import MIN_REST_HOURS, get_shift_bounds, get_week_start, is_midnight_chain
+
+# (staff id, key, shift) of one assignment; the key identifies the shift
+Assignment = Tuple[str, Hashable, Any]
+
+
+class ConflictRule(Enum):
+    """Rules an assignment can violate."""
+    OVERLAP = "overlap"
+    REST_HOURS = "rest_hours"
+    REST_DAYS = "rest_days"
+    WEEKLY_CAP = "weekly_cap"
+
+
+class Conflict:
+    """A violated rule, with the already held shift it conflicts with if any."""
+    __slots__ = ("rule", "staff_id", "key", "other_key", "message")
+
+    def __init__(
+        self,
+        rule: ConflictRule,
+        staff_id: str,
+        key: Hashable,
+        message: str,
+        other_key: Optional[Hashable] = None
+    ):
+        self.rule = rule
+        self.staff_id = staff_id
+        self.key = key
+        self.other_key = other_key
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"<Conflict {self.rule.value} {self.staff_id} {self.key}: {self.message}>"
+
+
+class StaffTimeline:
+    """The shifts one staff member holds, with their per-week day and shift counts."""
+    def __init__(self, member: Optional[StaffMember] = None):
+        self.min_rest_days = (member.min_rest_days or 0) if member else 0
+        self.max_shifts_per_week = member.max_shifts_per_week if member else None
+        self.intervals: IntervalIndex[Hashable] = IntervalIndex()
+        # week start -> worked day -> number of shifts starting that day
+        self.days: Dict[date, Dict[date, int]] = {}
+
+    def check(
+        self, staff_id: str, key: Hashable, start: datetime, end: datetime, min_rest: timedelta
+    ) -> Optional[Conflict]:
+        """
+        Get the first rule that taking on [start, end) would violate, or None.
+
+        The shift is expected not to be held yet.
+        """
+        for other in self.intervals.overlapping(start, end):
+            return Conflict(
+                ConflictRule.OVERLAP, staff_id, key,
+                f"overlaps shift {other} held by {staff_id}", other,
+            )
+
+        # Without overlaps, the neighbours end before the start and start after the end
+        previous = self.intervals.last_before(start)
+        if previous is not None:
+            rest = start - previous[1]
+            if rest < min_rest and not is_midnight_chain(previous[1], start):
+                return Conflict(
+                    ConflictRule.REST_HOURS, staff_id, key,
+                    f"starts {_hours(rest)} after shift {previous[2]} ends", previous[2],
+                )
+        following = self.intervals.first_from(end)
+        if following is not None:
+            rest = following[0] - end
+            if rest < min_rest and not is_midnight_chain(end, following[0]):
+                return Conflict(
+                    ConflictRule.REST_HOURS, staff_id, key,
+                    f"ends {_hours(rest)} before shift {following[2]} starts", following[2],
+                )
+
+        day = start.date()
+        week_start = get_week_start(day)
+        week = self.days.get(week_start, {})
+        if self.min_rest_days and day not in week and len(week) + 1 > 7 - self.min_rest_days:
+            return Conflict(
+                ConflictRule.REST_DAYS, staff_id, key,
+                f"leaves fewer than {self.min_rest_days} days off in the week of {week_start}",
+            )
+        cap = self.max_shifts_per_week
+        if cap is not None and sum(week.values()) + 1 > cap:
+            return Conflict(
+                ConflictRule.WEEKLY_CAP, staff_id, key,
+                f"exceeds {cap} shifts in the week of {week_start}",
+            )
+        return None
+
+    def add(self, key: Hashable, start: datetime, end: datetime) -> None:
+        """Add a held shift."""
+        self.remove(key)
+        self.intervals.add(key, start, end, key)
+        week = self.days.setdefault(get_week_start(start.date()), {})
+        week[start.date()] = week.get(start.date(), 0) + 1
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove a held shift; return whether it was held."""
+        interval = self.intervals.get(key)
+        if interval is None:
+            return False
+        self.intervals.remove(key)
+        day = interval[0].date()
+        week = self.days[get_week_start(day)]
+        week[day] -= 1
+        if not week[day]:
+            del week[day]
+        return True
+
+
+def _hours(delta: timedelta) -> str:
+    return f"{delta.total_seconds() / 3600:g}h"
+
+
+class ConflictChecker:
+    """
+    Timelines of every staff member, checking assignments and swaps against them.
+
+    Staff without a StaffMember entry are only checked for overlaps and rest hours.
+    """
+    def __init__(self, staff: Iterable[StaffMember] = (), min_rest_hours: float = MIN_REST_HOURS):
+        self.members: Dict[str, StaffMember] = {member.staff_id: member for member in staff}
+        self.min_rest = timedelta(hours=min_rest_hours)
+        self.timelines: Dict[str, StaffTimeline] = {}
+
+    def timeline(self, staff_id: str) -> StaffTimeline:
+        """Get the timeline of a staff member, creating it if needed."""
+        timeline = self.timelines.get(staff_id)
+        if timeline is None:
+            timeline = self.timelines[staff_id] = StaffTimeline(self.members.get(staff_id))
+        return timeline
+
+    def check(self, staff_id: str, key: Hashable, shift: Any) -> Optional[Conflict]:
+        """
+        Get the first rule violated by assigning the shift to the staff member, or None.
+        """
+        start, end = get_shift_bounds(shift)
+        return self.timeline(staff_id).check(staff_id, key, start, end, self.min_rest)
+
+    def add(self, staff_id: str, key: Hashable, shift: Any) -> None:
+        """Record that the staff member holds the shift."""
+        start, end = get_shift_bounds(shift)
+        self.timeline(staff_id).add(key, start, end)
+
+    def remove(self, staff_id: str, key: Hashable) -> bool:
+        """Record that the staff member no longer holds the shift."""
+        timeline = self.timelines.get(staff_id)
+        return timeline is not None and timeline.remove(key)
+
+    def assign(self, staff_id: str, key: Hashable, shift: Any) -> Optional[Conflict]:
+        """
+        Add the shift to the staff member's timeline unless it violates a rule.
+        """
+        conflict = self.check(staff_id, key, shift)
+        if conflict is None:
+            self.add(staff_id, key, shift)
+        return conflict
+
+    def check_swap(self, first: Assignment, second: Assignment) -> Optional[Conflict]:
+        """
+        Check two held assignments exchanging their shifts.
+
+        Each staff member is checked without the shift they give away; the
+        timelines are left unchanged.
+        """
+        return self.check_cycle([first, second])
+
+    def check_cycle(self, assignments: List[Assignment]) -> Optional[Conflict]:
+        """
+        Check held assignments passing their shifts around a cycle.
+
+        Every staff member takes the shift of the next one and the last takes
+        the first one's. Each is checked without the shift they give away;
+        the timelines are left unchanged.
+        """
+        removed = [
+            (staff_id, key, shift)
+            for staff_id, key, shift in assignments
+            if self.remove(staff_id, key)
+        ]
+        try:
+            for (staff_id, _, _), (_, key, shift) in zip(
+                assignments, assignments[1:] + assignments[:1]
+            ):
+                conflict = self.check(staff_id, key, shift)
+                if conflict is not None:
+                    return conflict
+            return None
+        finally:
+            for staff_id, key, shift in removed:
+                self.add(staff_id, key, shift)
+
+    def apply_cycle(self, assignments: List[Assignment]) -> None:
+        """
+        Record that held assignments passed their shifts around a cycle, as in check_cycle.
+        """
+        for staff_id, key, _ in assignments:
+            self.remove(staff_id, key)
+        for (staff_id, _, _), (_, key, shift) in zip(
+            assignments, assignments[1:] + assignments[:1]
+        ):
+            self.add(staff_id, key, shift)
+
+    def check_all(self, assignments: Iterable[Assignment]) -> List[Conflict]:
+        """
+        Validate a proposed batch of assignments, such as a whole month, in one pass.
+
+        Assignments are applied in start order on top of the held shifts;
+        conflicting ones are reported and left out, so one bad assignment
+        does not cascade into reports for the shifts after it.
+        """
+        ordered = sorted(
+            (get_shift_bounds(shift) + (staff_id, key) for staff_id, key, shift in assignments),
+            key=lambda item: item[0],
+        )
+        conflicts = []
+        for start, end, staff_id, key in ordered:
+            timeline = self.timeline(staff_id)
+            conflict = timeline.check(staff_id, key, start, end, self.min_rest)
+            if conflict is None:
+                timeline.add(key, start, end)
+            else:
+                conflicts.append(conflict)
+        return conflicts
+
+
+def validate_schedule(shifts: Iterable[Any], staff: Iterable[StaffMember] = ()) -> List[Conflict]:
+    """
+    Validate the ``assigned_staff`` of generated shifts; keys are positions in ``shifts``.
+    """
+    return ConflictChecker(staff).check_all(
+        (staff_id, key, shift)
+        for key, shift in enumerate(shifts)
+        for staff_id in shift.assigned_staff
+    )
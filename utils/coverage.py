@@ -0,0 +1,87 @@
+"""
+Vectorized staffing coverage of a whole period against SHIFT_REQUIREMENTS.
+
+Slots are given as an array of shift type codes (positions in
+``utils.assignment.SHIFT_TYPES``) and assignments as the slot position of
+every held seat; headcounts come from one ``np.bincount`` and are compared
+with the minimum and maximum staffing of every slot at once.
+"""
+from typing import Iterable
+
+import numpy as np
+
+from utils.assignment import SHIFT_TYPE_INDEX, SHIFT_TYPES
+from utils.scheduler import SHIFT_REQUIREMENTS
+
+# Minimum and maximum staffing per shift type code; no maximum is unbounded
+MIN_STAFF = np.array(
+    [SHIFT_REQUIREMENTS[shift_type].min_staff for shift_type in SHIFT_TYPES], dtype=np.int64
+)
+MAX_STAFF = np.array(
+    [
+        SHIFT_REQUIREMENTS[shift_type].max_staff or np.iinfo(np.int64).max
+        for shift_type in SHIFT_TYPES
+    ],
+    dtype=np.int64,
+)
+
+
+class CoverageReport:
+    """Headcount, deficit and surplus of every slot of a period."""
+    def __init__(self, headcount: np.ndarray, minimum: np.ndarray, maximum: np.ndarray):
+        self.headcount = headcount
+        self.minimum = minimum
+        self.maximum = maximum
+        self.deficit = np.maximum(minimum - headcount, 0)
+        self.surplus = np.maximum(headcount - maximum, 0)
+
+    def __len__(self) -> int:
+        return len(self.headcount)
+
+    @property
+    def is_covered(self) -> bool:
+        """Whether every slot is staffed within its requirements."""
+        return not self.deficit.any() and not self.surplus.any()
+
+    @property
+    def understaffed(self) -> np.ndarray:
+        """Positions of the slots below their minimum, largest deficit first."""
+        positions = np.flatnonzero(self.deficit)
+        return positions[np.argsort(-self.deficit[positions], kind="stable")]
+
+    @property
+    def overstaffed(self) -> np.ndarray:
+        """Positions of the slots above their maximum, largest surplus first."""
+        positions = np.flatnonzero(self.surplus)
+        return positions[np.argsort(-self.surplus[positions], kind="stable")]
+
+    @property
+    def total_deficit(self) -> int:
+        """Staff missing over all slots."""
+        return int(self.deficit.sum())
+
+    @property
+    def total_surplus(self) -> int:
+        """Staff above the maximum over all slots."""
+        return int(self.surplus.sum())
+
+
+def check_coverage(shift_types: np.ndarray, assigned_slots: np.ndarray) -> CoverageReport:
+    """
+    Check the coverage of slots given their shift type codes and the slot of every assignment.
+    """
+    shift_types = np.asarray(shift_types, dtype=np.int64)
+    headcount = np.bincount(
+        np.asarray(assigned_slots, dtype=np.int64), minlength=len(shift_types)
+    )
+    return CoverageReport(headcount, MIN_STAFF[shift_types], MAX_STAFF[shift_types])
+
+
+def get_shift_type_codes(shift_types: Iterable) -> np.ndarray:
+    """
+    Encode shift types as the codes used by check_coverage.
+    """
+    return np.fromiter(
+        (SHIFT_TYPE_INDEX[shift_type] for shift_type in shift_types), dtype=np.int64
+    )
+
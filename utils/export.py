@@ -0,0 +1,116 @@
+"""
+CSV and iCalendar rendering of schedule exports, streamed row by row.
+"""
+import csv
+import io
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterable, AsyncIterator, Tuple
+
+from utils.scheduler import get_scheduled_slot, get_shift_bounds
+
+# Exports up to this size stay in memory, larger ones spill to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+CSV_HEADER = ("date", "start", "end", "shift_type", "department", "staff")
+
+ICS_PRODUCT_ID = "-//Shift Scheduler Bot//Schedule Export//EN"
+ICS_LINE_LIMIT = 75
+
+
+def get_row_bounds(row: Any) -> Tuple[datetime, datetime]:
+    """
+    Get the start and end of an export row's shift from its template slot.
+    """
+    return get_shift_bounds(get_scheduled_slot(row.date, row.slot))
+
+
+async def iter_csv(rows: AsyncIterable[Any]) -> AsyncIterator[str]:
+    """
+    Render export rows as CSV, one line per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def render(values: Tuple[Any, ...]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield render(CSV_HEADER)
+    async for row in rows:
+        start, end = get_row_bounds(row)
+        yield render((
+            start.strftime("%Y-%m-%d"),
+            start.strftime("%H:%M"),
+            end.strftime("%H:%M"),
+            row.shift_type.value,
+            row.department,
+            row.username or "",
+        ))
+
+
+def _ics_escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _ics_line(line: str) -> str:
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICS_LINE_LIMIT:
+        return line + "\r\n"
+    parts = []
+    limit = ICS_LINE_LIMIT
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Do not split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = ICS_LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+async def iter_ics(rows: AsyncIterable[Any], calendar_name: str) -> AsyncIterator[str]:
+    """
+    Render export rows as an iCalendar file, one event per row.
+    """
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    yield "".join(_ics_line(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_ics_escape(calendar_name)}",
+    ))
+    async for row in rows:
+        start, end = get_row_bounds(row)
+        summary = f"{row.shift_type.value} shift"
+        if row.username:
+            summary += f" - {row.username}"
+        yield "".join(_ics_line(line) for line in (
+            "BEGIN:VEVENT",
+            f"UID:shift-{row.shift_id}-{row.telegram_id or 0}@shift-scheduler-bot",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+            f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+            f"SUMMARY:{_ics_escape(summary)}",
+            f"LOCATION:{_ics_escape(row.department)}",
+            "END:VEVENT",
+        ))
+    yield _ics_line("END:VCALENDAR")
+
+
+async def spool_export(lines: AsyncIterable[str]) -> SpooledTemporaryFile:
+    """
+    Write rendered lines to a spooled file, rewound for reading.
+    """
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    async for line in lines:
+        spool.write(line.encode("utf-8"))
+    spool.seek(0)
+    return spool
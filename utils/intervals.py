@@ -0,0 +1,139 @@
+"""
+Sorted interval index for point-in-time and range lookups.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class IntervalIndex(Generic[T]):
+    """
+    Half-open [start, end) intervals kept sorted by start.
+
+    Lookups bisect the starts and only look back as far as the longest
+    interval, so a query costs O(log n + k) where k is the number of
+    intervals starting within ``max_duration`` of the queried range.
+    Intervals are added and removed by key.
+    """
+    def __init__(self) -> None:
+        # Parallel lists in start order
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        self._keys: List[Hashable] = []
+        self._values: List[T] = []
+        self._start_of: Dict[Hashable, datetime] = {}
+        self.max_duration = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._start_of
+
+    def _find(self, key: Hashable) -> Optional[int]:
+        start = self._start_of.get(key)
+        if start is None:
+            return None
+        position = bisect_left(self._starts, start)
+        while self._keys[position] != key:
+            position += 1
+        return position
+
+    def get(self, key: Hashable) -> Optional[Tuple[datetime, datetime, T]]:
+        """
+        Get the start, end and value of the interval with the given key.
+        """
+        position = self._find(key)
+        if position is None:
+            return None
+        return self._starts[position], self._ends[position], self._values[position]
+
+    def add(self, key: Hashable, start: datetime, end: datetime, value: T) -> None:
+        """
+        Add an interval, replacing any interval with the same key.
+        """
+        if end <= start:
+            raise ValueError(f"Interval {key} does not end after it starts: {start} - {end}")
+        self.remove(key)
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+        self._keys.insert(position, key)
+        self._values.insert(position, value)
+        self._start_of[key] = start
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, key: Hashable) -> bool:
+        """
+        Remove the interval with the given key; return whether there was one.
+
+        ``max_duration`` is not lowered, which only widens later lookups.
+        """
+        position = self._find(key)
+        if position is None:
+            return False
+        del self._starts[position]
+        del self._ends[position]
+        del self._keys[position]
+        del self._values[position]
+        del self._start_of[key]
+        return True
+
+    def replace(self, intervals: Iterable[Tuple[Hashable, datetime, datetime, T]]) -> None:
+        """
+        Replace every interval at once; faster than adding them one by one.
+        """
+        items = sorted(intervals, key=lambda interval: interval[1])
+        for key, start, end, _ in items:
+            if end <= start:
+                raise ValueError(f"Interval {key} does not end after it starts: {start} - {end}")
+        self._starts = [start for _, start, _, _ in items]
+        self._ends = [end for _, _, end, _ in items]
+        self._keys = [key for key, _, _, _ in items]
+        self._values = [value for _, _, _, value in items]
+        self._start_of = dict(zip(self._keys, self._starts))
+        self.max_duration = max(
+            (end - start for _, start, end, _ in items), default=timedelta(0)
+        )
+
+    def overlapping(self, start: datetime, end: datetime) -> Iterator[T]:
+        """
+        Yield the values of intervals overlapping [start, end), in start order.
+        """
+        first = bisect_right(self._starts, start - self.max_duration)
+        last = bisect_left(self._starts, end)
+        for position in range(first, last):
+            if self._ends[position] > start:
+                yield self._values[position]
+
+    def at(self, moment: datetime) -> List[T]:
+        """
+        Get the values of intervals containing the given moment.
+        """
+        first = bisect_right(self._starts, moment - self.max_duration)
+        last = bisect_right(self._starts, moment)
+        return [
+            self._values[position]
+            for position in range(first, last)
+            if self._ends[position] > moment
+        ]
+
+    def last_before(self, moment: datetime) -> Optional[Tuple[datetime, datetime, T]]:
+        """
+        Get the interval with the latest start before the moment.
+        """
+        position = bisect_left(self._starts, moment) - 1
+        if position < 0:
+            return None
+        return self._starts[position], self._ends[position], self._values[position]
+
+    def first_from(self, moment: datetime) -> Optional[Tuple[datetime, datetime, T]]:
+        """
+        Get the interval with the earliest start at or after the moment.
+        """
+        position = bisect_left(self._starts, moment)
+        if position == len(self._starts):
+            return None
+        return self._starts[position], self._ends[position], self._values[position]
@@ -0,0 +1,187 @@
+"""
+Prometheus instrumentation of handlers, database queries, caches and scheduling.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+HANDLER_SECONDS = Histogram(
+    "shiftbot_handler_seconds",
+    "Time spent in a command, message or callback handler.",
+    ["kind", "name"],
+)
+HANDLER_ERRORS = Counter(
+    "shiftbot_handler_errors_total",
+    "Exceptions raised by handlers.",
+    ["kind", "name"],
+)
+UPDATE_SECONDS = Histogram(
+    "shiftbot_update_seconds",
+    "Time spent processing an update end to end.",
+)
+UPDATE_ERRORS = Counter(
+    "shiftbot_update_errors_total",
+    "Errors reported to the application error handler.",
+    ["error"],
+)
+DB_QUERIES_PER_UPDATE = Histogram(
+    "shiftbot_db_queries_per_update",
+    "Database queries issued while processing one update.",
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, float("inf")),
+)
+DB_SECONDS_PER_UPDATE = Histogram(
+    "shiftbot_db_seconds_per_update",
+    "Time spent in database queries while processing one update.",
+)
+DB_QUERY_SECONDS = Histogram(
+    "shiftbot_db_query_seconds",
+    "Duration of single database queries.",
+)
+SCHEDULING_SECONDS = Histogram(
+    "shiftbot_scheduling_seconds",
+    "Time spent in schedule generation and assignment.",
+    ["operation"],
+)
+
+
+class UpdateStats:
+    """Database usage of the update being processed."""
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_update_stats: ContextVar[Optional[UpdateStats]] = ContextVar("update_stats", default=None)
+
+
+@contextmanager
+def track_update() -> Iterator[UpdateStats]:
+    """
+    Record the duration and database usage of the update processed inside the block.
+    """
+    stats = UpdateStats()
+    token = _update_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        UPDATE_SECONDS.observe(time.perf_counter() - started)
+        DB_QUERIES_PER_UPDATE.observe(stats.queries)
+        DB_SECONDS_PER_UPDATE.observe(stats.query_seconds)
+        _update_stats.reset(token)
+
+
+@contextmanager
+def track_handler(kind: str, name: str) -> Iterator[None]:
+    """
+    Record the latency and errors of the handler run inside the block.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        HANDLER_ERRORS.labels(kind, name).inc()
+        raise
+    finally:
+        HANDLER_SECONDS.labels(kind, name).observe(time.perf_counter() - started)
+
+
+def instrumented(kind: str, name: str) -> Callable[[F], F]:
+    """
+    Decorate an async handler to record its latency and errors.
+    """
+    def decorator(handler: F) -> F:
+        @functools.wraps(handler)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track_handler(kind, name):
+                return await handler(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def timed(operation: str) -> Callable[[F], F]:
+    """
+    Decorate a synchronous function to record its duration.
+    """
+    histogram = SCHEDULING_SECONDS.labels(operation)
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with histogram.time():
+                return function(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _update_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def instrument_engine(engine: Any) -> None:
+    """
+    Count and time the queries of an (async) SQLAlchemy engine.
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class CacheCollector:
+    """Exports hit/miss counters and hit ratios of registered caches."""
+    def __init__(self):
+        # cache name -> callable returning {tier: CacheStats}
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self) -> Iterator[Any]:
+        hits = CounterMetricFamily("shiftbot_cache_hits", "Cache hits.", labels=["cache", "tier"])
+        misses = CounterMetricFamily("shiftbot_cache_misses", "Cache misses.", labels=["cache", "tier"])
+        ratio = GaugeMetricFamily("shiftbot_cache_hit_ratio", "Cache hit ratio.", labels=["cache", "tier"])
+        for cache, source in self.sources.items():
+            for tier, stats in source().items():
+                hits.add_metric([cache, tier], stats.hits)
+                misses.add_metric([cache, tier], stats.misses)
+                ratio.add_metric([cache, tier], stats.hit_rate)
+        yield hits
+        yield misses
+        yield ratio
+
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+
+def register_cache(name: str, source: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Export the statistics of a cache; ``source`` returns a CacheStats per tier.
+    """
+    cache_collector.sources[name] = source
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Serve /metrics on its own HTTP port.
+    """
+    from prometheus_client import start_http_server
+
+    start_http_server(port)
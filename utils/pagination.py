@@ -0,0 +1,62 @@
+"""
+Size-aware pagination of long bot messages.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+# Telegram message limit, counted in UTF-16 code units
+MAX_MESSAGE_LENGTH = 4096
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def message_length(text: str) -> int:
+    """
+    Get the length of a text as counted by Telegram (UTF-16 code units).
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def build_page(
+    header: str,
+    entries: Iterable[str],
+    limit: int = MAX_MESSAGE_LENGTH,
+    from_end: bool = False
+) -> Tuple[str, int]:
+    """
+    Join as many entries as fit under the limit after the header.
+
+    With ``from_end`` the entries are taken from the end of the (finite)
+    sequence instead, keeping their order. Returns the page text and the
+    number of entries it contains. The first entry is always included,
+    truncated if it does not fit on its own.
+    """
+    if from_end:
+        entries = reversed(list(entries))
+    parts: List[str] = []
+    used = message_length(header)
+    for entry in entries:
+        size = message_length(entry)
+        if used + size > limit:
+            if not parts:
+                parts.append(entry[:max(limit - used, 0)])
+            break
+        parts.append(entry)
+        used += size
+    if from_end:
+        parts.reverse()
+    return header + "".join(parts), len(parts)
+
+
+def cursor_to_args(when: datetime, row_id: int) -> Tuple[int, int]:
+    """
+    Encode a (datetime, id) keyset cursor as integers for callback data.
+    """
+    return int((when - EPOCH).total_seconds()), row_id
+
+
+def args_to_cursor(seconds: int, row_id: int) -> Tuple[datetime, int]:
+    """
+    Decode a keyset cursor encoded by cursor_to_args.
+    """
+    return EPOCH + timedelta(seconds=seconds), row_id
@@ -0,0 +1,55 @@
+"""
+Token bucket rate limiting.
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``rate`` tokens per second.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take tokens if available, without waiting.
+        """
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """
+        Seconds until the given number of tokens is available.
+        """
+        self._refill()
+        return max(tokens - self.tokens, 0.0) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Wait until tokens are available and take them. Waiters are served in order.
+        """
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.delay(tokens))
+
+    def pause(self, seconds: float) -> None:
+        """
+        Withhold tokens for the given time, e.g. after the server asked to back off.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
@@ -1,10 +1,12 @@
 """
 Shift scheduling logic for the IT team.
 """
-from datetime import datetime, time, timedelta
-from typing import List, Dict, Optional
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from enum import Enum
 
+from utils.metrics import timed
+
 
 class ShiftType(Enum):
     """Types of shifts available."""
@@ -33,9 +35,73 @@ SHIFT_REQUIREMENTS = {
     ShiftType.WEEKEND: ShiftRequirements(min_staff=1)
 }
 
+# Minimum number of hours between the end of one shift and the start of the next
+MIN_REST_HOURS = 11
+
+
+class SlotDefinition:
+    """Definition of a recurring slot, shared by every week of a schedule."""
+    __slots__ = ("shift_type", "start_time", "end_time", "description")
+
+    def __init__(
+        self,
+        shift_type: ShiftType,
+        start_time: time,
+        end_time: time,
+        description: str
+    ):
+        self.shift_type = shift_type
+        self.start_time = start_time
+        self.end_time = end_time
+        self.description = description
+
+
+WORKDAY_SLOTS = (
+    SlotDefinition(ShiftType.MORNING_CALLS, time(8, 0), time(17, 0),
+                   "Morning Shift - Calls Team (08:00 - 17:00)"),
+    SlotDefinition(ShiftType.MORNING_TICKETS, time(8, 0), time(17, 0),
+                   "Morning Shift - Tickets Team (08:00 - 17:00)"),
+    SlotDefinition(ShiftType.EVENING, time(13, 0), time(22, 0),
+                   "Evening Shift (13:00 - 22:00)"),
+    SlotDefinition(ShiftType.NIGHT, time(22, 0), time(8, 0),
+                   "Night Shift (22:00 - 08:00)"),
+)
+
+FRIDAY_SLOTS = (
+    SlotDefinition(ShiftType.FRIDAY, time(8, 0), time(14, 0),
+                   "Friday Shift (08:00 - 14:00)"),
+    SlotDefinition(ShiftType.FRIDAY, time(14, 0), time(17, 0),
+                   "Extended Friday Shift (14:00 - 17:00)"),
+    SlotDefinition(ShiftType.WEEKEND, time(17, 0), time(23, 59),
+                   "Weekend Shift (17:00 - 08:00)"),
+)
+
+SATURDAY_SLOTS = (
+    SlotDefinition(ShiftType.WEEKEND, time(0, 0), time(18, 30),
+                   "Weekend Shift (00:00 - 18:30)"),
+    SlotDefinition(ShiftType.WEEKEND, time(18, 30), time(22, 30),
+                   "Saturday Evening Shift (18:30 - 22:30)"),
+    SlotDefinition(ShiftType.WEEKEND, time(22, 30), time(23, 59),
+                   "Weekend Shift (22:30 - 08:00)"),
+)
+
+# Slots for each weekday (0 is Monday): Sunday to Thursday are workdays,
+# Friday and Saturday are the weekend.
+WEEKLY_TEMPLATE: Tuple[Tuple[SlotDefinition, ...], ...] = (
+    WORKDAY_SLOTS,
+    WORKDAY_SLOTS,
+    WORKDAY_SLOTS,
+    WORKDAY_SLOTS,
+    FRIDAY_SLOTS,
+    SATURDAY_SLOTS,
+    WORKDAY_SLOTS,
+)
+
 
 class Shift:
     """Represents a work shift."""
+    __slots__ = ("date", "shift_type", "start_time", "end_time", "description", "assigned_staff")
+
     def __init__(
         self,
         date: datetime,
@@ -52,102 +118,159 @@ class Shift:
         self.assigned_staff: List[str] = []
 
 
+class ScheduledSlot:
+    """A slot of the weekly template placed on a concrete date."""
+    __slots__ = ("date", "index", "definition")
+
+    def __init__(self, date: datetime, index: int, definition: SlotDefinition):
+        self.date = date
+        self.index = index
+        self.definition = definition
+
+    @property
+    def shift_type(self) -> ShiftType:
+        """Type of the slot."""
+        return self.definition.shift_type
+
+    @property
+    def start_time(self) -> time:
+        """Start time of the slot."""
+        return self.definition.start_time
+
+    @property
+    def end_time(self) -> time:
+        """End time of the slot."""
+        return self.definition.end_time
+
+    @property
+    def description(self) -> str:
+        """Shared description of the slot."""
+        return self.definition.description
+
+    def to_shift(self) -> Shift:
+        """
+        Materialize the slot as a mutable shift.
+        """
+        definition = self.definition
+        return Shift(
+            date=self.date,
+            shift_type=definition.shift_type,
+            start_time=definition.start_time,
+            end_time=definition.end_time,
+            description=definition.description
+        )
+
+
+def get_scheduled_slot(day: datetime, slot: int) -> ScheduledSlot:
+    """
+    Get the template slot with the given index on a date.
+
+    Raises IndexError if the day has no such slot.
+    """
+    return ScheduledSlot(day, slot, WEEKLY_TEMPLATE[day.weekday()][slot])
+
+
+def _filter_template(
+    shift_types: Optional[Iterable[ShiftType]]
+) -> Tuple[Tuple[Tuple[int, SlotDefinition], ...], ...]:
+    """
+    Get the indexed template slots of each weekday, restricted to the given types.
+    """
+    wanted = set(shift_types) if shift_types is not None else None
+    return tuple(
+        tuple(
+            (index, slot) for index, slot in enumerate(day_slots)
+            if wanted is None or slot.shift_type in wanted
+        )
+        for day_slots in WEEKLY_TEMPLATE
+    )
+
+
+def iter_shift_schedule(
+    start_date: datetime,
+    end_date: datetime,
+    shift_types: Optional[Iterable[ShiftType]] = None
+) -> Iterator[ScheduledSlot]:
+    """
+    Lazily generate the slots of the given date range.
+
+    Slots reference the shared template definitions, so memory use does not
+    grow with the length of the range. Days without matching slots are skipped.
+    """
+    template = _filter_template(shift_types)
+    days = (end_date - start_date).days
+    first_weekday = start_date.weekday()
+    for offset in range(days + 1):
+        day_slots = template[(first_weekday + offset) % 7]
+        if not day_slots:
+            continue
+        current_date = start_date + timedelta(days=offset)
+        for index, slot in day_slots:
+            yield ScheduledSlot(current_date, index, slot)
+
+
+def count_shift_slots(
+    start_date: datetime,
+    end_date: datetime,
+    shift_types: Optional[Iterable[ShiftType]] = None
+) -> int:
+    """
+    Count the slots of the given date range without generating them.
+    """
+    per_weekday = [len(day_slots) for day_slots in _filter_template(shift_types)]
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return 0
+    weeks, remainder = divmod(days, 7)
+    first_weekday = start_date.weekday()
+    return weeks * sum(per_weekday) + sum(
+        per_weekday[(first_weekday + offset) % 7] for offset in range(remainder)
+    )
+
+
+@timed("get_shift_schedule")
 def get_shift_schedule(start_date: datetime, end_date: datetime) -> List[Shift]:
     """
     Generate shift schedule for the given date range.
     """
-    schedule: List[Shift] = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        # Check if it's a weekend (Friday or Saturday)
-        if current_date.weekday() in [4, 5]:  # 4 is Friday, 5 is Saturday
-            if current_date.weekday() == 4:  # Friday
-                # Friday shift
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.FRIDAY,
-                    start_time=time(8, 0),
-                    end_time=time(14, 0),
-                    description="Friday Shift (08:00 - 14:00)"
-                ))
-                # Extended Friday shift
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.FRIDAY,
-                    start_time=time(14, 0),
-                    end_time=time(17, 0),
-                    description="Extended Friday Shift (14:00 - 17:00)"
-                ))
-                # Weekend shift starts
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.WEEKEND,
-                    start_time=time(17, 0),
-                    end_time=time(23, 59),
-                    description="Weekend Shift (17:00 - 08:00)"
-                ))
-            else:  # Saturday
-                # Weekend shift continues
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.WEEKEND,
-                    start_time=time(0, 0),
-                    end_time=time(18, 30),
-                    description="Weekend Shift (00:00 - 18:30)"
-                ))
-                # Additional Saturday evening shift
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.WEEKEND,
-                    start_time=time(18, 30),
-                    end_time=time(22, 30),
-                    description="Saturday Evening Shift (18:30 - 22:30)"
-                ))
-                # Weekend shift continues
-                schedule.append(Shift(
-                    date=current_date,
-                    shift_type=ShiftType.WEEKEND,
-                    start_time=time(22, 30),
-                    end_time=time(23, 59),
-                    description="Weekend Shift (22:30 - 08:00)"
-                ))
-        else:  # Sunday to Thursday
-            # Morning shifts
-            schedule.append(Shift(
-                date=current_date,
-                shift_type=ShiftType.MORNING_CALLS,
-                start_time=time(8, 0),
-                end_time=time(17, 0),
-                description="Morning Shift - Calls Team (08:00 - 17:00)"
-            ))
-            schedule.append(Shift(
-                date=current_date,
-                shift_type=ShiftType.MORNING_TICKETS,
-                start_time=time(8, 0),
-                end_time=time(17, 0),
-                description="Morning Shift - Tickets Team (08:00 - 17:00)"
-            ))
-            # Evening shift
-            schedule.append(Shift(
-                date=current_date,
-                shift_type=ShiftType.EVENING,
-                start_time=time(13, 0),
-                end_time=time(22, 0),
-                description="Evening Shift (13:00 - 22:00)"
-            ))
-            # Night shift
-            schedule.append(Shift(
-                date=current_date,
-                shift_type=ShiftType.NIGHT,
-                start_time=time(22, 0),
-                end_time=time(8, 0),
-                description="Night Shift (22:00 - 08:00)"
-            ))
-
-        current_date += timedelta(days=1)
-
-    return schedule
+    return [slot.to_shift() for slot in iter_shift_schedule(start_date, end_date)]
+
+
+def get_week_start(day: date) -> date:
+    """
+    Get the Sunday that starts the working week of the given day.
+    """
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def get_shift_bounds(shift: Shift) -> Tuple[datetime, datetime]:
+    """
+    Get the start and end datetimes of a shift.
+
+    Shifts ending at or before their start time (e.g. Night 22:00 - 08:00)
+    end on the following day, and an end time of 23:59 is treated as midnight.
+    """
+    day = shift.date.date() if isinstance(shift.date, datetime) else shift.date
+    start = datetime.combine(day, shift.start_time)
+    if shift.end_time == time(23, 59):
+        end = datetime.combine(day + timedelta(days=1), time(0, 0))
+    else:
+        end = datetime.combine(day, shift.end_time)
+        if end <= start:
+            end += timedelta(days=1)
+    return start, end
+
+
+def is_midnight_chain(end: datetime, start: datetime) -> bool:
+    """
+    Whether a shift starting at ``start`` continues one ending at ``end`` as one stretch.
+
+    Only the template's slots ending at 23:59 (treated as midnight) are
+    chained, into the slot starting at midnight the next day (Friday's
+    Weekend Shift into Saturday's); any other shifts need MIN_REST_HOURS of
+    rest between them, even when one starts as the other ends.
+    """
+    return end == start and start.time() == time(0, 0)
 
 
 def validate_shift_assignment(shift: Shift, staff_count: int) -> bool:
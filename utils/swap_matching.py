@@ -0,0 +1,160 @@
+"""
+Matching of pending swap requests into direct swaps and multi-party cycles.
+
+Every request offers a held shift and wants another one. Requests are
+indexed by (offered, wanted), so the complement of a request, offering what
+it wants and wanting what it offers, is found with one dict lookup.
+Requests left over are searched for cycles of up to ``max_cycle_length``
+requests, each wanting the shift the next one offers, by a depth-first
+search over the requests indexed by their offered shift.
+
+Candidates are checked with a ConflictChecker holding the staff's current
+shifts before they are accepted. An exchange keeps the headcount of every
+shift, so coverage only changes when someone would receive a shift they
+already hold, which the checker reports as an overlap. Accepted matches are
+applied to the checker, so later candidates are checked against them.
+"""
+import os
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from utils.conflicts import Assignment, ConflictChecker
+
+# Longest swap cycle searched for; 2 only matches direct swaps
+MAX_SWAP_CYCLE_LENGTH = int(os.getenv("MAX_SWAP_CYCLE_LENGTH", "4"))
+
+
+class SwapOffer:
+    """A pending request by a staff member to give away one shift for another."""
+    __slots__ = ("request_id", "staff_id", "offered", "wanted")
+
+    def __init__(self, request_id: int, staff_id: str, offered: Hashable, wanted: Hashable):
+        self.request_id = request_id
+        self.staff_id = staff_id
+        self.offered = offered
+        self.wanted = wanted
+
+    def __repr__(self) -> str:
+        return f"<SwapOffer {self.request_id} {self.staff_id}: {self.offered} -> {self.wanted}>"
+
+
+class SwapMatch:
+    """Requests whose staff pass their shifts around; each takes the next one's shift."""
+    def __init__(self, offers: List[SwapOffer]):
+        self.offers = offers
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    @property
+    def is_direct(self) -> bool:
+        """Whether two staff members simply exchange their shifts."""
+        return len(self.offers) == 2
+
+    @property
+    def request_ids(self) -> List[int]:
+        """Ids of the matched requests."""
+        return [offer.request_id for offer in self.offers]
+
+
+class SwapMatcher:
+    """
+    Pending swap requests indexed for matching, with the shifts they refer to.
+
+    ``shifts`` maps shift keys to objects accepted by get_shift_bounds; the
+    checker must hold every offered shift of the requests.
+    """
+    def __init__(
+        self,
+        offers: Iterable[SwapOffer],
+        shifts: Dict[Hashable, Any],
+        checker: ConflictChecker,
+        max_cycle_length: int = MAX_SWAP_CYCLE_LENGTH
+    ):
+        self.offers = sorted(offers, key=lambda offer: offer.request_id)
+        self.shifts = shifts
+        self.checker = checker
+        self.max_cycle_length = max_cycle_length
+        self.by_pair: Dict[Tuple[Hashable, Hashable], List[SwapOffer]] = {}
+        self.by_offered: Dict[Hashable, List[SwapOffer]] = {}
+        for offer in self.offers:
+            self.by_pair.setdefault((offer.offered, offer.wanted), []).append(offer)
+            self.by_offered.setdefault(offer.offered, []).append(offer)
+        self.used: Set[int] = set()
+
+    def _assignments(self, offers: List[SwapOffer]) -> List[Assignment]:
+        return [(offer.staff_id, offer.offered, self.shifts[offer.offered]) for offer in offers]
+
+    def _is_valid(self, offers: List[SwapOffer]) -> bool:
+        staff_ids = {offer.staff_id for offer in offers}
+        offered = {offer.offered for offer in offers}
+        if len(staff_ids) < len(offers) or len(offered) < len(offers):
+            return False
+        return self.checker.check_cycle(self._assignments(offers)) is None
+
+    def _accept(self, offers: List[SwapOffer]) -> SwapMatch:
+        self.checker.apply_cycle(self._assignments(offers))
+        self.used.update(offer.request_id for offer in offers)
+        return SwapMatch(offers)
+
+    def find_direct(self, offer: SwapOffer) -> Optional[List[SwapOffer]]:
+        """
+        Get the oldest valid request complementing the given one, as a pair.
+        """
+        for other in self.by_pair.get((offer.wanted, offer.offered), ()):
+            if other.request_id not in self.used and self._is_valid([offer, other]):
+                return [offer, other]
+        return None
+
+    def find_cycle(self, offer: SwapOffer) -> Optional[List[SwapOffer]]:
+        """
+        Get the shortest valid cycle of unused requests starting at the given one.
+
+        Cycles of every length up to ``max_cycle_length`` are searched in
+        turn, so three-way swaps are preferred over four-way ones.
+        """
+        for length in range(2, self.max_cycle_length + 1):
+            cycle = self._search([offer], length)
+            if cycle is not None:
+                return cycle
+        return None
+
+    def _search(self, path: List[SwapOffer], length: int) -> Optional[List[SwapOffer]]:
+        if len(path) == length:
+            return list(path) if self._is_valid(path) else None
+        last = path[-1]
+        if len(path) == length - 1:
+            # The closing request must also want what the first one offers
+            candidates = self.by_pair.get((last.wanted, path[0].offered), ())
+        else:
+            candidates = self.by_offered.get(last.wanted, ())
+        on_path = {offer.request_id for offer in path}
+        for following in candidates:
+            if following.request_id in self.used or following.request_id in on_path:
+                continue
+            path.append(following)
+            cycle = self._search(path, length)
+            path.pop()
+            if cycle is not None:
+                return cycle
+        return None
+
+    def match(self) -> List[SwapMatch]:
+        """
+        Match as many requests as possible, oldest first.
+
+        Direct swaps are matched first over all requests, then the requests
+        left over are searched for longer cycles.
+        """
+        matches = []
+        for offer in self.offers:
+            if offer.request_id not in self.used:
+                pair = self.find_direct(offer)
+                if pair is not None:
+                    matches.append(self._accept(pair))
+        if self.max_cycle_length > 2:
+            for offer in self.offers:
+                if offer.request_id not in self.used:
+                    cycle = self.find_cycle(offer)
+                    if cycle is not None:
+                        matches.append(self._accept(cycle))
+        return matches
@@ -2,7 +2,7 @@
 Translation support for multiple languages.
 """
 from enum import Enum
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 
 class Language(Enum):
@@ -33,6 +33,23 @@ TRANSLATIONS = {
         "no_schedule": "No shift schedule available.",
         "swap_request": "To request a shift swap, please select the shift you want to swap.\nUse /myshift to view your shifts.",
         "error": "Sorry, an error occurred while processing your request. Please try again later.",
+        "shift_reminder": "⏰ Reminder: you have a {shift_type} shift on {date}.",
+        "swap_approved_notice": "✅ Your swap request for {date} was approved.",
+        "swap_rejected_notice": "❌ Your swap request for {date} was rejected.",
+        "slow_down": "⏳ Too many requests. Please slow down and try again in a few seconds.",
+        "replacement_offer": "🆘 The {shift} shift on {date} needs cover. Can you take it?",
+        "replacement_accept": "✅ Take it",
+        "replacement_decline": "❌ Can't",
+        "replacement_covered": "✅ You now have the {shift} shift on {date}.",
+        "replacement_taken": "This shift has already been covered. Thank you!",
+        "replacement_unavailable": "You can no longer take this shift: it conflicts with your shifts or rest rules.",
+        "replacement_declined": "You declined this shift.",
+        "replacement_not_offered": "This shift was not offered to you.",
+        "replacement_manager_covered": "✅ @{username} took over the {shift} shift on {date}.",
+        "replacement_manager_declined": "❌ @{username} declined the {shift} shift on {date}.",
+        "approve_swap_matches": "✅ Approve these swaps",
+        "swap_matches_outdated": "These swaps are outdated, send /match_swaps again.",
+        "swap_matches_approved": "✅ Approved {approved} of the {listed} listed swap requests.",
         
         # Help text
         "help_text": """
@@ -42,12 +59,20 @@ Available commands:
 /myshift - Show my shifts
 /schedule - Show shift schedule
 /swap - Request shift swap
+/export - Export shifts (csv or ics)
+/oncall - Show who is on call now
 
 Supervisor commands:
 /create_shift - Create new shift
 /assign_shift - Assign shift to user
 /approve_swap - Approve swap request
 /manage_users - Manage users
+/publish - Publish the shifts of the coming weeks
+/auto_assign - Staff the published shifts
+/coverage - Show understaffed shifts
+/department_report - Rank staff by workload
+/match_swaps - Match pending swap requests
+/replace - Find a replacement for an absent user
 """
     },
     
@@ -70,6 +95,23 @@ Supervisor commands:
         "no_schedule": "لا يوجد جدول ورديات متاح.",
         "swap_request": "لطلب تبديل وردية، يرجى تحديد الوردية التي تريد تبديلها.\nاستخدم الأمر /myshift لرؤية وردياتك.",
         "error": "عذراً، حدث خطأ أثناء معالجة طلبك. يرجى المحاولة مرة أخرى لاحقاً.",
+        "shift_reminder": "⏰ تذكير: لديك وردية {shift_type} بتاريخ {date}.",
+        "swap_approved_notice": "✅ تمت الموافقة على طلب التبديل الخاص بك ليوم {date}.",
+        "swap_rejected_notice": "❌ تم رفض طلب التبديل الخاص بك ليوم {date}.",
+        "slow_down": "⏳ طلبات كثيرة جداً. يرجى التمهل والمحاولة مرة أخرى بعد بضع ثوانٍ.",
+        "replacement_offer": "🆘 الوردية {shift} بتاريخ {date} تحتاج إلى بديل. هل يمكنك تغطيتها؟",
+        "replacement_accept": "✅ سأغطيها",
+        "replacement_decline": "❌ لا أستطيع",
+        "replacement_covered": "✅ أصبحت الوردية {shift} بتاريخ {date} من نصيبك.",
+        "replacement_taken": "تمت تغطية هذه الوردية بالفعل. شكراً لك!",
+        "replacement_unavailable": "لم يعد بإمكانك تغطية هذه الوردية: فهي تتعارض مع وردياتك أو قواعد الراحة.",
+        "replacement_declined": "لقد رفضت هذه الوردية.",
+        "replacement_not_offered": "لم تُعرض عليك هذه الوردية.",
+        "replacement_manager_covered": "✅ تولى @{username} الوردية {shift} بتاريخ {date}.",
+        "replacement_manager_declined": "❌ رفض @{username} الوردية {shift} بتاريخ {date}.",
+        "approve_swap_matches": "✅ الموافقة على هذه التبديلات",
+        "swap_matches_outdated": "هذه التبديلات قديمة، أرسل /match_swaps مرة أخرى.",
+        "swap_matches_approved": "✅ تمت الموافقة على {approved} من أصل {listed} من طلبات التبديل المعروضة.",
         
         # Help text
         "help_text": """
@@ -79,12 +121,20 @@ Supervisor commands:
 /myshift - عرض وردياتي
 /schedule - عرض جدول الورديات
 /swap - طلب تبديل وردية
+/export - تصدير الورديات (csv أو ics)
+/oncall - عرض المناوبين الآن
 
 أوامر المشرفين:
 /create_shift - إنشاء وردية جديدة
 /assign_shift - تعيين وردية لمستخدم
 /approve_swap - الموافقة على طلب تبديل
 /manage_users - إدارة المستخدمين
+/publish - نشر ورديات الأسابيع القادمة
+/auto_assign - توزيع الموظفين على الورديات المنشورة
+/coverage - عرض الورديات الناقصة
+/department_report - ترتيب الموظفين حسب عبء العمل
+/match_swaps - مطابقة طلبات التبديل المعلقة
+/replace - البحث عن بديل لمستخدم غائب
 """
     },
     
@@ -107,6 +157,23 @@ Supervisor commands:
         "no_schedule": "אין לוח משמרות זמין.",
         "swap_request": "כדי לבקש החלפת משמרת, אנא בחר את המשמרת שברצונך להחליף.\nהשתמש ב-/myshift כדי לראות את המשמרות שלך.",
         "error": "מצטער, אירעה שגיאה בעיבוד הבקשה שלך. אנא נסה שוב מאוחר יותר.",
+        "shift_reminder": "⏰ תזכורת: יש לך משמרת {shift_type} בתאריך {date}.",
+        "swap_approved_notice": "✅ בקשת ההחלפה שלך לתאריך {date} אושרה.",
+        "swap_rejected_notice": "❌ בקשת ההחלפה שלך לתאריך {date} נדחתה.",
+        "slow_down": "⏳ יותר מדי בקשות. אנא האט ונסה שוב בעוד מספר שניות.",
+        "replacement_offer": "🆘 משמרת {shift} בתאריך {date} זקוקה למחליף. האם תוכל לקחת אותה?",
+        "replacement_accept": "✅ אקח אותה",
+        "replacement_decline": "❌ לא יכול",
+        "replacement_covered": "✅ משמרת {shift} בתאריך {date} שלך עכשיו.",
+        "replacement_taken": "משמרת זו כבר כוסתה. תודה!",
+        "replacement_unavailable": "אינך יכול עוד לקחת משמרת זו: היא מתנגשת עם המשמרות שלך או עם כללי המנוחה.",
+        "replacement_declined": "דחית משמרת זו.",
+        "replacement_not_offered": "משמרת זו לא הוצעה לך.",
+        "replacement_manager_covered": "✅ @{username} לקח את משמרת {shift} בתאריך {date}.",
+        "replacement_manager_declined": "❌ @{username} דחה את משמרת {shift} בתאריך {date}.",
+        "approve_swap_matches": "✅ אשר את ההחלפות האלה",
+        "swap_matches_outdated": "ההחלפות האלה אינן עדכניות, שלח /match_swaps שוב.",
+        "swap_matches_approved": "✅ אושרו {approved} מתוך {listed} בקשות ההחלפה שהוצגו.",
         
         # Help text
         "help_text": """
@@ -116,17 +183,44 @@ Supervisor commands:
 /myshift - הצג את המשמרות שלי
 /schedule - הצג לוח משמרות
 /swap - בקש החלפת משמרת
+/export - ייצא משמרות (csv או ics)
+/oncall - הצג מי בתורנות עכשיו
 
 פקודות מנהל:
 /create_shift - צור משמרת חדשה
 /assign_shift - הקצה משמרת למשתמש
 /approve_swap - אשר בקשת החלפה
 /manage_users - נהל משתמשים
+/publish - פרסם את משמרות השבועות הקרובים
+/auto_assign - שבץ עובדים במשמרות שפורסמו
+/coverage - הצג משמרות חסרות
+/department_report - דרג עובדים לפי עומס עבודה
+/match_swaps - התאם בקשות החלפה ממתינות
+/replace - מצא מחליף למשתמש שנעדר
 """
     }
 }
 
 
+# Keys of the reply keyboard buttons
+MENU_KEYS = ("my_shifts", "shift_schedule", "request_swap", "create_shift", "manage_users")
+
+# Button label in any language -> (menu key, language of the label)
+BUTTON_INDEX: Dict[str, Tuple[str, Language]] = {
+    TRANSLATIONS[language][key]: (key, language)
+    for language in Language
+    for key in MENU_KEYS
+    if key in TRANSLATIONS[language]
+}
+
+
+def resolve_button(text: str) -> Optional[Tuple[str, Language]]:
+    """
+    Get the menu key and language of a reply keyboard button label.
+    """
+    return BUTTON_INDEX.get(text)
+
+
 def get_translation(key: str, language: Language, **kwargs) -> str:
     """
     Get translation for a given key in the specified language.
@@ -0,0 +1,113 @@
+"""
+Per-user weekly workload: hours, night and weekend shifts, swaps and cancellations.
+
+Assignments are given as parallel arrays of user id, shift date, slot and
+status. Slot hours and kinds come from lookup tables built once from
+WEEKLY_TEMPLATE, and rows are grouped by (user, week) with one ``np.unique``
+and a ``np.bincount`` per field, so recomputing years of history for a
+backfill takes a few array passes.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator
+
+import numpy as np
+
+from utils.scheduler import WEEKLY_TEMPLATE, ShiftType, get_scheduled_slot, get_shift_bounds
+
+# Values of ShiftAssignment.status
+ASSIGNED = "assigned"
+SWAPPED = "swapped"
+CANCELLED = "cancelled"
+
+# Columns of a workload table; hours of held shifts, counts otherwise
+WORKLOAD_FIELDS = ("hours", "shifts", "nights", "weekends", "swaps", "cancellations")
+
+# Hours, night and weekend flags of every (weekday, slot) of the template
+_MONDAY = date(2024, 1, 1)
+_SLOTS = max(len(day_slots) for day_slots in WEEKLY_TEMPLATE)
+SLOT_HOURS = np.zeros((7, _SLOTS))
+SLOT_NIGHT = np.zeros((7, _SLOTS), dtype=bool)
+SLOT_WEEKEND = np.zeros((7, _SLOTS), dtype=bool)
+for _weekday, _day_slots in enumerate(WEEKLY_TEMPLATE):
+    for _slot, _definition in enumerate(_day_slots):
+        _start, _end = get_shift_bounds(get_scheduled_slot(_MONDAY + timedelta(_weekday), _slot))
+        SLOT_HOURS[_weekday, _slot] = (_end - _start).total_seconds() / 3600
+        SLOT_NIGHT[_weekday, _slot] = _definition.shift_type == ShiftType.NIGHT
+        SLOT_WEEKEND[_weekday, _slot] = _definition.shift_type == ShiftType.WEEKEND
+
+
+def get_week_starts(days: np.ndarray) -> np.ndarray:
+    """
+    Get the Sunday starting the week of every day, like get_week_start.
+    """
+    days = np.asarray(days, dtype="datetime64[D]")
+    # 1970-01-01 was a Thursday, weekday 3 with Monday as 0
+    weekdays = (days.astype(np.int64) + 3) % 7
+    return days - (weekdays + 1) % 7
+
+
+class WorkloadTotals:
+    """Workload of (user, week) pairs, one row per pair."""
+    def __init__(self, user_ids: np.ndarray, weeks: np.ndarray, values: np.ndarray):
+        self.user_ids = user_ids
+        self.weeks = weeks
+        # One column per WORKLOAD_FIELDS entry
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every pair as a dict of user_id, week_start and the workload fields.
+        """
+        pairs = zip(self.user_ids.tolist(), self.weeks.tolist(), self.values.tolist())
+        for user_id, week, values in pairs:
+            row = {"user_id": user_id, "week_start": week, "hours": values[0]}
+            row.update(zip(WORKLOAD_FIELDS[1:], map(int, values[1:])))
+            yield row
+
+
+def _array(values: Iterable[Any], dtype: Any) -> np.ndarray:
+    return np.asarray(values if isinstance(values, np.ndarray) else list(values), dtype=dtype)
+
+
+def aggregate_workload(
+    user_ids: Iterable[int],
+    days: Iterable[Any],
+    slots: Iterable[int],
+    statuses: Iterable[str]
+) -> WorkloadTotals:
+    """
+    Sum the workload of assignments per user and week.
+
+    Days may be dates, datetimes or datetime64 values. Held assignments count
+    towards hours, shifts, nights and weekends; swapped and cancelled ones
+    only towards swaps and cancellations.
+    """
+    user_ids = _array(user_ids, np.int64)
+    days = _array(days, "datetime64[D]")
+    slots = _array(slots, np.int64)
+    statuses = _array(statuses, None)
+    if not len(user_ids):
+        return WorkloadTotals(user_ids, days, np.zeros((0, len(WORKLOAD_FIELDS))))
+
+    weekdays = (days.astype(np.int64) + 3) % 7
+    held = statuses == ASSIGNED
+    columns = (
+        np.where(held, SLOT_HOURS[weekdays, slots], 0.0),
+        held,
+        held & SLOT_NIGHT[weekdays, slots],
+        held & SLOT_WEEKEND[weekdays, slots],
+        statuses == SWAPPED,
+        statuses == CANCELLED,
+    )
+
+    keys = np.stack([user_ids, get_week_starts(days).astype(np.int64)], axis=1)
+    pairs, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    values = np.stack(
+        [np.bincount(inverse, weights=column, minlength=len(pairs)) for column in columns],
+        axis=1,
+    )
+    return WorkloadTotals(pairs[:, 0], pairs[:, 1].astype("datetime64[D]"), values)